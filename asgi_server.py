@@ -0,0 +1,316 @@
+from starlette.applications import Starlette
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, Response, StreamingResponse
+from starlette.routing import Route
+from server import (EVENTS, GET, NDJSON, POST, RESPONSE_CACHE, check_batch, create_game, get_board_length,
+    get_cached_response, get_filter, get_game, get_game_id, get_page, get_serializer, get_win_length,
+    initial_event, list_moves, make_move, parse_move_request, play_batch, render_page, store)
+from serialization import Serializer
+from metrics import CONTENT_TYPE, REGISTRY, REQUEST_SECONDS, timer
+from response_cache import etag_matches
+from events import KEEPALIVE, KEEPALIVE_SECONDS
+from tic_tac_toe import Game
+from typing import Callable, Iterator
+from urllib.parse import parse_qsl
+import asyncio
+import json
+import logging
+import time
+
+# The ASGI version of server.py: the same /games and /moves contract
+# (parameters, responses and status codes), served from an event loop,
+# e.g. with `uvicorn asgi_server:app`.
+#
+# Games are only ever touched from the thread pool: storage access and
+# the computer's move (which may be a long search) block, and so does
+# waiting for a game's lock, so each request's work on its game runs
+# in one call to run_in_threadpool and the event loop never stalls.
+# The store, the Board backend and the computer's Strategy are the ones
+# configured for server.py (see its environment variables).
+
+class _Params:
+    """The request parameters, as the server.py helpers read them:
+    the query string as `args` and the (url-encoded) body as `form`"""
+
+    __slots__ = ("args", "form")
+
+    def __init__(self, args, form: dict = None) -> None:
+        self.args = args
+        self.form = dict() if form is None else form
+
+def text_response(body: str, status_code: int = 200) -> Response:
+    """ Builds a response from a str, like flask does (as text/html) """
+    return HTMLResponse(body, status_code)
+
+async def games(request: Request) -> Response:
+    params = _Params(request.query_params)
+    if request.method == POST: # create game
+        try:
+            board_length = get_board_length(request=params)
+        except:
+            return text_response("Invalid board length specified", 400)
+        try:
+            serializer = get_serializer(request=params)
+        except:
+            return text_response("Invalid board format specified", 400)
+        try:
+            win_length = get_win_length(request=params)
+        except:
+            return text_response("Invalid win length specified", 400)
+
+        def create() -> str:
+            game = create_game(board_length, win_length)
+            # others can already get the game, and move on it
+            with store.lock(game.id), timer("serialize"):
+                return serializer.dumps(game)
+        try:
+            return text_response(await run_in_threadpool(create))
+        except ValueError: # e.g. a win length above the board length
+            return text_response("Invalid win length specified", 400)
+
+    else: # get game(s)
+        try:
+            serializer = get_serializer(request=params)
+        except:
+            return text_response("Invalid board format specified", 400)
+        game_id = params.args.get("game_id", '')
+        if (game_id == ''): # no ID provided, return all games (a page of them)
+            try:
+                cursor, limit = get_page(request=params)
+            except:
+                return text_response("Invalid cursor or limit specified", 400)
+            try:
+                game_filter = get_filter(request=params)
+            except:
+                return text_response("Invalid filter specified", 400)
+            if params.args.get("format", '') == NDJSON:
+                return ndjson_response(lambda: store.games(cursor, limit, game_filter), lambda g: store.lock(g.id), serializer)
+            # get one extra game, to know where the next page starts
+            return await page_response(lambda: store.games(cursor, None if limit is None else limit + 1, game_filter),
+                limit, serializer, lambda g: store.lock(g.id))
+        else:
+            try:
+                return await cached_response(request, get_game_id(game_id),
+                    lambda game: (serializer.dumps_list([game]), None))
+            except:
+                return text_response("Requested game not found", 404)
+
+async def moves(request: Request) -> Response:
+    params = _Params(request.query_params)
+    if request.method == POST: # make a move
+        game_id = params.args.get("game_id", '')
+        if (game_id == ''): # no ID provided
+            return text_response("Please provide a game ID for your move", 400)
+        params.form = dict(parse_qsl((await request.body()).decode("utf-8"), keep_blank_values=True))
+
+        def move() -> str:
+            serializer = get_serializer(request=params)
+            game_id_int = get_game_id(game_id)
+            x, y = parse_move_request(request=params) # parse coordinates from req
+            return make_move(game_id_int, x, y, serializer) # return current game state
+        try:
+            return text_response(await run_in_threadpool(move))
+        except:
+            logging.exception("Invalid move specified")
+            return text_response("Invalid move specified", 400)
+
+    else: # get move(s)
+        game_id = params.args.get("game_id", '')
+        if (game_id == ''): # must provide a game ID
+            return text_response("Please provide a game ID for your move", 400)
+
+        try:
+            cursor, limit = get_page(request=params)
+        except:
+            return text_response("Invalid cursor or limit specified", 400)
+        try:
+            serializer = get_serializer(request=params)
+        except:
+            return text_response("Invalid board format specified", 400)
+
+        game_id = get_game_id(game_id)
+        move_id = params.args.get("move_id", '')
+        if params.args.get("format", '') == NDJSON:
+            lock = store.lock(game_id)
+            def get_locked_moves() -> list:
+                with lock:
+                    return list_moves(get_game(game_id), move_id, cursor, limit) # retrieve game
+            listed = await run_in_threadpool(get_locked_moves)
+            return ndjson_response(lambda: iter(listed), lambda m: lock, serializer)
+        # the page is rendered under the game's lock
+        return await cached_response(request, game_id,
+            lambda game: render_page(list_moves(game, move_id, cursor, limit), limit, serializer))
+
+async def events(request: Request) -> Response:
+    # subscribers wait on the event loop, so idle ones don't hold a thread
+    params = _Params(request.query_params)
+    try:
+        serializer = get_serializer(request=params)
+    except:
+        return text_response("Invalid board format specified", 400)
+    game_id = params.args.get("game_id", '')
+    try:
+        game_id = None if game_id == '' else get_game_id(game_id)
+    except:
+        return text_response("Requested game not found", 404)
+    # subscribed first, so no update is missed (clients can tell repeats by their ID)
+    subscription = EVENTS.subscribe(game_id, serializer, asyncio.get_running_loop())
+    try:
+        first_event = await run_in_threadpool(initial_event, game_id, serializer)
+    except:
+        EVENTS.unsubscribe(subscription)
+        return text_response("Requested game not found", 404)
+
+    async def generate():
+        try:
+            yield first_event
+            while True:
+                event = await subscription.get_async(KEEPALIVE_SECONDS)
+                yield KEEPALIVE if event is None else event
+        finally: # the client is gone
+            EVENTS.unsubscribe(subscription)
+    return StreamingResponse(generate(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+async def batch_moves(request: Request) -> Response:
+    try:
+        items = await request.json()
+    except ValueError:
+        items = None
+    try:
+        check_batch(items)
+    except ValueError as e:
+        return text_response(str(e), 400)
+    try:
+        serializer = get_serializer(request=_Params(request.query_params))
+    except:
+        return text_response("Invalid board format specified", 400)
+
+    def play() -> str:
+        results = play_batch(items, serializer)
+        # like flask's jsonify
+        with timer("serialize"):
+            return json.dumps(results, sort_keys=True, separators=(",", ":")) + "\n"
+    return Response(await run_in_threadpool(play), media_type="application/json")
+
+async def page_response(get_items: Callable[[], Iterator], limit: int, serializer: Serializer,
+        get_lock: Callable = None) -> Response:
+    """ Builds the response for a page of a listing, see server.page_response.
+
+    The items are fetched and serialized in the thread pool.
+
+    Args:
+        get_items: function that gets the items of the page, plus (if any)
+            the first item of the next page
+        limit: the maximum number of items on the page, None for no limit
+        serializer: the Serializer to render the items with
+        get_lock: see server.render_page
+
+    Returns:
+        The Response
+    """
+    body, next_cursor = await run_in_threadpool(lambda: render_page(get_items(), limit, serializer, get_lock))
+    response = text_response(body)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return response
+
+async def cached_response(request: Request, game_id: int, render: Callable[[Game], tuple]) -> Response:
+    """ Builds the response to a GET on a game's state, see server.cached_response.
+
+    Cached responses are served from the event loop, others are
+    rendered in the thread pool.
+
+    Args:
+        request: the Request
+        game_id: id of the game
+        render: see server.get_cached_response
+
+    Returns:
+        The Response
+
+    Raises:
+        ValueError: If there is no game with the provided ID
+    """
+    key = (request.url.path, request.url.query.encode("utf-8"))
+    cached = RESPONSE_CACHE.get(game_id, key)
+    if cached is None:
+        cached = await run_in_threadpool(get_cached_response, game_id, key, render)
+    if etag_matches(cached.etag, request.headers.get("if-none-match")):
+        response = Response(status_code=304)
+    else:
+        response = text_response(cached.body)
+        if cached.next_cursor is not None:
+            response.headers["X-Next-Cursor"] = str(cached.next_cursor)
+    response.headers["ETag"] = cached.etag
+    return response
+
+def ndjson_response(get_items: Callable[[], Iterator], get_lock: Callable, serializer: Serializer) -> Response:
+    """ Builds a streaming response for a listing, as newline delimited JSON,
+    see server.ndjson_response.
+
+    Each item is fetched and serialized in the thread pool as the response is sent.
+
+    Args:
+        get_items: function that gets the items to stream
+        get_lock: function that gets the lock to hold while serializing an item
+        serializer: the Serializer to render the items with (always on a single line)
+
+    Returns:
+        The streaming Response
+    """
+    serializer = serializer.line()
+    def generate():
+        for item in get_items():
+            with get_lock(item), timer("serialize"):
+                line = serializer.dumps(item)
+            yield line + "\n"
+    return StreamingResponse(iterate_in_threadpool(generate()), media_type="application/x-ndjson")
+
+
+async def metrics(request: Request) -> Response:
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+class RequestTimer:
+    """ASGI middleware timing HTTP requests into metrics.REQUEST_SECONDS,
+    until the response starts (like server.py does)
+
+    Args:
+        app: the ASGI app to time
+        endpoints: the paths of the app's routes, other paths are
+            labeled "unmatched" (so the labels stay bounded)
+    """
+
+    def __init__(self, app, endpoints: set) -> None:
+        self.app = app
+        self.endpoints = endpoints
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        endpoint = scope["path"] if scope["path"] in self.endpoints else "unmatched"
+
+        async def timed_send(message) -> None:
+            if message["type"] == "http.response.start":
+                REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], endpoint, str(message["status"]))
+            await send(message)
+        await self.app(scope, receive, timed_send)
+
+
+routes = [
+    Route("/games", games, methods=[GET, POST]),
+    Route("/moves", moves, methods=[GET, POST]),
+    Route("/moves/batch", batch_moves, methods=[POST]),
+    Route("/events", events, methods=[GET]),
+    Route("/metrics", metrics, methods=[GET]),
+]
+app = Starlette(routes=routes, middleware=[
+    Middleware(RequestTimer, endpoints={route.path for route in routes}),
+])
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=5000)
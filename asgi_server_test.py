@@ -0,0 +1,81 @@
+import json
+import unittest
+from starlette.testclient import TestClient
+from asgi_server import app
+from server import MAX_BATCH_SIZE
+
+class TestAsgiServer(unittest.TestCase):
+
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def create_game(self, query: str = "compact=1&board_format=flat") -> dict:
+        r = self.client.post(f"/games?{query}")
+        self.assertEqual(r.status_code, 200)
+        return json.loads(r.text)
+
+    def test_create_game(self):
+        game = self.create_game("board_length=4&win_length=3&compact=1&board_format=flat")
+        self.assertEqual(game["board_state"], "." * 16)
+        self.assertEqual(self.create_game()["board_state"], "." * 9)
+
+        for query in ["board_length=0", "board_length=a", "win_length=0", "board_length=3&win_length=4", "board_format=a"]:
+            self.assertEqual(self.client.post(f"/games?{query}").status_code, 400, query)
+
+    def test_move(self):
+        game_id = self.create_game()["game_id"]
+        r = self.client.post(f"/moves?game_id={game_id}&compact=1&board_format=flat", data={"x": 1, "y": 1})
+        self.assertEqual(r.status_code, 200)
+        game = json.loads(r.text)
+        # the user's move, and the computer's reply
+        self.assertEqual((game["board_state"][4], game["board_state"].count("O"), game["last_played"]), ("X", 1, "O"))
+
+        r = self.client.get(f"/moves?game_id={game_id}&move_id=1&compact=1&board_format=flat")
+        move, = json.loads(r.text)
+        self.assertEqual((move["move_id"], move["board_state"], move["last_moved"]), (1, "....X....", "X"))
+
+        self.assertEqual(self.client.post("/moves", data={"x": 0, "y": 0}).status_code, 400)
+        self.assertEqual(self.client.post(f"/moves?game_id={game_id}", data={"x": 1, "y": 1}).status_code, 400) # taken
+        self.assertEqual(self.client.post(f"/moves?game_id={game_id}", data={"x": 0}).status_code, 400)
+        self.assertEqual(self.client.post("/moves?game_id=a", data={"x": 0, "y": 0}).status_code, 400)
+        self.assertEqual(self.client.post("/moves?game_id=100000", data={"x": 0, "y": 0}).status_code, 400)
+
+    def test_batch(self):
+        game_id = self.create_game()["game_id"]
+        r = self.client.post("/moves/batch?board_format=flat", json=[
+            {"game_id": game_id, "x": 0, "y": 0}, {"game_id": 100000, "x": 0, "y": 0}, {"x": 0}])
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.headers["content-type"], "application/json")
+        results = json.loads(r.text)
+        self.assertEqual(results[0]["game_id"], game_id)
+        self.assertEqual(results[0]["board_state"].count("X"), 1)
+        self.assertEqual(results[0]["board_state"].count("O"), 1)
+        self.assertEqual(results[1], {"game_id": 100000, "error": "Requested game not found"})
+        self.assertEqual(results[2], {"error": "Invalid move specified"})
+
+        self.assertEqual(self.client.post("/moves/batch", json={"game_id": game_id}).status_code, 400)
+        self.assertEqual(self.client.post("/moves/batch", data={"x": 0}).status_code, 400)
+        too_many = [{"game_id": game_id, "x": 0, "y": 0}] * (MAX_BATCH_SIZE + 1)
+        self.assertEqual(self.client.post("/moves/batch", json=too_many).status_code, 400)
+
+    def test_list_games(self):
+        first = self.create_game()["game_id"]
+        for _ in range(2):
+            self.create_game()
+        r = self.client.get(f"/games?cursor={first}&limit=2&compact=1")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual([g["game_id"] for g in json.loads(r.text)], [first, first + 1])
+        self.assertEqual(r.headers["X-Next-Cursor"], str(first + 2))
+
+        r = self.client.get(f"/games?game_id={first}&compact=1")
+        self.assertEqual([g["game_id"] for g in json.loads(r.text)], [first])
+
+        self.assertEqual(self.client.get("/games?game_id=100000").status_code, 404)
+        self.assertEqual(self.client.get("/games?game_id=a").status_code, 404)
+        for query in ["cursor=-1", "limit=0", "limit=a", "state=a", "board_format=a"]:
+            self.assertEqual(self.client.get(f"/games?{query}").status_code, 400, query)
+        self.assertEqual(self.client.get("/moves").status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
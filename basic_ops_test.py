@@ -1,6 +1,12 @@
+import datetime
+import json
+import random
+import threading
 import unittest
 import numpy as np
-from tic_tac_toe import Game, Result, EMPTY, X, O
+from serialization import Serializer
+from tic_tac_toe import (EMPTY, FLAT_BOARD, LEGACY_BOARD, MAX_CACHED_BOARD_STATES, ROWS_BOARD, BitBoard, Board, Game,
+    Move, Result, X, O)
 
 class TestTicTacToeMethods(unittest.TestCase):
 
@@ -97,6 +103,220 @@ class TestTicTacToeMethods(unittest.TestCase):
         self.assertEqual(r, Result.DRAW)
         self.assertRaises(ValueError, g.make_move, 1, 1, O)
 
+    def test_move_history_rebuild(self):
+        # every snapshot interval should give the same boards for every move
+        coords = [(0, 0), (1, 0), (2, 0), (0, 1), (1, 1), (2, 1), (0, 3), (3, 3)]
+        expected = [np.copy(TestTicTacToeMethods.EMPTY_BOARD_5)]
+        for i, (x, y) in enumerate(coords):
+            board = np.copy(expected[-1])
+            board[y, x] = X if i % 2 == 0 else O
+            expected.append(board)
+
+        for interval in [1, 3, None, 100]:
+            g = Game(0, board_length=5, snapshot_interval=interval)
+            for i, (x, y) in enumerate(coords):
+                g.make_move(x, y, X if i % 2 == 0 else O)
+            moves = g.get_moves()
+            self.assertEqual(len(moves), len(expected))
+            for i, m in enumerate(moves):
+                np.testing.assert_equal(m.board._state, expected[i])
+                np.testing.assert_equal(g.get_moves(i)[0].board._state, expected[i])
+
+            # no snapshot escapes uncopied: changing every move's board changes no history
+            for m in moves:
+                m.board.update(4, 4, O)
+            for i, m in enumerate(g.get_moves()):
+                np.testing.assert_equal(m.board._state, expected[i])
+
+    def test_move_history_snapshots_bounded(self):
+        # by default a game keeps a constant number of snapshots, however long it is
+        g = Game(0, board_length=8, win_length=8)
+        for n in range(64):
+            x, y = n % 8, n // 8
+            g.make_move(x, y, X if (x // 2 + y) % 2 == 0 else O)
+        self.assertEqual(len(g.moves), 65)
+        self.assertLessEqual(len(g._snapshots), 3)
+        self.assertEqual(g.get_moves(40)[0].board.to_string().count(EMPTY), 24)
+
+    def test_move_history_independent(self):
+        # rebuilt boards must not leak changes into the game's live board
+        g = Game(0)
+        g.make_move(0, 0, X)
+        g.make_move(1, 1, O)
+        g.get_moves(1)[0].board.update(2, 2, X)
+        g.make_move(2, 2, X)
+        np.testing.assert_equal(g.get_moves(1)[0].board._state[2, 2], EMPTY)
+        self.assertEqual(g.last_move.board._state[2, 2], X)
+
+        # nor can the boards of the snapshots, or of the last move, rewrite history
+        g = Game(0)
+        g.make_move(0, 0, X)
+        g.get_moves(0)[0].board.update(1, 1, O)
+        g.last_move.board.update(2, 2, O)
+        self.assertEqual(g.get_moves(0)[0].board.to_string(), ".........")
+        self.assertEqual(g.get_moves(1)[0].board.to_string(), "X........")
+        self.assertEqual(g.get_moves(1)[0].board_state(FLAT_BOARD), "X........")
+        board = g.last_move.board
+        g.make_move(1, 0, O)
+        self.assertEqual(board.to_string(), "X........")
+        self.assertIsNot(g.last_move.board, g.last_move.board)
+        self.assertEqual(g.make_move(1, 1, X), Result.ONGOING)
+
+    def test_move_history_columns(self):
+        # moves are views over the game's columns, created on demand
+        g = Game(0)
+        g.make_move(0, 0, X)
+        g.make_move(2, 1, O)
+        self.assertFalse(hasattr(g, "__dict__"))
+        self.assertFalse(hasattr(g.last_move, "__dict__"))
+        moves = g.get_moves()
+        self.assertEqual(len(moves), 3)
+        self.assertIsInstance(moves[-1], Move)
+        self.assertEqual([(m.x, m.y, m.last_moved) for m in moves], [(None, None, None), (0, 0, X), (2, 1, O)])
+        self.assertEqual([m.id for m in moves[1:]], [1, 2])
+        self.assertEqual(str(moves), str(list(moves)))
+        # timestamps round-trip exactly through int64 microseconds
+        timestamp = datetime.datetime(2021, 3, 4, 5, 6, 7, 891011)
+        g.last_move.timestamp = timestamp
+        self.assertEqual(g.get_moves(2)[0].timestamp, timestamp)
+
+    def test_large_board_win(self):
+        # line counters must only report complete lines
+        board_length = 200
+        g = Game(0, board_length=board_length)
+        for i in range(board_length - 1):
+            self.assertEqual(g.make_move(board_length - 1 - i, i, X), Result.ONGOING) # anti-diagonal
+            self.assertEqual(g.make_move(i, 0 if i else 1, O), Result.ONGOING)
+        clone = g.last_move.board.clone()
+        self.assertEqual(g.make_move(0, board_length - 1, X), Result.X_WINNER)
+        self.assertFalse(clone.check_winner(0, 0, O))
+        clone.update(0, board_length - 1, O)
+        self.assertFalse(clone.check_winner(0, board_length - 1, O))
+
+    def test_win_length(self):
+        for board_type in [Board, BitBoard]:
+            g = Game(0, board_length=7, board_type=board_type, win_length=4)
+            self.assertEqual(g.win_length, 4)
+            # anti-diagonal in the middle of the board, X's last move fills a gap
+            for x, y, value in [(5, 1, X), (0, 0, O), (4, 2, X), (0, 6, O), (2, 4, X), (6, 6, O)]:
+                self.assertEqual(g.make_move(x, y, value), Result.ONGOING)
+            self.assertEqual(g.make_move(3, 3, X), Result.X_WINNER)
+            # 3 in a row doesn't win, wherever the line is
+            g = Game(0, board_length=7, board_type=board_type, win_length=4)
+            for x, y, value in [(6, 0, X), (0, 0, O), (6, 1, X), (1, 0, O), (6, 2, X)]:
+                self.assertEqual(g.make_move(x, y, value), Result.ONGOING)
+            self.assertRaises(ValueError, Game, 0, board_length=3, board_type=board_type, win_length=4)
+            self.assertRaises(ValueError, Game, 0, board_length=3, board_type=board_type, win_length=0)
+
+    def test_bitboard_win(self):
+        g = Game(0, board_type=BitBoard)
+        g.make_move(0, 2, X)
+        g.make_move(0, 1, O)
+        g.make_move(1, 1, X)
+        g.make_move(0, 0, O)
+        r = g.make_move(2, 0, X) # anti-diagonal
+        self.assertEqual(r, Result.X_WINNER)
+        self.assertEqual(str(g.last_move.board), "['O' '.' 'X'], ['O' 'X' '.'], ['X' '.' '.']")
+
+    def test_bitboard_matches_numpy(self):
+        # random games on both backends must agree on every result
+        rng = random.Random(1234)
+        for board_length, win_length in [(1, None), (2, None), (3, None), (4, None), (5, None), (5, 3), (6, 4)]:
+            for _ in range(50):
+                numpy_game = Game(0, board_length=board_length, board_type=Board, win_length=win_length)
+                bit_game = Game(0, board_length=board_length, board_type=BitBoard, win_length=win_length)
+                cells = [(x, y) for x in range(board_length) for y in range(board_length)]
+                rng.shuffle(cells)
+                for i, (x, y) in enumerate(cells):
+                    value = X if i % 2 == 0 else O
+                    r = numpy_game.make_move(x, y, value)
+                    self.assertEqual(bit_game.make_move(x, y, value), r)
+                    self.assertEqual(str(bit_game.last_move.board), str(numpy_game.last_move.board))
+                    if r != Result.ONGOING:
+                        break
+
+    def test_available_coord(self):
+        g = Game(0, board_length=4)
+        taken = set()
+        for _ in range(16):
+            x, y = g.last_move.board.get_available_coord()
+            self.assertNotIn((x, y), taken)
+            taken.add((x, y))
+            g.make_move(x, y, X if len(taken) % 2 else O)
+            if g.last_move.result != Result.ONGOING:
+                break
+        # cloned boards share free cells until one of them is updated
+        board = Board(board_length=3)
+        board.update(1, 1, X)
+        clone = board.clone()
+        clone.update(0, 0, O)
+        board.update(2, 2, O)
+        self.assertEqual(sorted(board._available), [0, 1, 2, 3, 5, 6, 7])
+        self.assertEqual(sorted(clone._available), [1, 2, 3, 5, 6, 7, 8])
+        self.assertRaises(ValueError, clone.update, 0, 0, X)
+
+    def test_board_state_formats(self):
+        for board_type in [Board, BitBoard]:
+            g = Game(0, board_length=2, board_type=board_type)
+            g.make_move(1, 0, X)
+            g.make_move(0, 1, O)
+            m = g.get_moves(2)[0]
+            self.assertEqual(m.board_state(), "['.' 'X'], ['O' '.']")
+            self.assertEqual(m.board_state(FLAT_BOARD), ".XO.")
+            self.assertEqual(m.board_state(ROWS_BOARD), [[".", "X"], ["O", "."]])
+            self.assertRaises(ValueError, m.board_state, "garbage")
+            # renderings are cached on the move
+            self.assertIs(m.board_state(FLAT_BOARD), m.board_state(FLAT_BOARD))
+            self.assertEqual(g.get_moves(1)[0].board_state(FLAT_BOARD), ".X..")
+
+    def test_board_state_cache_bounded(self):
+        g = Game(0, board_length=32, win_length=5)
+        for n in range(100):
+            g.make_move(n % 32, n // 32, X if n % 2 == 0 else O)
+            g.last_move.board_state()
+            g.last_move.board_state(FLAT_BOARD)
+        self.assertEqual(len(g._board_states), MAX_CACHED_BOARD_STATES)
+        # the most recently used renderings are kept
+        m = g.last_move
+        self.assertIs(m.board_state(FLAT_BOARD), m.board_state(FLAT_BOARD))
+        self.assertIn((m.id, LEGACY_BOARD), g._board_states)
+        self.assertEqual(g.get_moves(1)[0].board_state(FLAT_BOARD), "X" + "." * 1023)
+
+    def test_board_state_cache_thread_safe(self):
+        # concurrent reads of a game's moves share its cache
+        g = Game(0, board_length=5)
+        for n in range(12):
+            g.make_move(n % 5, n // 5, X if n % 2 == 0 else O)
+        moves = g.get_moves()
+        errors = list()
+        def read(seed):
+            rng = random.Random(seed)
+            try:
+                for _ in range(2000):
+                    m = moves[rng.randrange(len(moves))]
+                    self.assertTrue(m.board_state(rng.choice([FLAT_BOARD, LEGACY_BOARD])))
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=read, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertLessEqual(len(g._board_states), MAX_CACHED_BOARD_STATES)
+
+    def test_serializer(self):
+        g = Game(0)
+        g.make_move(1, 1, X)
+        self.assertEqual(Serializer().dumps(g), str(g))
+        self.assertEqual(Serializer().dumps_list(g.get_moves()), str(g.get_moves()))
+        compact = Serializer(compact=True, board_format=ROWS_BOARD).dumps_list(g.get_moves())
+        self.assertNotIn(", ", compact)
+        self.assertNotIn("\n", compact)
+        moves = json.loads(compact)
+        self.assertEqual(moves[1]["board_state"][1], [".", "X", "."])
+        self.assertRaises(ValueError, Serializer, board_format="garbage")
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
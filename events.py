@@ -0,0 +1,188 @@
+import asyncio
+import threading
+from collections import deque
+from typing import Dict, Optional, Set
+from serialization import DEFAULT_SERIALIZER, Serializer
+from tic_tac_toe import Game
+
+# seconds between keepalive comments on an idle event stream, so proxies
+# keep the connection open and disconnected clients are noticed
+KEEPALIVE_SECONDS = 15
+
+# the comment sent on an idle event stream
+KEEPALIVE = ": keepalive\n\n"
+
+def sse_event(game: Game, serializer: Serializer) -> str:
+    """Renders a game's current state as a Server-Sent Event.
+
+    The event's ID is the game ID and move ID (e.g. "3-5"), and its data
+    is the Game API object, on a single line.
+
+    Args:
+        game (Game): the game. The caller holds its lock.
+        serializer (Serializer): the Serializer to render the game with (always on a single line)
+
+    Returns:
+        The event, in the text/event-stream format
+    """
+    return f"id: {game.id}-{game.last_move.id}\nevent: game\ndata: {serializer.line().dumps(game)}\n\n"
+
+
+class Subscription:
+    """The Subscription class is a subscriber's queue of events.
+
+    Events are pushed by EventHub.publish, from any thread, and consumed
+    by a single thread with get. Only the latest `max_pending` events are
+    kept: every event holds its game's whole state, so a subscriber that
+    falls behind only misses intermediate states.
+
+    Args:
+        game_id (int): id of the game subscribed to, None for every game
+        serializer (Serializer): how the subscriber's events are rendered
+        max_pending (int): maximum number of events waiting to be consumed
+    """
+
+    game_id: Optional[int]
+    serializer: Serializer
+
+    # events waiting to be consumed, oldest first
+    _events: deque
+
+    def __init__(self, game_id: Optional[int], serializer: Serializer, max_pending: int) -> None:
+        self.game_id = game_id
+        self.serializer = serializer.line()
+        self._events = deque(maxlen=max_pending)
+        self._condition = threading.Condition()
+
+    def push(self, event: str) -> None:
+        """Queues an event (dropping the oldest one if the queue is full)"""
+        with self._condition:
+            self._events.append(event)
+            self._condition.notify()
+
+    def get(self, timeout: float = None) -> Optional[str]:
+        """Waits for the next event
+
+        Args:
+            timeout (float): maximum seconds to wait. Default is None (no limit).
+
+        Returns:
+            The event, None if there was none before the timeout
+        """
+        with self._condition:
+            if not self._events:
+                self._condition.wait(timeout)
+            return self._events.popleft() if self._events else None
+
+
+class AsyncSubscription(Subscription):
+    """A Subscription consumed by a coroutine on an event loop, with get_async.
+
+    Idle subscriptions cost no thread, pushing an event wakes the
+    subscriber's coroutine through its loop.
+
+    Args:
+        loop: the event loop of the subscriber, see Subscription for the others
+    """
+
+    def __init__(self, game_id: Optional[int], serializer: Serializer, max_pending: int,
+            loop: asyncio.AbstractEventLoop) -> None:
+        super().__init__(game_id, serializer, max_pending)
+        self._loop = loop
+        self._ready = asyncio.Event()
+
+    def push(self, event: str) -> None:
+        with self._condition:
+            self._events.append(event)
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            pass # the loop is closed, e.g. the server is shutting down
+
+    async def get_async(self, timeout: float = None) -> Optional[str]:
+        """Waits for the next event, see Subscription.get"""
+        while True:
+            # cleared before checking, so a push in between sets it again
+            self._ready.clear()
+            with self._condition:
+                if self._events:
+                    return self._events.popleft()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+
+
+class EventHub:
+    """The EventHub class fans game updates out to subscribers,
+    of one game or of every game (the "firehose").
+
+    Publishing a game renders its event once per board format its
+    subscribers use, and only pushes it to the subscribers of that game
+    and of the firehose, so idle subscribers (and games nobody watches)
+    cost nothing.
+
+    Args:
+        max_pending (int): maximum number of events waiting per subscriber. Default is 64.
+    """
+
+    max_pending: int
+
+    # the subscriptions of each game ID, None for the firehose
+    _subscriptions: Dict[Optional[int], Set[Subscription]]
+
+    def __init__(self, max_pending: int = 64) -> None:
+        self.max_pending = max_pending
+        self._subscriptions = dict()
+        self._lock = threading.Lock()
+
+    def subscribe(self, game_id: int = None, serializer: Serializer = DEFAULT_SERIALIZER,
+            loop: asyncio.AbstractEventLoop = None) -> Subscription:
+        """Subscribes to the updates of a game, or of every game
+
+        Args:
+            game_id (int): id of the game. Default is None (every game).
+            serializer (Serializer): how to render the events. Default is DEFAULT_SERIALIZER.
+            loop: the subscriber's event loop, to consume the events with a coroutine
+                (see AsyncSubscription). Default is None (consumed by a thread).
+
+        Returns:
+            The Subscription, to unsubscribe once done
+        """
+        if loop is None:
+            subscription = Subscription(game_id, serializer, self.max_pending)
+        else:
+            subscription = AsyncSubscription(game_id, serializer, self.max_pending, loop)
+        with self._lock:
+            self._subscriptions.setdefault(game_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.game_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.game_id]
+
+    def publish(self, game: Game) -> None:
+        """Pushes a game's current state to its subscribers, e.g. after a move
+
+        Args:
+            game (Game): the game. The caller holds its lock.
+        """
+        if game.id not in self._subscriptions and None not in self._subscriptions:
+            return # nobody is watching
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(game.id, ())) + list(self._subscriptions.get(None, ()))
+        events = dict() # by board format
+        for subscription in subscriptions:
+            board_format = subscription.serializer.board_format
+            event = events.get(board_format)
+            if event is None:
+                event = events[board_format] = sse_event(game, subscription.serializer)
+            subscription.push(event)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum([len(subscriptions) for subscriptions in self._subscriptions.values()])
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import unittest
+from events import EventHub, sse_event
+from serialization import Serializer
+from tic_tac_toe import FLAT_BOARD, Game, X, O
+
+class TestEventHub(unittest.TestCase):
+
+    def test_sse_event(self):
+        game = Game(3)
+        game.make_move(0, 0, X)
+        event = sse_event(game, Serializer(board_format=FLAT_BOARD))
+        self.assertTrue(event.startswith("id: 3-1\nevent: game\ndata: {"))
+        self.assertIn('"board_state":"X........"', event)
+        self.assertTrue(event.endswith("}\n\n"))
+        self.assertEqual(event.count("\n"), 4)
+
+    def test_publish(self):
+        hub = EventHub(max_pending=2)
+        game, other = Game(0), Game(1)
+        watcher = hub.subscribe(0)
+        flat_watcher = hub.subscribe(0, Serializer(board_format=FLAT_BOARD))
+        firehose = hub.subscribe()
+        self.assertEqual(len(hub), 3)
+
+        game.make_move(0, 0, X)
+        hub.publish(game)
+        other.make_move(1, 1, O)
+        hub.publish(other)
+        self.assertEqual(watcher.get(0), sse_event(game, Serializer()))
+        self.assertIsNone(watcher.get(0)) # not subscribed to the other game
+        self.assertIn('"X........"', flat_watcher.get(0))
+        self.assertTrue(firehose.get(0).startswith("id: 0-1\n"))
+        self.assertTrue(firehose.get(0).startswith("id: 1-1\n"))
+
+        # subscribers falling behind only keep the latest states
+        for x in (1, 2):
+            game.make_move(x, 0, X)
+            hub.publish(game)
+        hub.publish(game)
+        self.assertTrue(watcher.get(0).startswith("id: 0-3\n"))
+        self.assertTrue(watcher.get(0).startswith("id: 0-3\n"))
+        self.assertIsNone(watcher.get(0))
+
+        for subscription in (watcher, flat_watcher, firehose):
+            hub.unsubscribe(subscription)
+        self.assertEqual(len(hub), 0)
+        hub.publish(game)
+        self.assertIsNone(watcher.get(0))
+
+    def test_get_waits_for_publish(self):
+        hub = EventHub()
+        game = Game(0)
+        subscription = hub.subscribe(0)
+        threading.Timer(0.05, hub.publish, args=(game,)).start()
+        self.assertTrue(subscription.get(5).startswith("id: 0-0\n"))
+        self.assertIsNone(subscription.get(0.01))
+
+    def test_async_subscription(self):
+        hub = EventHub()
+        game = Game(0)
+
+        async def subscribe_and_wait():
+            subscription = hub.subscribe(0, loop=asyncio.get_event_loop())
+            # published from another thread, like the servers' worker threads do
+            threading.Timer(0.05, hub.publish, args=(game,)).start()
+            event = await subscription.get_async(5)
+            return event, await subscription.get_async(0.01)
+        loop = asyncio.new_event_loop()
+        try:
+            event, timed_out = loop.run_until_complete(subscribe_and_wait())
+        finally:
+            loop.close()
+        self.assertTrue(event.startswith("id: 0-0\n"))
+        self.assertIsNone(timed_out)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,234 @@
+import datetime
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+from tic_tac_toe import RESULT_CODES, RESULTS, Game, Result, to_micros
+
+# candidate games checked per acquisition of the index's lock, see GameIndex.game_ids
+_BATCH = 256
+
+class GameFilter(NamedTuple):
+    """A filter on the games listed, e.g. by GET /games.
+    Criteria left to None match every game."""
+
+    # the current Result of the games, e.g. Result.ONGOING
+    result: Optional[Result] = None
+
+    board_length: Optional[int] = None
+
+    # games started at or after this time
+    started_since: Optional[datetime.datetime] = None
+
+    # games whose last move was made at or after this time (a new game's first move is its creation)
+    moved_since: Optional[datetime.datetime] = None
+
+    def matches(self, game: Game) -> bool:
+        """Checks whether a game matches the filter. The caller holds its lock."""
+        last_move = game.last_move
+        return ((self.result is None or last_move.result == self.result)
+            and (self.board_length is None or game.board_length == self.board_length)
+            and (self.started_since is None or game.started >= self.started_since)
+            and (self.moved_since is None or last_move.timestamp >= self.moved_since))
+
+    def __bool__(self) -> bool:
+        """Whether any criterion is set"""
+        return any([criterion is not None for criterion in self])
+
+
+class GameIndex:
+    """The GameIndex class keeps secondary indexes on a store's games, so
+    listings filtered by result, board length, start time or last move time
+    (see GameFilter) visit the games they list rather than every game.
+
+    Games are added in ID order as they are created, and their entries are
+    updated incrementally by the games themselves after each move (see
+    Game.on_move). Each game has a row of compact columns: its result code
+    (see tic_tac_toe.RESULT_CODES), board length, and start and last move
+    times (as microseconds, see tic_tac_toe.to_micros). On top of them:
+
+    - the IDs of the games of each result, and of each board length, are
+      kept in sorted arrays. A game's ID moves between the result arrays
+      once, when it finishes. Games mostly finish in the order they were
+      started, so it goes in near the end of its finished result's array,
+      but it comes out of the ONGOING array wherever it sits, behind the
+      games started since: an O(n) shift of their (8 byte) IDs, a memmove
+      of some 10-20 microseconds per 100,000 ongoing games behind it.
+    - games are started in ID order, so the games started since a time
+      are a range of IDs, found by bisecting the start times.
+    - the IDs are kept from least to most recently moved in an OrderedDict,
+      so the games moved since a time are at its end.
+
+    A filtered listing walks the smallest of the candidate sets of its
+    criteria, from the cursor, and checks the other criteria on the columns.
+
+    Args:
+        shard (int): the shard of the store, see storage.GameStore. Default is 0.
+        shard_count (int): the number of shards. Default is 1 (not sharded).
+    """
+
+    shard: int
+    shard_count: int
+
+    # the columns, by index of the game (see storage.GameStore._index)
+    _results: bytearray
+    _board_lengths: array
+    _started: array
+    _moved: array
+
+    # sorted IDs of the games of each result (by code), and of each board length
+    _by_result: List[array]
+    _by_board_length: Dict[int, array]
+
+    # IDs of the games, from least to most recently moved
+    _recent: 'OrderedDict[int, None]'
+
+    def __init__(self, shard: int = 0, shard_count: int = 1) -> None:
+        self.shard = shard
+        self.shard_count = shard_count
+        self._results = bytearray()
+        self._board_lengths = array("i")
+        self._started = array("q")
+        self._moved = array("q")
+        self._by_result = [array("q") for _ in RESULTS]
+        self._by_board_length = dict()
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, game: Game) -> None:
+        """Adds a new game, after the games already indexed
+
+        Args:
+            game (Game): the game. The caller holds its lock.
+
+        Raises:
+            ValueError: If the game is not the next one, in ID order
+        """
+        last_move = game.last_move
+        self.extend([(game.id, game.board_length, to_micros(game.started),
+            RESULT_CODES[last_move.result], to_micros(last_move.timestamp))])
+
+    def extend(self, rows: Iterable[tuple]) -> None:
+        """Adds games, after the games already indexed, e.g. when a store is restored
+
+        Args:
+            rows: the ID, board length, start time, result code and last move time of each game,
+                in ID order, with times in microseconds. The games must have been moved more
+                recently than the games already indexed.
+
+        Raises:
+            ValueError: If a game is not the next one, in ID order
+        """
+        with self._lock:
+            moved = list()
+            for game_id, board_length, started, result, last_moved in rows:
+                if game_id != len(self._results) * self.shard_count + self.shard:
+                    raise ValueError("Games must be indexed in ID order")
+                self._results.append(result)
+                self._board_lengths.append(board_length)
+                self._started.append(started)
+                self._moved.append(last_moved)
+                self._by_result[result].append(game_id)
+                self._by_board_length.setdefault(board_length, array("q")).append(game_id)
+                moved.append((last_moved, game_id))
+            moved.sort()
+            for _, game_id in moved:
+                self._recent[game_id] = None
+
+    def update(self, game: Game) -> None:
+        """Updates a game's entry after a move, see Game.on_move
+
+        Args:
+            game (Game): the game. The caller holds its lock.
+        """
+        index = game.id // self.shard_count
+        last_move = game.last_move
+        result = RESULT_CODES[last_move.result]
+        with self._lock:
+            if index >= len(self._results):
+                return # not indexed yet, e.g. being restored
+            previous = self._results[index]
+            if result != previous:
+                ids = self._by_result[previous]
+                del ids[bisect_left(ids, game.id)]
+                insort(self._by_result[result], game.id)
+                self._results[index] = result
+            self._moved[index] = to_micros(last_move.timestamp)
+            self._recent.move_to_end(game.id)
+
+    def game_ids(self, start: int = 0, game_filter: GameFilter = GameFilter()) -> Iterator[int]:
+        """Iterates over the IDs of the games matching a filter, in order.
+
+        IDs are produced lazily, a batch at a time, so games can be
+        created and moved meanwhile (games created after the listing
+        started may be left out).
+
+        Args:
+            start (int): only games with an ID of at least `start` are returned. Default is 0.
+            game_filter (GameFilter): the filter. Default is GameFilter() (every game).
+
+        Returns:
+            An iterator of game IDs
+        """
+        result = None if game_filter.result is None else RESULT_CODES[game_filter.result]
+        board_length = game_filter.board_length
+        started = None if game_filter.started_since is None else to_micros(game_filter.started_since)
+        moved = None if game_filter.moved_since is None else to_micros(game_filter.moved_since)
+        with self._lock:
+            candidates = self._candidates(start, result, board_length, started, moved)
+        while True:
+            with self._lock:
+                # the candidates may be one of the index's arrays, changing meanwhile
+                first = bisect_left(candidates, start)
+                batch = candidates[first:first + _BATCH]
+                matches = [game_id for game_id in batch
+                    if self._matches(game_id // self.shard_count, result, board_length, started, moved)]
+            yield from matches
+            if len(batch) < _BATCH:
+                return
+            start = batch[-1] + 1
+
+    def _candidates(self, start: int, result: Optional[int], board_length: Optional[int],
+            started: Optional[int], moved: Optional[int]):
+        """Gets the smallest sorted sequence of IDs holding every game matching the criteria.
+        The caller holds the lock."""
+        # the games started since a time, or else every game, as a range of IDs
+        first = 0 if started is None else bisect_left(self._started, started)
+        first = max(first, -((self.shard - start) // self.shard_count))
+        count = len(self._results)
+        candidates = range(first * self.shard_count + self.shard, count * self.shard_count, self.shard_count)
+        sources = list()
+        if result is not None:
+            sources.append(self._by_result[result])
+        if board_length is not None:
+            sources.append(self._by_board_length.get(board_length, array("q")))
+        size = len(candidates)
+        for ids in sources:
+            ids_size = len(ids) - bisect_left(ids, start)
+            if ids_size < size:
+                candidates, size = ids, ids_size
+        if moved is not None:
+            # the games moved since the time, unless there are more than candidates already
+            recent = list()
+            for walked, game_id in enumerate(reversed(self._recent)):
+                if self._moved[game_id // self.shard_count] < moved:
+                    return sorted(recent)
+                if walked >= size:
+                    break
+                if game_id >= start:
+                    recent.append(game_id)
+            else:
+                return sorted(recent)
+        return candidates
+
+    def _matches(self, index: int, result: Optional[int], board_length: Optional[int],
+            started: Optional[int], moved: Optional[int]) -> bool:
+        """Checks a game's columns against the criteria. The caller holds the lock."""
+        return ((result is None or self._results[index] == result)
+            and (board_length is None or self._board_lengths[index] == board_length)
+            and (started is None or self._started[index] >= started)
+            and (moved is None or self._moved[index] >= moved))
+
+    def __len__(self) -> int:
+        return len(self._results)
@@ -0,0 +1,50 @@
+import random
+import unittest
+from game_index import GameFilter, GameIndex
+from tic_tac_toe import RESULT_CODES, Game, Result, X, O, to_micros
+
+class TestGameIndex(unittest.TestCase):
+
+    def test_game_ids(self):
+        rng = random.Random(0)
+        index = GameIndex(shard=1, shard_count=3)
+        games = list()
+        for i in range(300):
+            game = Game(i * 3 + 1, rng.choice([3, 4]))
+            game.on_move = index.update
+            index.add(game)
+            games.append(game)
+        for _ in range(1500):
+            game = rng.choice(games)
+            if game.last_move.result == Result.ONGOING:
+                game.make_computer_move(rng.choice([X, O]))
+        self.assertEqual(len(index), 300)
+
+        # the indexes list the same games as checking every game
+        moved = sorted([g.last_move.timestamp for g in games])
+        filters = [GameFilter(), GameFilter(result=Result.ONGOING), GameFilter(result=Result.DRAW, board_length=3),
+            GameFilter(board_length=4, started_since=games[100].started), GameFilter(moved_since=moved[250]),
+            GameFilter(moved_since=moved[10], result=Result.X_WINNER)]
+        for game_filter in filters:
+            for start in (0, 299, 301, 900):
+                expected = [g.id for g in games if g.id >= start and game_filter.matches(g)]
+                self.assertEqual(list(index.game_ids(start, game_filter)), expected)
+        self.assertFalse(GameFilter())
+        self.assertTrue(GameFilter(board_length=3))
+
+    def test_extend(self):
+        index = GameIndex()
+        game = Game(0)
+        started = to_micros(game.started)
+        draw = (0, 3, started, RESULT_CODES[Result.DRAW], started + 10)
+        ongoing = (1, 4, started, RESULT_CODES[Result.ONGOING], started)
+        self.assertRaises(ValueError, index.extend, [ongoing]) # not the next game
+        index.extend([draw, ongoing])
+        self.assertEqual(list(index.game_ids(0, GameFilter(result=Result.DRAW))), [0])
+        self.assertEqual(list(index.game_ids(0, GameFilter(board_length=4))), [1])
+        # ordered by last move, the draw was moved last
+        self.assertEqual(list(index._recent), [1, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,280 @@
+import argparse
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+import requests
+from local_server import SERVER_COMMANDS, start_local_server
+
+# the "ongoing" game state, see tic_tac_toe.Result
+ONGOING = "Game still ongoing"
+
+# endpoints whose latencies are reported, as "METHOD /path"
+ENDPOINTS = ("POST /games", "POST /moves", "GET /games", "GET /moves")
+
+# reported latency percentiles
+PERCENTILES = (50, 95, 99)
+
+# cells of a board, in the server's (legacy) board_state rendering
+CELL_PATTERN = re.compile(r"'(.)'")
+
+class Recorder:
+    """The Recorder class collects the latencies of one client thread's requests.
+
+    Attributes:
+        latencies (dict): the latencies (in seconds) of each endpoint's requests
+        errors (int): the number of failed requests, i.e. server errors
+            (5xx) or requests that got no response
+        rejected (int): the number of requests rejected by the server (4xx)
+    """
+
+    latencies: dict
+    errors: int
+    rejected: int
+
+    def __init__(self) -> None:
+        self.latencies = {endpoint: list() for endpoint in ENDPOINTS}
+        self.errors = 0
+        self.rejected = 0
+
+    def request(self, session: requests.Session, method: str, base_url: str, path: str, **kwargs) -> requests.Response:
+        """Makes a request, recording its latency
+
+        Returns:
+            The Response, None if the request failed
+        """
+        start = time.perf_counter()
+        try:
+            r = session.request(method, base_url + path, **kwargs)
+        except requests.RequestException:
+            self.errors += 1
+            return None
+        self.latencies[method + " " + path].append(time.perf_counter() - start)
+        if r.status_code >= 500:
+            self.errors += 1
+            return None
+        if r.status_code >= 400:
+            self.rejected += 1
+        return r
+
+def parse_boards(boards: str) -> list:
+    """Parses the board sizes games are played on
+
+    Args:
+        boards: comma separated board lengths, each optionally followed by
+            ":" and a win length, e.g. "3,3,3,15:5". Every game picks one
+            at random, so repeating a size makes it more frequent.
+
+    Returns:
+        A list of (board_length, win_length) tuples, win_length None by default
+    """
+    parsed = list()
+    for board in boards.split(","):
+        board_length, _, win_length = board.partition(":")
+        parsed.append((int(board_length), int(win_length) if win_length else None))
+    return parsed
+
+def play_game(session: requests.Session, base_url: str, recorder: Recorder, rng: random.Random,
+        board_length: int = 3, win_length: int = None, read_ratio: float = 0.2, deadline: float = None) -> None:
+    """Plays a game against the server, as the user (X), like a client app would.
+
+    Each move is played on a random free cell of the board last returned
+    by the server. After each move the client may also read, with
+    probability `read_ratio`: its game, a page of the game listing
+    or its game's moves.
+
+    Args:
+        session: the requests Session to use (keeps the connection alive)
+        base_url: the server's URL
+        recorder: records the requests' latencies
+        rng: the client's random generator
+        board_length: the board length of the game
+        win_length: the win length of the game. Default is None (a full line).
+        read_ratio: the probability of a read after each move. Default is 0.2.
+        deadline: when to give up the game, a time.perf_counter() value. Default is None.
+    """
+    params = {"board_length": board_length}
+    if win_length is not None:
+        params["win_length"] = win_length
+    r = recorder.request(session, "POST", base_url, "/games", params=params)
+    if r is None:
+        return
+    game = r.json()
+    game_id = game["game_id"]
+    while game["game_state"] == ONGOING and (deadline is None or time.perf_counter() < deadline):
+        free = [n for n, cell in enumerate(CELL_PATTERN.findall(game["board_state"])) if cell == "."]
+        n = rng.choice(free)
+        r = recorder.request(session, "POST", base_url, "/moves",
+            params={"game_id": game_id}, data={"x": n % board_length, "y": n // board_length})
+        if r is None:
+            return
+        if r.status_code == 200:
+            game = r.json()
+
+        if rng.random() < read_ratio:
+            read = rng.randrange(3)
+            if read == 0:
+                recorder.request(session, "GET", base_url, "/games", params={"game_id": game_id})
+            elif read == 1:
+                recorder.request(session, "GET", base_url, "/games", params={"cursor": rng.randrange(game_id + 1), "limit": 20})
+            else:
+                recorder.request(session, "GET", base_url, "/moves", params={"game_id": game_id})
+
+def percentile(values: list, p: float) -> float:
+    """Gets a percentile (nearest rank) of sorted values"""
+    rank = max(1, math.ceil(p / 100 * len(values)))
+    return values[rank - 1]
+
+def latency_stats(latencies: list) -> dict:
+    """Summarizes latencies (in seconds) as milliseconds stats
+
+    Returns:
+        The count, mean, max and PERCENTILES of the latencies, as a dict
+    """
+    if len(latencies) == 0:
+        return {"count": 0}
+    latencies = sorted(latencies)
+    stats = {"count": len(latencies), "mean_ms": round(1000 * sum(latencies) / len(latencies), 3)}
+    for p in PERCENTILES:
+        stats[f"p{p}_ms"] = round(1000 * percentile(latencies, p), 3)
+    stats["max_ms"] = round(1000 * latencies[-1], 3)
+    return stats
+
+def run(base_url: str, threads: int, duration: float, boards: list = ((3, None),),
+        read_ratio: float = 0.2, seed: int = 0) -> dict:
+    """Plays games against the server from several threads, for a given duration.
+
+    Each thread keeps its connection alive, and plays one game at a time.
+
+    Args:
+        base_url: the server's URL
+        threads: the number of client threads (concurrency)
+        duration: how long to run for, in seconds
+        boards: the (board_length, win_length) tuples games are played on, see parse_boards
+        read_ratio: the probability of a read after each move, see play_game
+        seed: seed of the clients' random generators, for repeatable runs
+
+    Returns:
+        The run's stats (throughput and latencies), as a dict
+    """
+    recorders = [Recorder() for _ in range(threads)]
+    deadline = time.perf_counter() + duration
+
+    def worker(i):
+        rng = random.Random(seed * 1000003 + i)
+        with requests.Session() as session:
+            while time.perf_counter() < deadline:
+                board_length, win_length = rng.choice(boards)
+                play_game(session, base_url, recorders[i], rng, board_length, win_length, read_ratio, deadline)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = {endpoint: [t for r in recorders for t in r.latencies[endpoint]] for endpoint in ENDPOINTS}
+    all_latencies = [t for endpoint in ENDPOINTS for t in latencies[endpoint]]
+    stats = {
+        "threads": threads,
+        "requests": len(all_latencies),
+        "errors": sum(r.errors for r in recorders),
+        "rejected": sum(r.rejected for r in recorders),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(all_latencies) / elapsed, 1),
+        "latency": {"all": latency_stats(all_latencies)},
+    }
+    for endpoint in ENDPOINTS:
+        stats["latency"][endpoint] = latency_stats(latencies[endpoint])
+    return stats
+
+def compare(results: list, baseline: list, tolerance: float = 0.2) -> list:
+    """Compares runs with the same runs of a baseline report
+
+    Runs are matched by server and threads. A run regressed if its
+    throughput dropped, or its overall p95 or p99 latency grew, by more
+    than the tolerance; or if it had errors.
+
+    Args:
+        results: the runs' stats, see run
+        baseline: the baseline runs' stats
+        tolerance: the allowed relative change. Default is 0.2 (20%).
+
+    Returns:
+        A list of regressions, as str (empty if none)
+    """
+    baseline_runs = {(b.get("server"), b["threads"]): b for b in baseline}
+    regressions = list()
+    for result in results:
+        name = f"{result.get('server', 'server')} with {result['threads']} threads"
+        if result["errors"] > 0:
+            regressions.append(f"{name}: {result['errors']} errors")
+        before = baseline_runs.get((result.get("server"), result["threads"]))
+        if before is None:
+            continue
+        if result["requests_per_second"] < before["requests_per_second"] * (1 - tolerance):
+            regressions.append(f"{name}: {result['requests_per_second']} requests/s, was {before['requests_per_second']}")
+        for p in PERCENTILES[1:]:
+            key = f"p{p}_ms"
+            now, then = result["latency"]["all"].get(key), before["latency"]["all"].get(key)
+            if now is not None and then is not None and now > then * (1 + tolerance):
+                regressions.append(f"{name}: p{p} latency {now}ms, was {then}ms")
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure server throughput and latency as client threads are added.")
+    parser.add_argument("--url", help="URL of a running server. By default local servers are started, see --servers.")
+    parser.add_argument("--servers", default="flask", help=f"comma separated servers to start and compare, of {', '.join(SERVER_COMMANDS)}")
+    parser.add_argument("--threads", default="1,2,4,8", help="comma separated client thread counts to run")
+    parser.add_argument("--duration", type=float, default=5, help="seconds to run each thread count for")
+    parser.add_argument("--boards", default="3", help="comma separated board lengths games are played on, "
+        "each optionally with a win length, e.g. 3,3,3,15:5 (picked at random for each game)")
+    parser.add_argument("--read-ratio", type=float, default=0.2, help="probability of a read (GET) after each move")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--baseline", help="report to compare with; exits with status 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative change allowed by --baseline")
+    args = parser.parse_args()
+
+    boards = parse_boards(args.boards)
+    thread_counts = [int(t) for t in args.threads.split(",")]
+    results = list()
+    if args.url is not None:
+        results = [run(args.url, t, args.duration, boards, args.read_ratio, args.seed) for t in thread_counts]
+    else:
+        # every server is measured at the same client concurrency
+        for kind in args.servers.split(","):
+            process, base_url = start_local_server(kind)
+            try:
+                for t in thread_counts:
+                    result = {"server": kind}
+                    result.update(run(base_url, t, args.duration, boards, args.read_ratio, args.seed))
+                    results.append(result)
+            finally:
+                process.terminate()
+                process.wait()
+    report = {
+        "config": {
+            "boards": args.boards,
+            "read_ratio": args.read_ratio,
+            "duration": args.duration,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+    json.dump(report, sys.stdout, indent=4)
+    print()
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+        for regression in regressions:
+            print("regression: " + regression, file=sys.stderr)
+        sys.exit(1 if regressions else 0)
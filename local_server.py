@@ -0,0 +1,53 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+import requests
+
+# Starts the servers (server.py and asgi_server.py) in child processes,
+# for the tools driving them: load_test.py and shard_router.py
+
+# commands serving the app on a port, by server kind:
+# the flask app (server.py) with its threaded development server,
+# and the ASGI app (asgi_server.py) with uvicorn
+SERVER_COMMANDS = {
+    "flask": lambda port: [sys.executable, "-m", "flask", "run", "--port", str(port)],
+    "asgi": lambda port: [sys.executable, "-m", "uvicorn", "asgi_server:app", "--port", str(port), "--log-level", "warning"],
+}
+
+def start_local_server(kind: str = "flask", timeout: float = 30, env: dict = None):
+    """Starts a web server in a child process, on a free local port.
+
+    The server runs in its own process, so it doesn't compete with
+    its clients (e.g. load_test.py's threads) for the GIL, and the
+    flask and ASGI apps are run alike. Its output is discarded.
+
+    Args:
+        kind: the kind of server, see SERVER_COMMANDS. Default is "flask".
+        timeout: how long to wait for the server to answer, in seconds
+        env: extra environment variables of the server, e.g. its SHARD. Default is None.
+
+    Returns:
+        The server process (call `terminate()` to stop it) and its URL
+
+    Raises:
+        RuntimeError: If the server doesn't answer in time
+    """
+    with socket.socket() as s: # let the OS pick a free port
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = dict(os.environ, FLASK_APP="server.py", **(env or {}))
+    directory = os.path.dirname(os.path.abspath(__file__))
+    process = subprocess.Popen(SERVER_COMMANDS[kind](port), cwd=directory, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            requests.get(base_url + "/games", params={"limit": 1})
+            return process, base_url
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"The {kind} server didn't start")
@@ -0,0 +1,255 @@
+import bisect
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+from functools import wraps
+from typing import Callable, Dict, List, Tuple
+
+# upper bounds (in seconds) of the latency histograms' buckets,
+# from 10µs (e.g. a win check) to 10s (e.g. a slow search)
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# the content type of the Prometheus text format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class Histogram:
+    """The Histogram class aggregates observations (e.g. latencies) into buckets,
+    one series per combination of label values, like a Prometheus histogram.
+
+    Observing is a bisect and a few increments under a lock, so histograms
+    are cheap enough to be updated on every request.
+
+    Args:
+        name (str): the metric name
+        help (str): the metric description
+        label_names (tuple): the names of the labels. Default is no labels.
+        buckets (tuple): the sorted upper bounds of the buckets.
+            Default is LATENCY_BUCKETS. An implicit +Inf bucket follows.
+    """
+
+    name: str
+    help: str
+    label_names: Tuple[str]
+    buckets: Tuple[float]
+
+    # bucket counts (not cumulative, the last one is +Inf), sum and count of each series
+    _series: Dict[tuple, list]
+
+    def __init__(self, name: str, help: str, label_names: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = dict()
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values) -> None:
+        """Records an observation
+
+        Args:
+            value (float): the observed value
+            label_values: the value of each label, in the order of label_names
+        """
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *label_values) -> int:
+        """Gets the number of observations of a series"""
+        with self._lock:
+            series = self._series.get(label_values)
+            return 0 if series is None else series[2]
+
+    def render(self) -> List[str]:
+        """Renders the histogram in the Prometheus text format
+
+        Returns:
+            The lines of the histogram
+        """
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, counts, total, count in sorted(series):
+            label_text = ",".join([f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels)])
+            separator = "," if label_text else ""
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{label_text}{separator}le="{le}"}} {cumulative}')
+            suffix = "{" + label_text + "}" if label_text else ""
+            lines.append(f"{self.name}_sum{suffix} {total!r}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+class Registry:
+    """The Registry class holds the metrics exposed together, e.g. on /metrics"""
+
+    _metrics: List[Histogram]
+
+    def __init__(self) -> None:
+        self._metrics = list()
+
+    def histogram(self, name: str, help: str, label_names: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        """Creates and registers a Histogram, see Histogram"""
+        histogram = Histogram(name, help, label_names, buckets)
+        self._metrics.append(histogram)
+        return histogram
+
+    def render(self) -> str:
+        """Renders every metric in the Prometheus text format"""
+        return "\n".join([line for metric in self._metrics for line in metric.render()]) + "\n"
+
+
+# the metrics of this process
+REGISTRY = Registry()
+
+# time spent in each instrumented operation, see timer and timed
+OPERATION_SECONDS = REGISTRY.histogram("tictactoe_operation_seconds",
+    "Time spent in server operations, e.g. parsing, game lookup, moves and serialization.", ("operation",))
+
+# time spent serving each request, until the response starts
+REQUEST_SECONDS = REGISTRY.histogram("tictactoe_request_seconds",
+    "Time spent serving HTTP requests, until the response starts.", ("method", "endpoint", "status"))
+
+class timer:
+    """Context manager timing an operation into OPERATION_SECONDS, e.g.
+
+        with timer("make_move"):
+            game.make_move(x, y, value)
+
+    The operation is timed whether or not it raises.
+
+    Args:
+        operation (str): the operation name
+    """
+
+    __slots__ = ("operation", "start")
+
+    def __init__(self, operation: str) -> None:
+        self.operation = operation
+
+    def __enter__(self) -> 'timer':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        OPERATION_SECONDS.observe(time.perf_counter() - self.start, self.operation)
+
+def timed(operation: str) -> Callable:
+    """Decorator timing every call of a function into OPERATION_SECONDS
+
+    Args:
+        operation (str): the operation name
+    """
+    def decorator(function: Callable) -> Callable:
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                OPERATION_SECONDS.observe(time.perf_counter() - start, operation)
+        return wrapper
+    return decorator
+
+
+class SlowRequestProfiler:
+    """The SlowRequestProfiler class finds where slow requests spend their time.
+
+    While requests are being served, a background thread samples the stacks
+    of the threads serving them every `interval` seconds. When a request
+    took longer than `threshold` seconds, its most sampled stacks are logged
+    (as a warning, one "file:function:line;..." stack per line, from the
+    outermost frame, with its number of samples).
+
+    Requests must be served by a single thread, from start_request
+    to end_request. Sampling costs a little CPU while requests are served,
+    so the profiler is opt-in.
+
+    Args:
+        threshold (float): the duration of a slow request, in seconds
+        interval (float): the time between samples, in seconds. Default is 0.005.
+        max_stacks (int): the number of stacks logged per slow request. Default is 10.
+    """
+
+    threshold: float
+    interval: float
+    max_stacks: int
+
+    # the sampled stacks of each thread serving a request, by thread ID
+    _requests: Dict[int, Counter]
+
+    def __init__(self, threshold: float, interval: float = 0.005, max_stacks: int = 10) -> None:
+        self.threshold = threshold
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self._requests = dict()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start_request(self) -> None:
+        """Starts sampling the calling thread, for the request it serves"""
+        self._requests[threading.get_ident()] = Counter()
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None: # started on first use
+                    self._thread = threading.Thread(target=self._sample, name="slow-request-profiler", daemon=True)
+                    self._thread.start()
+
+    def end_request(self, name: str, duration: float) -> List[tuple]:
+        """Stops sampling the calling thread, and logs its hot stacks if the request was slow
+
+        Args:
+            name (str): the request, as logged, e.g. "POST /moves"
+            duration (float): how long the request took, in seconds
+
+        Returns:
+            The hot stacks, a list of (stack, samples) tuples
+            (empty if the request wasn't slow)
+        """
+        samples = self._requests.pop(threading.get_ident(), None)
+        if samples is None or duration < self.threshold:
+            return list()
+        stacks = samples.most_common(self.max_stacks)
+        logging.warning("Slow request %s took %.3fs, %d samples. Hot stacks:\n%s", name, duration,
+            sum(samples.values()), "\n".join([f"{count} {stack}" for stack, count in stacks]))
+        return stacks
+
+    def _sample(self) -> None:
+        """Samples the stacks of the threads serving requests, forever"""
+        while True:
+            time.sleep(self.interval)
+            if not self._requests:
+                continue
+            frames = sys._current_frames()
+            for thread_id, samples in list(self._requests.items()):
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    samples[_stack(frame)] += 1
+
+
+def _stack(frame) -> str:
+    """Renders a stack, from the outermost frame"""
+    stack = list()
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_filename}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+def _escape(value) -> str:
+    """Escapes a label value for the Prometheus text format"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
@@ -0,0 +1,55 @@
+import logging
+import time
+import unittest
+from metrics import Histogram, Registry, SlowRequestProfiler, timed, timer, OPERATION_SECONDS
+
+class TestMetrics(unittest.TestCase):
+
+    def test_histogram(self):
+        histogram = Histogram("test_seconds", "Test latencies.", ("operation",), buckets=(0.001, 0.01))
+        for value in [0.0005, 0.001, 0.005, 1.0]:
+            histogram.observe(value, "move")
+        histogram.observe(0.002, 'say "hi"')
+        self.assertEqual(histogram.count("move"), 4)
+        lines = histogram.render()
+        self.assertEqual(lines[:2], ["# HELP test_seconds Test latencies.", "# TYPE test_seconds histogram"])
+        # buckets are cumulative, and upper bounds are inclusive
+        self.assertIn('test_seconds_bucket{operation="move",le="0.001"} 2', lines)
+        self.assertIn('test_seconds_bucket{operation="move",le="0.01"} 3', lines)
+        self.assertIn('test_seconds_bucket{operation="move",le="+Inf"} 4', lines)
+        self.assertIn('test_seconds_sum{operation="move"} 1.0065', lines)
+        self.assertIn('test_seconds_count{operation="move"} 4', lines)
+        self.assertIn('test_seconds_count{operation="say \\"hi\\""} 1', lines)
+
+        registry = Registry()
+        registry.histogram("unlabeled_seconds", "No labels.").observe(0.5)
+        self.assertIn("unlabeled_seconds_count 1\n", registry.render())
+
+    def test_timers(self):
+        before = OPERATION_SECONDS.count("test_timer")
+        with timer("test_timer"):
+            pass
+        self.assertRaises(ValueError, timed("test_timer")(int), "garbage")
+        self.assertEqual(OPERATION_SECONDS.count("test_timer"), before + 2)
+
+    def test_slow_request_profiler(self):
+        profiler = SlowRequestProfiler(threshold=0.05, interval=0.001)
+        profiler.start_request()
+        self.assertEqual(profiler.end_request("GET /fast", 0.001), [])
+
+        def slow_operation():
+            deadline = time.perf_counter() + 0.1
+            while time.perf_counter() < deadline:
+                pass
+        profiler.start_request()
+        start = time.perf_counter()
+        slow_operation()
+        with self.assertLogs(level=logging.WARNING) as logs:
+            stacks = profiler.end_request("GET /slow", time.perf_counter() - start)
+        self.assertGreater(len(stacks), 0)
+        self.assertIn("slow_operation", stacks[0][0])
+        self.assertIn("GET /slow", logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
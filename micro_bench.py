@@ -0,0 +1,275 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Callable, List
+import numpy as np
+from tic_tac_toe import BOARD_BACKENDS, Game, Result, X, O
+
+# board lengths benchmarked by default
+DEFAULT_BOARD_LENGTHS = "3,10,100,1000"
+
+# the bitboard backend is meant for small boards, its bitmasks
+# (and cached line masks) grow with the square of the board length
+BITBOARD_MAX_BOARD_LENGTH = 100
+
+# win length of the "k in a row" benchmarks (capped by the board length)
+K_IN_A_ROW = 5
+
+# cells filled on boards that are benchmarked part way through a game
+MAX_FILLED_CELLS = 10000
+
+def _cells(board_length: int, count: int, rng: random.Random) -> List[tuple]:
+    """Gets random distinct (x, y) coordinates"""
+    return [(n % board_length, n // board_length) for n in rng.sample(range(board_length * board_length), count)]
+
+def _filled_board(board_type: type, board_length: int, rng: random.Random, win_length: int = None):
+    """Gets a board part way through a game, and its filled cells with their values.
+    The players alternate on random cells, whether or not a line was completed."""
+    board = board_type(board_length=board_length, win_length=win_length)
+    filled = list()
+    for i, (x, y) in enumerate(_cells(board_length, min(board_length * board_length // 2, MAX_FILLED_CELLS), rng)):
+        value = X if i % 2 == 0 else O
+        board.update(x, y, value)
+        filled.append((x, y, value))
+    return board, filled
+
+def bench_update(board_type: type, board_length: int, number: int, rng: random.Random) -> float:
+    """Board.update, filling fresh boards"""
+    elapsed = 0.0
+    done = 0
+    while done < number:
+        board = board_type(board_length=board_length)
+        cells = _cells(board_length, min(number - done, board_length * board_length), rng)
+        start = time.perf_counter()
+        for x, y in cells:
+            board.update(x, y, X)
+        elapsed += time.perf_counter() - start
+        done += len(cells)
+    return elapsed
+
+def _bench_check_winner(board_type: type, board_length: int, number: int, rng: random.Random, win_length: int = None) -> float:
+    board, filled = _filled_board(board_type, board_length, rng, win_length)
+    checks = [filled[i % len(filled)] for i in range(number)]
+    start = time.perf_counter()
+    for x, y, value in checks:
+        board.check_winner(x, y, value)
+    return time.perf_counter() - start
+
+def bench_check_winner(board_type: type, board_length: int, number: int, rng: random.Random) -> float:
+    """Board.check_winner of moves on a half filled board, a full line to win"""
+    return _bench_check_winner(board_type, board_length, number, rng)
+
+def bench_check_winner_k(board_type: type, board_length: int, number: int, rng: random.Random) -> float:
+    """Board.check_winner of moves on a half filled board, K_IN_A_ROW to win"""
+    return _bench_check_winner(board_type, board_length, number, rng, min(K_IN_A_ROW, board_length))
+
+def bench_get_available_coord(board_type: type, board_length: int, number: int, rng: random.Random) -> float:
+    """Board.get_available_coord on a half filled board"""
+    board, _ = _filled_board(board_type, board_length, rng)
+    start = time.perf_counter()
+    for _ in range(number):
+        board.get_available_coord()
+    return time.perf_counter() - start
+
+def bench_clone(board_type: type, board_length: int, number: int, rng: random.Random) -> float:
+    """Board.clone of a half filled board"""
+    board, _ = _filled_board(board_type, board_length, rng)
+    start = time.perf_counter()
+    for _ in range(number):
+        board.clone()
+    return time.perf_counter() - start
+
+def bench_make_move(board_type: type, board_length: int, number: int, rng: random.Random) -> float:
+    """Game.make_move, i.e. a move and its record in the game's history"""
+    elapsed = 0.0
+    done = 0
+    while done < number:
+        game = Game(0, board_length, board_type=board_type)
+        cells = _cells(board_length, min(number - done, board_length * board_length), rng)
+        start = time.perf_counter()
+        for i, (x, y) in enumerate(cells):
+            if game.make_move(x, y, X if i % 2 == 0 else O) != Result.ONGOING:
+                break
+        elapsed += time.perf_counter() - start
+        done += i + 1
+    return elapsed
+
+def bench_computer_game(board_type: type, board_length: int, number: int, rng: random.Random) -> float:
+    """Game.make_computer_move (random strategy) over full games, per move"""
+    elapsed = 0.0
+    done = 0
+    while done < number:
+        game = Game(0, board_length, board_type=board_type)
+        value = X
+        start = time.perf_counter()
+        while done < number and game.last_move.result == Result.ONGOING:
+            game.make_computer_move(value)
+            value = O if value == X else X
+            done += 1
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+def bench_move_history(board_type: type, board_length: int, number: int, rng: random.Random) -> float:
+    """Move.board of a past move, rebuilt from the nearest snapshot"""
+    game = Game(0, board_length, board_type=board_type)
+    for i, (x, y) in enumerate(_cells(board_length, min(board_length * board_length - 1, 2 * board_length), rng)):
+        if game.make_move(x, y, X if i % 2 == 0 else O) != Result.ONGOING:
+            break
+    moves = game.get_moves()
+    ids = [rng.randrange(len(moves)) for _ in range(number)]
+    start = time.perf_counter()
+    for i in ids:
+        moves[i].board
+    return time.perf_counter() - start
+
+def bench_board_str(board_type: type, board_length: int, number: int, rng: random.Random) -> float:
+    """Board.__str__, i.e. the legacy board rendering"""
+    board, _ = _filled_board(board_type, board_length, rng)
+    start = time.perf_counter()
+    for _ in range(number):
+        str(board)
+    return time.perf_counter() - start
+
+def bench_game_str(board_type: type, board_length: int, number: int, rng: random.Random) -> float:
+    """Game.__str__, i.e. the Game API object (renderings are cached per move)"""
+    game = Game(0, board_length, board_type=board_type)
+    game.make_move(0, 0, X)
+    start = time.perf_counter()
+    for _ in range(number):
+        str(game)
+    return time.perf_counter() - start
+
+# the benchmarks, by name. each times `number` operations and returns the seconds taken
+BENCHMARKS = {
+    "update": bench_update,
+    "check_winner": bench_check_winner,
+    "check_winner_k": bench_check_winner_k,
+    "get_available_coord": bench_get_available_coord,
+    "clone": bench_clone,
+    "make_move": bench_make_move,
+    "computer_game": bench_computer_game,
+    "move_history": bench_move_history,
+    "board_str": bench_board_str,
+    "game_str": bench_game_str,
+}
+
+def measure(bench: Callable, board_type: type, board_length: int, min_time: float = 0.05, repeat: int = 3, seed: int = 0) -> dict:
+    """Times a benchmark's operations, like timeit does.
+
+    The number of operations is raised (1, 2, 5, 10, 20, ...) until they
+    take at least `min_time`, then they are timed `repeat` times.
+
+    Args:
+        bench: the benchmark, see BENCHMARKS
+        board_type: the Board backend
+        board_length: the board length
+        min_time: the minimum time of a sample, in seconds. Default is 0.05.
+        repeat: the number of samples. Default is 3.
+        seed: seed of the random cells. Default is 0.
+
+    Returns:
+        The time per operation (best and median of the samples, in ns)
+        and the number of operations per sample, as a dict
+    """
+    rng = random.Random(seed)
+    number = 1
+    while True:
+        for multiple in (1, 2, 5):
+            elapsed = bench(board_type, board_length, number * multiple, rng)
+            if elapsed >= min_time:
+                number *= multiple
+                break
+        else:
+            number *= 10
+            continue
+        break
+    samples = [elapsed] + [bench(board_type, board_length, number, rng) for _ in range(repeat - 1)]
+    return {
+        "ns_per_op": round(1e9 * min(samples) / number, 1),
+        "median_ns_per_op": round(1e9 * statistics.median(samples) / number, 1),
+        "ops": number,
+    }
+
+def run(benchmarks: List[str], backends: List[str], board_lengths: List[int],
+        min_time: float = 0.05, repeat: int = 3, seed: int = 0) -> List[dict]:
+    """Runs benchmarks on every backend and board length
+
+    Returns:
+        The results, one dict per benchmark, backend and board length
+    """
+    results = list()
+    for name in benchmarks:
+        for backend in backends:
+            for board_length in board_lengths:
+                if backend == "bitboard" and board_length > BITBOARD_MAX_BOARD_LENGTH:
+                    continue
+                result = {"benchmark": name, "backend": backend, "board_length": board_length}
+                result.update(measure(BENCHMARKS[name], BOARD_BACKENDS[backend], board_length, min_time, repeat, seed))
+                print(f"{name} {backend} {board_length}: {result['ns_per_op']} ns/op", file=sys.stderr)
+                results.append(result)
+    return results
+
+def compare(results: List[dict], baseline: List[dict], tolerance: float = 0.25) -> List[str]:
+    """Compares results with the same benchmarks of a baseline report
+
+    Args:
+        results: the results, see run
+        baseline: the baseline results
+        tolerance: the allowed relative slowdown. Default is 0.25 (25%).
+
+    Returns:
+        A list of regressions, as str (empty if none)
+    """
+    key = lambda r: (r["benchmark"], r["backend"], r["board_length"])
+    baseline_results = {key(r): r for r in baseline}
+    regressions = list()
+    for result in results:
+        before = baseline_results.get(key(result))
+        if before is not None and result["ns_per_op"] > before["ns_per_op"] * (1 + tolerance):
+            regressions.append(f"{result['benchmark']} {result['backend']} {result['board_length']}: "
+                f"{result['ns_per_op']} ns/op, was {before['ns_per_op']}")
+    return regressions
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the tic_tac_toe core across board sizes.")
+    parser.add_argument("--benchmarks", default=",".join(BENCHMARKS), help="comma separated benchmarks to run")
+    parser.add_argument("--backends", default=",".join(BOARD_BACKENDS), help="comma separated Board backends")
+    parser.add_argument("--board-lengths", default=DEFAULT_BOARD_LENGTHS, help="comma separated board lengths")
+    parser.add_argument("--min-time", type=float, default=0.05, help="minimum seconds per sample")
+    parser.add_argument("--repeat", type=int, default=3, help="samples per benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--baseline", help="report to compare with; exits with status 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="relative slowdown allowed by --baseline")
+    args = parser.parse_args(argv)
+
+    results = run(args.benchmarks.split(","), args.backends.split(","),
+        [int(n) for n in args.board_lengths.split(",")], args.min_time, args.repeat, args.seed)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+    json.dump(report, sys.stdout, indent=4)
+    print()
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+        for regression in regressions:
+            print("regression: " + regression, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,23 @@
+import unittest
+from micro_bench import BENCHMARKS, compare, run
+
+class TestMicroBench(unittest.TestCase):
+
+    def test_run(self):
+        # every benchmark runs on both backends
+        results = run(list(BENCHMARKS), ["numpy", "bitboard"], [3], min_time=0.001, repeat=1)
+        self.assertEqual(len(results), 2 * len(BENCHMARKS))
+        for result in results:
+            self.assertGreater(result["ns_per_op"], 0)
+            self.assertGreaterEqual(result["ops"], 1)
+
+    def test_compare(self):
+        baseline = [{"benchmark": "update", "backend": "numpy", "board_length": 3, "ns_per_op": 100.0}]
+        self.assertEqual(compare([dict(baseline[0], ns_per_op=120.0)], baseline), [])
+        self.assertEqual(len(compare([dict(baseline[0], ns_per_op=130.0)], baseline)), 1)
+        # benchmarks missing from the baseline are not regressions
+        self.assertEqual(compare([dict(baseline[0], board_length=10, ns_per_op=1000.0)], baseline), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
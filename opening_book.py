@@ -0,0 +1,210 @@
+import mmap
+import os
+import struct
+import sys
+from functools import lru_cache
+import numpy as np
+from tic_tac_toe import Board, EMPTY, X, O
+
+# the book only covers the default board size
+BOOK_BOARD_LENGTH = 3
+
+# where the book ships, next to this module
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book_3x3.bin")
+
+# file layout: a header, then `count` sorted position codes (little-endian uint16)
+# followed by the `count` best moves (uint8), both indexed alike
+_MAGIC = b"T3BK"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHI") # magic, version, count
+
+# cell values, as digits of a position code
+_DIGITS = {EMPTY: 0, X: 1, O: 2}
+
+_CELLS = BOOK_BOARD_LENGTH * BOOK_BOARD_LENGTH
+
+# the 8 symmetries of the 3x3 square, each mapping a cell to its image
+_SYMMETRIES = tuple(
+    tuple(ty(n % BOOK_BOARD_LENGTH, n // BOOK_BOARD_LENGTH) * BOOK_BOARD_LENGTH + tx(n % BOOK_BOARD_LENGTH, n // BOOK_BOARD_LENGTH) for n in range(_CELLS))
+    for tx, ty in [
+        (lambda x, y: x, lambda x, y: y),
+        (lambda x, y: 2 - y, lambda x, y: x),
+        (lambda x, y: 2 - x, lambda x, y: 2 - y),
+        (lambda x, y: y, lambda x, y: 2 - x),
+        (lambda x, y: 2 - x, lambda x, y: y),
+        (lambda x, y: x, lambda x, y: 2 - y),
+        (lambda x, y: y, lambda x, y: x),
+        (lambda x, y: 2 - y, lambda x, y: 2 - x),
+    ]
+)
+
+# the weight of each cell in a position's code, under each symmetry
+_WEIGHTS = tuple(tuple(3 ** image for image in symmetry) for symmetry in _SYMMETRIES)
+
+_LINES = (
+    (0, 1, 2), (3, 4, 5), (6, 7, 8), # rows
+    (0, 3, 6), (1, 4, 7), (2, 5, 8), # columns
+    (0, 4, 8), (2, 4, 6), # diagonals
+)
+
+class OpeningBook:
+    """The OpeningBook class maps 3x3 positions to their perfect-play move.
+
+    Positions are stored once per symmetry class, under their canonical
+    code: the smallest base-3 code (one digit per cell, see _DIGITS) of
+    the position's 8 rotations and reflections. The book file is
+    memory-mapped, so loading it is cheap and its pages are shared by
+    every process using it.
+
+    The book covers every position reachable when X moves first and the
+    players alternate, for either player to move.
+
+    Args:
+        path (str): path of the book file. Default is BOOK_PATH.
+
+    Raises:
+        ValueError: If the file is not a valid book
+    """
+
+    # the board size the book covers
+    board_length: int = BOOK_BOARD_LENGTH
+
+    _codes: np.ndarray
+    _moves: np.ndarray
+
+    def __init__(self, path: str = BOOK_PATH) -> None:
+        with open(path, "rb") as f:
+            # the mapping stays open after the file is closed
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("Invalid opening book file")
+        self._codes = np.frombuffer(self._mmap, dtype="<u2", count=count, offset=_HEADER.size)
+        self._moves = np.frombuffer(self._mmap, dtype=np.uint8, count=count, offset=_HEADER.size + 2 * count)
+
+    def best_move(self, board: Board) -> tuple:
+        """Looks up the best move on a board
+
+        Args:
+            board (Board): the board, which must be 3x3
+
+        Returns:
+            A tuple representing the best x,y coordinates, or None if
+            the position is not in the book (e.g. the game is over)
+        """
+        # 8 symmetries of 9 cells, cheaper than a table of every position per process
+        code, symmetry = _canonicalize([_DIGITS[v] for v in board.to_string()])
+        i = int(np.searchsorted(self._codes, code))
+        if i == len(self._codes) or self._codes[i] != code:
+            return None
+        # map the canonical move back onto the board
+        n = symmetry.index(int(self._moves[i]))
+        return n % BOOK_BOARD_LENGTH, n // BOOK_BOARD_LENGTH
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+
+@lru_cache(maxsize=None)
+def get_book(path: str = BOOK_PATH) -> OpeningBook:
+    """Gets the opening book, loading it once per process
+
+    The book file is only read, it ships with the code
+    and is built with `python opening_book.py` (see write_book).
+
+    Args:
+        path (str): path of the book file. Default is BOOK_PATH.
+
+    Returns:
+        The OpeningBook
+
+    Raises:
+        OSError: If the book file can't be read, e.g. it is missing
+        ValueError: If the file is not a valid book
+    """
+    return OpeningBook(path)
+
+def build_book() -> dict:
+    """Solves every reachable 3x3 position
+
+    Returns:
+        A dict of canonical position codes to the best move
+        (a cell in the canonical position)
+    """
+    book = dict()
+    scores = dict()
+
+    def solve(cells: list, player: int) -> int:
+        """Scores the position for the player to move: positive for a win
+        (the sooner, the higher), negative for a loss, 0 for a draw"""
+        code, symmetry = _canonicalize(cells)
+        if code in scores:
+            return scores[code]
+        canonical = [0] * _CELLS
+        for n in range(_CELLS):
+            canonical[symmetry[n]] = cells[n]
+        opponent = 2 if player == 1 else 1
+        best_score, best_move = None, None
+        for n in range(_CELLS):
+            if canonical[n] != 0:
+                continue
+            canonical[n] = player
+            empties = canonical.count(0)
+            if _wins(canonical, n, player):
+                score = 1 + empties
+            elif empties == 0:
+                score = 0
+            else:
+                score = -solve(canonical, opponent)
+            canonical[n] = 0
+            if best_score is None or score > best_score:
+                best_score, best_move = score, n
+        scores[code] = best_score
+        book[code] = best_move
+        return best_score
+
+    solve([0] * _CELLS, 1)
+    return book
+
+def write_book(path: str = BOOK_PATH) -> None:
+    """Builds the book and writes it to a file
+
+    Args:
+        path (str): path of the book file. Default is BOOK_PATH.
+    """
+    book = build_book()
+    codes = np.array(sorted(book), dtype="<u2")
+    moves = np.array([book[int(code)] for code in codes], dtype=np.uint8)
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(codes)))
+        f.write(codes.tobytes())
+        f.write(moves.tobytes())
+
+def _canonicalize(cells: list) -> tuple:
+    """Gets the canonical code of a position
+
+    Args:
+        cells (list): the digit of each cell
+
+    Returns:
+        The canonical code, and the symmetry mapping the position's cells
+        onto the canonical position's cells, as a tuple
+    """
+    best_code, best_symmetry = None, None
+    for symmetry, weights in zip(_SYMMETRIES, _WEIGHTS):
+        code = sum([cell * weight for cell, weight in zip(cells, weights)])
+        if best_code is None or code < best_code:
+            best_code, best_symmetry = code, symmetry
+    return best_code, best_symmetry
+
+def _wins(cells: list, n: int, player: int) -> bool:
+    """Checks whether the player's piece at a cell completes a line"""
+    for line in _LINES:
+        if n in line and all(cells[i] == player for i in line):
+            return True
+    return False
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else BOOK_PATH
+    write_book(path)
+    print(f"Wrote {len(OpeningBook(path))} positions to {path}")
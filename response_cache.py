@@ -0,0 +1,153 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Set
+from tic_tac_toe import Game, to_micros
+
+class CachedResponse(NamedTuple):
+    """A rendered response to a GET on a game's state"""
+
+    # the version of the game it was rendered from, see game_etag
+    etag: str
+
+    body: str
+
+    # the X-Next-Cursor header of a page, None if there are no more items
+    next_cursor: Optional[int] = None
+
+
+def game_etag(game: Game) -> str:
+    """Gets the ETag of a game's current state.
+
+    A game's state only changes when a move is made, so its version is its
+    last move's ID. The time the game started tells apart games that got
+    the same ID, e.g. from in memory stores before and after a restart.
+
+    Args:
+        game (Game): the game
+
+    Returns:
+        The (strong, quoted) ETag
+    """
+    return f'"{game.id}-{game.last_move.id}-{to_micros(game.started):x}"'
+
+def etag_matches(etag: str, if_none_match: str) -> bool:
+    """Checks an ETag against an If-None-Match header (weak comparison)
+
+    Args:
+        etag (str): the (quoted) ETag of the current state
+        if_none_match (str): the header's value, None or '' if not sent
+
+    Returns:
+        True if the client has the current state, i.e. the response is 304 Not Modified
+    """
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag == etag or tag == "W/" + etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """The ResponseCache class keeps the rendered responses of GETs on games'
+    states, so repeated polls of an unchanged game are a dict lookup.
+
+    Responses are cached per game and request (e.g. path and query string).
+    The server invalidates a game's responses whenever a move is made on it,
+    under the game's lock, and responses are rendered and put under that lock
+    too, so a cached response is never older than its game.
+
+    The cache is bounded by the total size of the bodies, UTF-8 encoded as
+    they are sent, the least recently
+    used responses are dropped first. It only sees the moves made by this
+    process, so it should be disabled (max_bytes=0) when games are shared
+    between processes, e.g. several servers on the same database file.
+
+    Args:
+        max_bytes (int): maximum total size of the cached bodies in bytes, 0 to disable the cache
+    """
+
+    max_bytes: int
+
+    # cached responses, from least to most recently used
+    _responses: 'OrderedDict[tuple, CachedResponse]'
+
+    # the size of each cached body in bytes, by the same keys as _responses
+    _sizes: Dict[tuple, int]
+
+    # the requests cached for each game
+    _requests: Dict[int, Set]
+
+    # total size of the cached bodies in bytes
+    nbytes: int
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._responses = OrderedDict()
+        self._sizes = dict()
+        self._requests = dict()
+        self.nbytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, game_id: int, request) -> Optional[CachedResponse]:
+        """Gets a cached response
+
+        Args:
+            game_id (int): id of the game
+            request: the request, any hashable key (e.g. its path and query string)
+
+        Returns:
+            The CachedResponse, None if not cached
+        """
+        with self._lock:
+            response = self._responses.get((game_id, request))
+            if response is not None:
+                self._responses.move_to_end((game_id, request))
+            return response
+
+    def put(self, game_id: int, request, response: CachedResponse) -> None:
+        """Caches a response, dropping the least recently used ones if the cache is full.
+        Responses larger than max_bytes are not cached.
+
+        Args:
+            game_id (int): id of the game
+            request: the request, see get
+            response (CachedResponse): the response
+        """
+        size = len(response.body.encode())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._remove((game_id, request))
+            self._responses[(game_id, request)] = response
+            self._sizes[(game_id, request)] = size
+            self._requests.setdefault(game_id, set()).add(request)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                self._remove(next(iter(self._responses)))
+
+    def invalidate(self, game_id: int) -> None:
+        """Drops the cached responses of a game, e.g. after a move was made on it
+
+        Args:
+            game_id (int): id of the game
+        """
+        with self._lock:
+            for request in self._requests.pop(game_id, ()):
+                del self._responses[(game_id, request)]
+                self.nbytes -= self._sizes.pop((game_id, request))
+
+    def _remove(self, key: tuple) -> None:
+        """Drops a cached response, if any. The caller holds the lock."""
+        if self._responses.pop(key, None) is None:
+            return
+        self.nbytes -= self._sizes.pop(key)
+        game_id, request = key
+        requests = self._requests[game_id]
+        requests.discard(request)
+        if not requests:
+            del self._requests[game_id]
+
+    def __len__(self) -> int:
+        return len(self._responses)
@@ -0,0 +1,62 @@
+import unittest
+from response_cache import CachedResponse, ResponseCache, etag_matches, game_etag
+from tic_tac_toe import Game, X
+
+class TestResponseCache(unittest.TestCase):
+
+    def test_game_etag(self):
+        game = Game(0)
+        etag = game_etag(game)
+        self.assertEqual(game_etag(game), etag)
+        game.make_move(0, 0, X)
+        self.assertNotEqual(game_etag(game), etag)
+        self.assertTrue(game_etag(game).startswith('"0-1-'))
+
+        self.assertTrue(etag_matches(etag, etag))
+        self.assertTrue(etag_matches(etag, f'"other", W/{etag}'))
+        self.assertTrue(etag_matches(etag, "*"))
+        self.assertFalse(etag_matches(etag, '"other"'))
+        self.assertFalse(etag_matches(etag, None))
+
+    def test_cache(self):
+        cache = ResponseCache(10)
+        self.assertIsNone(cache.get(0, "a"))
+        cache.put(0, "a", CachedResponse('"0-0"', "abc"))
+        cache.put(0, "b", CachedResponse('"0-0"', "abc", 3))
+        cache.put(1, "a", CachedResponse('"1-0"', "abc"))
+        self.assertEqual(cache.get(0, "a").body, "abc")
+        self.assertEqual(cache.get(0, "b").next_cursor, 3)
+        self.assertEqual((len(cache), cache.nbytes), (3, 9))
+
+        # the least recently used responses are dropped when full
+        cache.put(1, "b", CachedResponse('"1-0"', "ab"))
+        self.assertIsNone(cache.get(1, "a"))
+        self.assertEqual((len(cache), cache.nbytes), (3, 8))
+
+        # replaced responses don't count twice
+        cache.put(0, "a", CachedResponse('"0-1"', "abcd"))
+        self.assertEqual(cache.get(0, "a").etag, '"0-1"')
+        self.assertEqual((len(cache), cache.nbytes), (3, 9))
+
+        # a game's responses are dropped together
+        cache.invalidate(0)
+        self.assertIsNone(cache.get(0, "a"))
+        self.assertIsNone(cache.get(0, "b"))
+        self.assertEqual(cache.get(1, "b").body, "ab")
+        self.assertEqual((len(cache), cache.nbytes), (1, 2))
+
+        # responses too long to fit are not cached
+        cache.put(2, "a", CachedResponse('"2-0"', "a" * 11))
+        self.assertIsNone(cache.get(2, "a"))
+        # the size is counted in bytes, as sent
+        cache.put(2, "a", CachedResponse('"2-0"', "\u00e9" * 6)) # 6 characters, 12 bytes
+        self.assertIsNone(cache.get(2, "a"))
+        cache.put(2, "a", CachedResponse('"2-0"', "\u00e9" * 4))
+        self.assertEqual((len(cache), cache.nbytes), (2, 10))
+        disabled = ResponseCache(0)
+        disabled.put(0, "a", CachedResponse('"0-0"', "abc"))
+        self.assertEqual(len(disabled), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
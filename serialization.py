@@ -0,0 +1,74 @@
+import json
+from typing import Iterable, Union
+from tic_tac_toe import BOARD_FORMATS, LEGACY_BOARD, Game, Move
+
+class Serializer:
+    """The Serializer class renders Games and Moves as their API objects (JSON).
+
+    The default Serializer produces the original API output: indented JSON
+    with sorted keys, and boards rendered like numpy arrays. A compact
+    Serializer drops the indentation and whitespace, and boards can be
+    rendered as a flat string ("X.O......") or as nested arrays of values
+    instead, see tic_tac_toe.BOARD_FORMATS.
+
+    Board renderings are cached per Move (see Move.board_state), so
+    serializing the same Game or Move again doesn't re-render its board.
+
+    Args:
+        compact (bool): whether to drop indentation and whitespace. Default is False.
+        board_format (str): how to render boards, one of BOARD_FORMATS.
+            Default is LEGACY_BOARD.
+
+    Raises:
+        ValueError: If the board format is invalid
+    """
+
+    compact: bool
+    board_format: str
+
+    def __init__(self, compact: bool = False, board_format: str = LEGACY_BOARD) -> None:
+        if board_format not in BOARD_FORMATS:
+            raise ValueError("Invalid board format provided")
+        self.compact = compact
+        self.board_format = board_format
+
+    def to_dict(self, item: Union[Game, Move, dict]) -> dict:
+        """Gets the API object of a Game or Move, as a dict. API objects
+        already parsed as dicts (e.g. by shard_router.py) are returned as they are."""
+        if isinstance(item, dict):
+            return item
+        return item.to_dict(self.board_format)
+
+    def dumps(self, item: Union[Game, Move, dict]) -> str:
+        """Serializes a Game or Move
+
+        Returns:
+            The JSON API object, a str
+        """
+        if self.compact:
+            # to_dict already builds its keys in sorted order
+            return json.dumps(self.to_dict(item), separators=(",", ":"))
+        return json.dumps(self.to_dict(item), sort_keys=True, indent=4)
+
+    def dumps_list(self, items: Iterable[Union[Game, Move, dict]]) -> str:
+        """Serializes a list of Games or Moves
+
+        Returns:
+            The JSON array of API objects, a str
+        """
+        separator = "," if self.compact else ", "
+        return "[" + separator.join([self.dumps(item) for item in items]) + "]"
+
+    def line(self) -> 'Serializer':
+        """Gets a Serializer producing single line JSON, e.g. for streaming
+
+        Returns:
+            A compact Serializer with the same board format
+        """
+        if self.compact:
+            return self
+        return Serializer(compact=True, board_format=self.board_format)
+
+
+# the Serializer producing the original API output
+DEFAULT_SERIALIZER = Serializer()
@@ -1,6 +1,19 @@
-from flask import Flask, Request, jsonify, request
-from tic_tac_toe import Game, Result
+from flask import Flask, Request, Response, g, jsonify, request
+from tic_tac_toe import BOARD_BACKENDS, Game, Move, Result
+from storage import EventLogGameStore, GameStore, InMemoryGameStore, SQLiteGameStore, TieredGameStore
+from game_index import GameFilter
+from serialization import DEFAULT_SERIALIZER, Serializer
+from strategies import STRATEGIES
+from metrics import CONTENT_TYPE, REGISTRY, REQUEST_SECONDS, SlowRequestProfiler, timed, timer
+from response_cache import CachedResponse, ResponseCache, etag_matches, game_etag
+from events import KEEPALIVE, KEEPALIVE_SECONDS, EventHub, sse_event
+from itertools import islice
+from typing import Callable, Iterator, List, Union
+import atexit
+import datetime
 import logging
+import os
+import time
 
 app = Flask(__name__)
 
@@ -8,13 +21,99 @@ app = Flask(__name__)
 GET = 'GET'
 POST = 'POST'
 
-# this is our "database". it's going to be a list(Game).
-# it's a hack - data should not be stored across sessions/requests like this.
-# but it seems to work for basic, non-concurent client usage.
-# really we should store the game objects in a db,
-# whose state persists, is decoupled from the web app, and safely supports
-# concurrent reads and writes.
-stored_games = list()
+# value of the "format" param to stream a listing as newline delimited JSON
+NDJSON = 'ndjson'
+
+# maximum number of moves accepted by a single batch request
+MAX_BATCH_SIZE = 10000
+
+# Board backend used for new games, "numpy" (default) or "bitboard".
+# see tic_tac_toe.BOARD_BACKENDS
+BOARD_TYPE = BOARD_BACKENDS[os.environ.get("BOARD_BACKEND", "numpy")]
+
+# Strategy the computer plays with, "random" (default) or "negamax".
+# see strategies.STRATEGIES
+STRATEGY = STRATEGIES[os.environ.get("COMPUTER_STRATEGY", "random")]()
+
+# Set SHARD_COUNT (and SHARD, from 0 to SHARD_COUNT - 1) to serve one shard
+# of the games, i.e. the games whose ID modulo SHARD_COUNT is SHARD,
+# e.g. as one of the workers of shard_router.py. see storage.GameStore
+SHARD = int(os.environ.get("SHARD", 0))
+SHARD_COUNT = int(os.environ.get("SHARD_COUNT", 1))
+
+def create_store() -> GameStore:
+    """ Creates the game store configured by the environment.
+
+    If GAME_DB is set, games are persisted to that SQLite database file.
+    Otherwise if GAME_LOG_DIR is set, games are kept in memory and their
+    moves are logged to that directory, to be restored on restart (see
+    storage.EventLogGameStore). Otherwise if COLD_GAME_DB is set, only the games in play (at most
+    HOT_GAMES of them, 10000 by default) are kept in memory, and the others
+    are spilled to that file (see storage.TieredGameStore), as are the games in play
+    when the server exits. Otherwise games
+    are only kept in memory (and lost on restart).
+
+    The store holds the games of the SHARD. Shards share the database
+    files, and each has its own directory under GAME_LOG_DIR.
+
+    Returns:
+        The GameStore to use
+    """
+    db_path = os.environ.get("GAME_DB", '')
+    if db_path != '':
+        return SQLiteGameStore(db_path, SHARD, SHARD_COUNT)
+    log_dir = os.environ.get("GAME_LOG_DIR", '')
+    if log_dir != '':
+        if SHARD_COUNT > 1:
+            log_dir = os.path.join(log_dir, f"shard-{SHARD}")
+        log_store = EventLogGameStore(log_dir, shard=SHARD, shard_count=SHARD_COUNT)
+        atexit.register(log_store.close) # commit the last moves
+        return log_store
+    cold_db_path = os.environ.get("COLD_GAME_DB", '')
+    if cold_db_path != '':
+        tiered_store = TieredGameStore(cold_db_path, int(os.environ.get("HOT_GAMES", 10000)), SHARD, SHARD_COUNT)
+        atexit.register(tiered_store.flush) # write the moves of the hot games
+        return tiered_store
+    return InMemoryGameStore(SHARD, SHARD_COUNT)
+
+# this is our "database", every Game goes through it
+store = create_store()
+
+# rendered GET /games?game_id= and GET /moves responses, invalidated when a move
+# is made. RESPONSE_CACHE_BYTES bounds the size of the cached bodies in bytes (16 MiB by
+# default), set it to 0 when several server processes (other than shards) share a GAME_DB file.
+# see response_cache.ResponseCache
+RESPONSE_CACHE = ResponseCache(int(os.environ.get("RESPONSE_CACHE_BYTES", 16 * 1024 * 1024)))
+
+# pushes game updates to the /events subscribers, see events.EventHub
+EVENTS = EventHub()
+
+# Set PROFILE_SLOW_REQUESTS to a duration in seconds (e.g. 0.1) to log
+# the hot stacks of requests slower than that, see metrics.SlowRequestProfiler
+PROFILER = None
+if os.environ.get("PROFILE_SLOW_REQUESTS", '') != '':
+    PROFILER = SlowRequestProfiler(float(os.environ["PROFILE_SLOW_REQUESTS"]))
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    if PROFILER is not None:
+        PROFILER.start_request()
+
+@app.after_request
+def observe_request(response: Response) -> Response:
+    # streamed responses are timed until they start
+    duration = time.perf_counter() - g.request_start
+    endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    REQUEST_SECONDS.observe(duration, request.method, endpoint, str(response.status_code))
+    if PROFILER is not None:
+        PROFILER.end_request(f"{request.method} {request.full_path}", duration)
+    return response
+
+# /metrics endpoint exposing the server's latency histograms, in the Prometheus text format
+@app.route("/metrics", methods= {GET})
+def metrics():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
 
 # /games endpoint to create and get Games
 @app.route("/games", methods= {GET, POST})
@@ -24,25 +123,47 @@ def games():
             board_length = get_board_length(request=request)
         except:
             return "Invalid board length specified", 400
+        try:
+            serializer = get_serializer(request=request)
+        except:
+            return "Invalid board format specified", 400
+        try:
+            win_length = get_win_length(request=request)
+        except:
+            return "Invalid win length specified", 400
         
-        if (board_length == None): # no board_length specified, use default
-            # the new game's ID is simply the index of game list
-            game = Game(len(stored_games))
-        else: # board length specified
-            board_length = int(board_length)
-            game = Game(len(stored_games), int(board_length))
-                
-        stored_games.append(game)
-        return str(game)
+        try:
+            game = create_game(board_length, win_length)
+        except ValueError: # e.g. a win length above the board length
+            return "Invalid win length specified", 400
+        # others can already get the game, and move on it
+        with store.lock(game.id), timer("serialize"):
+            return serializer.dumps(game)
     
     elif request.method == GET: # get game(s)
+        try:
+            serializer = get_serializer(request=request)
+        except:
+            return "Invalid board format specified", 400
         game_id = request.args.get("game_id", '')
-        if (game_id == ''): # no ID provided, return all games
-            return str(stored_games)
+        if (game_id == ''): # no ID provided, return all games (a page of them)
+            try:
+                cursor, limit = get_page(request=request)
+            except:
+                return "Invalid cursor or limit specified", 400
+            try:
+                game_filter = get_filter(request=request)
+            except:
+                return "Invalid filter specified", 400
+            if request.args.get("format", '') == NDJSON:
+                return ndjson_response(store.games(cursor, limit, game_filter), lambda g: store.lock(g.id), serializer)
+            # get one extra game, to know where the next page starts
+            return page_response(store.games(cursor, None if limit is None else limit + 1, game_filter), limit, serializer,
+                lambda g: store.lock(g.id))
         else:
             try:
-                game = get_game(game_id)
-                return str([game])
+                game_id = get_game_id(game_id)
+                return cached_response(game_id, lambda game: (serializer.dumps_list([game]), None))
             except:
                 return "Requested game not found", 404
 
@@ -54,12 +175,10 @@ def moves():
         if (game_id == ''): # no ID provided, return all games
             return "Please provide a game ID for your move", 400
         try:
-            game = get_game(game_id) # retrieve the game
+            serializer = get_serializer(request=request)
+            game_id = get_game_id(game_id)
             x, y = parse_move_request(request=request) # parse coordinates from req
-            result = game.make_move(x, y, "X") # actually make the specified move on the game
-            if result == Result.ONGOING: # if game hasn't ended, make a move for computer
-                result = game.make_computer_move("O")
-            return str(game) # return current game state
+            return make_move(game_id, x, y, serializer) # return current game state
         except:
             logging.exception("Invalid move specified")
             return "Invalid move specified", 400
@@ -69,16 +188,250 @@ def moves():
         if (game_id == ''): # must provide a game ID
             return "Please provide a game ID for your move", 400
         
-        game = get_game(game_id) # retrieve game
+        try:
+            cursor, limit = get_page(request=request)
+        except:
+            return "Invalid cursor or limit specified", 400
+        try:
+            serializer = get_serializer(request=request)
+        except:
+            return "Invalid board format specified", 400
+
+        game_id = get_game_id(game_id)
         move_id = request.args.get("move_id", '')
-        if (move_id == ''): # no ID provided, return all moves
-            moves = game.get_moves()
-        else:
-            moves = game.get_moves(int(move_id))
-        return str(moves)
+        if request.args.get("format", '') != NDJSON:
+            return cached_response(game_id, lambda game: render_page(list_moves(game, move_id, cursor, limit), limit, serializer))
+        lock = store.lock(game_id)
+        with lock:
+            moves = list_moves(get_game(game_id), move_id, cursor, limit) # retrieve game
+        return ndjson_response(iter(moves), lambda m: lock, serializer)
+
+
+# /events endpoint to subscribe to the updates of a game (or of every game),
+# as Server-Sent Events
+@app.route("/events", methods= {GET})
+def events():
+    try:
+        serializer = get_serializer(request=request)
+    except:
+        return "Invalid board format specified", 400
+    game_id = request.args.get("game_id", '')
+    try:
+        game_id = None if game_id == '' else get_game_id(game_id)
+    except:
+        return "Requested game not found", 404
+    # subscribed first, so no update is missed (clients can tell repeats by their ID)
+    subscription = EVENTS.subscribe(game_id, serializer)
+    try:
+        first_event = initial_event(game_id, serializer)
+    except:
+        EVENTS.unsubscribe(subscription)
+        return "Requested game not found", 404
+
+    def generate():
+        try:
+            yield first_event
+            while True:
+                event = subscription.get(KEEPALIVE_SECONDS)
+                yield KEEPALIVE if event is None else event
+        finally: # the client is gone
+            EVENTS.unsubscribe(subscription)
+    return Response(generate(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+# /moves/batch endpoint to make many moves, across many games, in one request
+@app.route("/moves/batch", methods= {POST})
+def batch_moves():
+    items = request.get_json(silent=True)
+    try:
+        check_batch(items)
+    except ValueError as e:
+        return str(e), 400
+    try:
+        serializer = get_serializer(request=request)
+    except:
+        return "Invalid board format specified", 400
+    results = play_batch(items, serializer)
+    with timer("serialize"):
+        return jsonify(results)
+
+
+def create_game(board_length: int, win_length: int) -> Game:
+    """ Creates a game, with the configured Board backend, and publishes it
+    to the /events subscribers
+
+    Args:
+        board_length: the "length" of the game's board, None for the default
+        win_length: the number of values in a row that wins, None for a full line
+
+    Returns:
+        The new Game
+
+    Raises:
+        ValueError: If the win length is above the board length
+    """
+    if (board_length == None): # no board_length specified, use default
+        game = store.create_game(board_type=BOARD_TYPE, win_length=win_length)
+    else: # board length specified
+        game = store.create_game(board_length, board_type=BOARD_TYPE, win_length=win_length)
+    with store.lock(game.id): # others can already get the game
+        EVENTS.publish(game)
+    return game
+
+def make_move(game_id: int, x: int, y: int, serializer: Serializer) -> str:
+    """ Makes the user's move on a game and the computer's reply (see play_move),
+    atomically under the game's lock, and saves the game.
+
+    Args:
+        game_id: id of the game
+        x: x coordinate of the user's move
+        y: y coordinate of the user's move
+        serializer: the Serializer to render the game with
+
+    Returns:
+        The game's state after the moves, rendered
+
+    Raises:
+        ValueError: If there is no game with the provided ID, or the move is invalid
+    """
+    with store.lock(game_id):
+        game = get_game(game_id) # retrieve the game
+        play_move(game, x, y)
+        with timer("save_game"):
+            store.save_game(game)
+        with timer("serialize"):
+            return serializer.dumps(game)
+
+def check_batch(items) -> None:
+    """ Checks the body of a /moves/batch request
+
+    Args:
+        items: the decoded JSON body, None if it isn't JSON
+
+    Raises:
+        ValueError: If the body is not an array of at most MAX_BATCH_SIZE
+            items, with the message to respond with
+    """
+    if not isinstance(items, list):
+        raise ValueError("Please provide a JSON array of moves")
+    if len(items) > MAX_BATCH_SIZE:
+        raise ValueError(f"Please provide at most {MAX_BATCH_SIZE} moves")
+
+def play_batch(items: list, serializer: Serializer) -> list:
+    """ Makes a batch of moves, see play_move. Moves that fail don't stop the others.
+
+    The moves are grouped by game, keeping their order within each game,
+    so each game is locked, retrieved and saved only once.
+
+    Args:
+        items: the moves, as dicts with a "game_id", "x" and "y"
+        serializer: the Serializer to render the games with
+
+    Returns:
+        The result of each move, in the order of the moves: the game's
+        state after the move as a dict, or else a dict with an "error"
+    """
+    results = [None] * len(items)
+    moves_by_game = dict()
+    for i, item in enumerate(items):
+        try:
+            game_id = get_game_id(item["game_id"])
+            x, y = int(item["x"]), int(item["y"])
+        except:
+            results[i] = {"error": "Invalid move specified"}
+            continue
+        moves_by_game.setdefault(game_id, list()).append((i, x, y))
+
+    for game_id, game_moves in moves_by_game.items():
+        with store.lock(game_id):
+            try:
+                game = get_game(game_id)
+            except ValueError:
+                for i, x, y in game_moves:
+                    results[i] = {"game_id": game_id, "error": "Requested game not found"}
+                continue
+            for i, x, y in game_moves:
+                try:
+                    play_move(game, x, y)
+                    with timer("serialize"):
+                        results[i] = serializer.to_dict(game)
+                except ValueError:
+                    results[i] = {"game_id": game_id, "error": "Invalid move specified"}
+            with timer("save_game"):
+                store.save_game(game)
+    return results
+
+def list_moves(game: Game, move_id: str, cursor: int, limit: int) -> List[Move]:
+    """ Lists the moves requested by a GET /moves
+
+    Args:
+        game: the Game, whose lock the caller holds
+        move_id: the "move_id" parameter, '' to list a page of the moves
+        cursor: the ID of the first move of the page
+        limit: the maximum number of moves on the page, None for no limit
+
+    Returns:
+        The requested move, or the moves of the page plus (if any) the first
+        move of the next page (see render_page)
+
+    Raises:
+        ValueError: If the move ID is invalid
+    """
+    if (move_id == ''): # no ID provided, return all moves (a page of them)
+        # moves are listed by ID, i.e. by index
+        moves = game.get_moves()
+        return moves[cursor:] if limit is None else moves[cursor:cursor + limit + 1]
+    return game.get_moves(int(move_id))
+
+
+def play_move(game: Game, x: int, y: int) -> Result:
+    """ Makes the user's move on a game, and the computer's reply.
+
+    The caller must hold the game's lock.
+
+    Args:
+        game: the Game to play on
+        x: x coordinate of the user's move
+        y: y coordinate of the user's move
+
+    Returns:
+        The Result of the game after the moves
 
+    Raises:
+        ValueError: If the move is invalid, or the game is finished
+    """
+    try:
+        with timer("make_move"):
+            result = game.make_move(x, y, "X") # actually make the specified move on the game
+        EVENTS.publish(game)
+        if result == Result.ONGOING: # if game hasn't ended, make a move for computer
+            with timer("make_computer_move"):
+                result = game.make_computer_move("O", STRATEGY)
+            EVENTS.publish(game)
+    finally:
+        # cached renderings of the game are stale
+        RESPONSE_CACHE.invalidate(game.id)
+    return result
 
+def initial_event(game_id: int, serializer: Serializer) -> str:
+    """ Gets the first event sent to a subscriber of /events
 
+    Args:
+        game_id: id of the game subscribed to, None for every game
+        serializer: the Serializer to render the event with
+
+    Returns:
+        The game's current state as an event, or a comment
+        when subscribing to every game
+
+    Raises:
+        ValueError: If there is no game with the provided ID
+    """
+    if game_id is None:
+        return ": subscribed\n\n"
+    with store.lock(game_id):
+        return sse_event(get_game(game_id), serializer)
+
+@timed("get_game")
 def get_game(id) -> Game:
     """ Gets a game by ID
     
@@ -88,15 +441,229 @@ def get_game(id) -> Game:
     Returns:
         The retrieved Game
     """
+    return store.get_game(get_game_id(id))
+
+def get_game_id(id) -> int:
+    """ Parses a game ID
+
+    Args:
+        id: id of the game, e.g. a request parameter
+
+    Returns:
+        The game ID, an int
+
+    Raises:
+        ValueError: If the ID is not a valid int
+    """
     try:
-        id = int(id) # catch invalid ID
+        return int(id) # catch invalid ID
     except:
         raise ValueError("Invalid game ID provided")
-    if (id < 0 or id >= len(stored_games)):
-        raise ValueError("Invalid game ID provided")
+
+def get_serializer(request: Request) -> Serializer:
+    """ Gets the Serializer for the response, from the request parameters
+
+    Set "compact" to true (or 1) to drop indentation and whitespace,
+    and "board_format" to render boards as "flat" strings or nested "rows"
+    instead of the default "legacy" rendering.
+
+    Args:
+        request: the flask Request object
+
+    Returns:
+        The Serializer to use
+
+    Raises:
+        ValueError: If the board format is invalid
+    """
+    compact = request.args.get("compact", '').lower() in ("1", "true")
+    board_format = request.args.get("board_format", '')
+    if not compact and board_format == '':
+        return DEFAULT_SERIALIZER
+    return Serializer(compact=compact, board_format=board_format or DEFAULT_SERIALIZER.board_format)
+
+def get_page(request: Request) -> tuple:
+    """ Gets the pagination parameters of a listing
+
+    The cursor is the ID to start the listing from, and the limit
+    is the maximum number of items to list.
+
+    Args:
+        request: the flask Request object
+
+    Returns:
+        The cursor (an int, 0 if not specified) and limit
+        (an int, None if not specified) as a tuple
+
+    Raises:
+        ValueError: If the cursor is below 0, the limit is below 1,
+            or either is not a valid int
+    """
+    cursor = request.args.get("cursor", '')
+    limit = request.args.get("limit", '')
+    cursor = 0 if cursor == '' else int(cursor)
+    limit = None if limit == '' else int(limit)
+    if cursor < 0 or (limit is not None and limit < 1):
+        raise ValueError("Invalid cursor or limit provided")
+    return cursor, limit
+
+def get_filter(request: Request) -> GameFilter:
+    """ Gets the filter of a listing of games
+
+    Set "state" to ongoing, x_winner, o_winner or draw to only list the
+    games in that state, "board_length" to only list the games of that
+    board length, and "started_since" or "moved_since" to a time (e.g.
+    "2022-02-23 11:46:38", as in the API objects) to only list the games
+    started, or last moved, at or after that time.
+
+    Args:
+        request: the flask Request object
+
+    Returns:
+        The GameFilter (with no criteria if none is specified)
+
+    Raises:
+        ValueError: If a parameter is invalid
+    """
+    state = request.args.get("state", '')
+    board_length = request.args.get("board_length", '')
+    started_since = request.args.get("started_since", '')
+    moved_since = request.args.get("moved_since", '')
+    try:
+        result = None if state == '' else Result[state.upper()]
+    except KeyError:
+        raise ValueError("Invalid state provided")
+    return GameFilter(
+        result=result,
+        board_length=None if board_length == '' else int(board_length),
+        started_since=None if started_since == '' else datetime.datetime.fromisoformat(started_since),
+        moved_since=None if moved_since == '' else datetime.datetime.fromisoformat(moved_since),
+    )
+
+def render_page(items: Iterator[Union[Game, Move]], limit: int, serializer: Serializer, get_lock: Callable = None) -> tuple:
+    """ Renders a page of a listing.
+
+    Args:
+        items: the items of the page, plus (if any) the first item of the next page
+        limit: the maximum number of items on the page, None for no limit
+        serializer: the Serializer to render the items with
+        get_lock: function that gets the lock to hold while reading an item, e.g. its game's.
+            Default is None, i.e. the caller holds the lock of every item (e.g. the moves of a game).
+
+    Returns:
+        The body, and the ID of the first item of the next page
+        (None if there are no more items) as a tuple
+    """
+    page = list(islice(items, None if limit is None else limit + 1))
+    next_cursor = None
+    if limit is not None and len(page) > limit:
+        next_cursor = page.pop().id
+    with timer("serialize"):
+        if get_lock is not None:
+            # moves may be made meanwhile, each item is read under its lock
+            locked_page = list()
+            for item in page:
+                with get_lock(item):
+                    locked_page.append(serializer.to_dict(item))
+            page = locked_page
+        return serializer.dumps_list(page), next_cursor
+
+def page_response(items: Iterator[Union[Game, Move]], limit: int, serializer: Serializer, get_lock: Callable = None) -> Response:
+    """ Builds the response for a page of a listing.
+
+    If there are more items than the limit, the ID of the first item
+    of the next page is returned in the X-Next-Cursor header.
+
+    Args:
+        items: the items of the page, plus (if any) the first item of the next page
+        limit: the maximum number of items on the page, None for no limit
+        serializer: the Serializer to render the items with
+        get_lock: see render_page
+
+    Returns:
+        The flask Response
+    """
+    body, next_cursor = render_page(items, limit, serializer, get_lock)
+    response = app.make_response(body)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return response
+
+def get_cached_response(game_id: int, request_key, render: Callable[[Game], tuple]) -> CachedResponse:
+    """ Gets the rendered response to a GET on a game's state, from RESPONSE_CACHE
+    or else rendered (and cached) under the game's lock.
+
+    Args:
+        game_id: id of the game
+        request_key: the request, as cached, e.g. its path and query string
+        render: function that renders the game as the response's body
+            and next cursor (see render_page), called under the game's lock
+
+    Returns:
+        The CachedResponse
+
+    Raises:
+        ValueError: If there is no game with the provided ID
+    """
+    response = RESPONSE_CACHE.get(game_id, request_key)
+    if response is None:
+        with store.lock(game_id):
+            game = get_game(game_id)
+            body, next_cursor = render(game)
+            response = CachedResponse(game_etag(game), body, next_cursor)
+            # put under the lock, so a move can't invalidate the game in between
+            RESPONSE_CACHE.put(game_id, request_key, response)
+    return response
+
+def cached_response(game_id: int, render: Callable[[Game], tuple]) -> Response:
+    """ Builds the response to a GET on a game's state, see get_cached_response.
+
+    The response has the ETag of the game's state, and is a
+    304 Not Modified if the request's If-None-Match has it.
+
+    Args:
+        game_id: id of the game
+        render: see get_cached_response
+
+    Returns:
+        The flask Response
+
+    Raises:
+        ValueError: If there is no game with the provided ID
+    """
+    cached = get_cached_response(game_id, (request.path, request.query_string), render)
+    if etag_matches(cached.etag, request.headers.get("If-None-Match")):
+        response = app.make_response(("", 304))
     else:
-        return stored_games[id]
+        response = app.make_response(cached.body)
+        if cached.next_cursor is not None:
+            response.headers["X-Next-Cursor"] = str(cached.next_cursor)
+    response.headers["ETag"] = cached.etag
+    return response
+
+def ndjson_response(items: Iterator[Union[Game, Move]], get_lock: Callable, serializer: Serializer) -> Response:
+    """ Builds a streaming response for a listing, as newline delimited JSON.
+
+    Items are serialized one at a time as the response is sent,
+    so memory use doesn't grow with the size of the listing.
+
+    Args:
+        items: the items to stream
+        get_lock: function that gets the lock to hold while serializing an item
+        serializer: the Serializer to render the items with (always on a single line)
+
+    Returns:
+        The flask Response
+    """
+    serializer = serializer.line()
+    def generate():
+        for item in items:
+            with get_lock(item), timer("serialize"):
+                line = serializer.dumps(item)
+            yield line + "\n"
+    return Response(generate(), mimetype="application/x-ndjson")
 
+@timed("get_board_length")
 def get_board_length(request: Request):
     """ Gets the board length parameter
 
@@ -118,6 +685,28 @@ def get_board_length(request: Request):
     else:
         return None
 
+def get_win_length(request: Request):
+    """ Gets the win length parameter, i.e. the number of values in a row that wins
+
+    Args:
+        request: the flask Request object
+    
+    Returns:
+        The win length value, an int (None if not provided)
+    
+    Raises:
+        ValueError: If request win length property is below 1
+            or is not a valid int
+    """
+    win_length = request.args.get("win_length", '')
+    if win_length != '':
+        if int(win_length) < 1:
+            raise ValueError("Provided win length must be above 0")
+        return int(win_length)
+    else:
+        return None
+
+@timed("parse_move_request")
 def parse_move_request(request:Request):
     """ Gets the coordinates from the given request body
 
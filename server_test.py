@@ -0,0 +1,168 @@
+import json
+import unittest
+from serialization import Serializer
+from server import EVENTS, app, render_page, store
+from tic_tac_toe import Game, X, O
+
+class TestServer(unittest.TestCase):
+
+    def setUp(self):
+        self.client = app.test_client()
+
+    def create_game(self, query: str = "compact=1&board_format=flat") -> dict:
+        r = self.client.post(f"/games?{query}")
+        self.assertEqual(r.status_code, 200)
+        return json.loads(r.data)
+
+    def test_etag(self):
+        for endpoint in ["/games", "/moves"]:
+            game_id = self.create_game()["game_id"]
+            path = f"{endpoint}?game_id={game_id}"
+            r = self.client.get(path)
+            self.assertEqual(r.status_code, 200)
+            etag = r.headers["ETag"]
+
+            # unchanged, served from the cache or not
+            r = self.client.get(path, headers={"If-None-Match": etag})
+            self.assertEqual((r.status_code, r.data), (304, b""))
+            self.assertEqual(r.headers["ETag"], etag)
+            r = self.client.get(path, headers={"If-None-Match": '"other", ' + etag})
+            self.assertEqual(r.status_code, 304)
+            r = self.client.get(path, headers={"If-None-Match": '"other"'})
+            self.assertEqual(r.status_code, 200)
+
+            # a move changes the state, so the old ETag no longer matches
+            self.assertEqual(self.client.post(f"/moves?game_id={game_id}", data={"x": 1, "y": 1}).status_code, 200)
+            r = self.client.get(path, headers={"If-None-Match": etag})
+            self.assertEqual(r.status_code, 200)
+            self.assertNotEqual(r.headers["ETag"], etag)
+            self.assertEqual(self.client.get(path, headers={"If-None-Match": r.headers["ETag"]}).status_code, 304)
+
+    def test_events(self):
+        game_id = self.create_game()["game_id"]
+        subscribers = len(EVENTS)
+        r = self.client.get(f"/events?game_id={game_id}&board_format=flat", buffered=False)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.mimetype, "text/event-stream")
+        self.assertEqual(len(EVENTS), subscribers + 1)
+        frames = iter(r.response)
+        # the game's current state first
+        self.assertEqual(next(frames).decode().splitlines()[:2], [f"id: {game_id}-0", "event: game"])
+
+        # then a frame per move, the user's and the computer's reply
+        self.assertEqual(self.client.post(f"/moves?game_id={game_id}", data={"x": 1, "y": 1}).status_code, 200)
+        for move_id, last_played in [(1, "X"), (2, "O")]:
+            lines = next(frames).decode().split("\n")
+            self.assertEqual(lines[:2], [f"id: {game_id}-{move_id}", "event: game"])
+            self.assertTrue(lines[2].startswith("data: "))
+            data = json.loads(lines[2][len("data: "):])
+            self.assertEqual((data["game_id"], data["last_played"]), (game_id, last_played))
+            self.assertEqual(data["board_state"][4], "X")
+            self.assertEqual(lines[3:], ["", ""])
+        r.close() # the client is gone
+        self.assertEqual(len(EVENTS), subscribers)
+
+        self.assertEqual(self.client.get("/events?game_id=100000").status_code, 404)
+        self.assertEqual(self.client.get("/events?game_id=a").status_code, 404)
+        self.assertEqual(len(EVENTS), subscribers)
+
+    def list_ids(self, query: str) -> list:
+        r = self.client.get(f"/games?{query}")
+        self.assertEqual(r.status_code, 200, query)
+        return [game["game_id"] for game in json.loads(r.data)]
+
+    def test_filters(self):
+        a = self.create_game()
+        b = self.create_game("board_length=4")
+        c = self.create_game()
+        game = store.get_game(a["game_id"])
+        with store.lock(game.id):
+            for x, y, value in [(0, 0, X), (0, 1, O), (1, 0, X), (1, 1, O), (2, 0, X)]:
+                game.make_move(x, y, value)
+            store.save_game(game)
+        a, b, c = a["game_id"], b["game_id"], c["game_id"]
+
+        # listed from the first of these games, so other tests' games are left out
+        self.assertEqual(self.list_ids(f"cursor={a}&state=x_winner"), [a])
+        self.assertEqual(self.list_ids(f"cursor={a}&state=ONGOING"), [b, c])
+        self.assertEqual(self.list_ids(f"cursor={a}&state=draw"), [])
+        self.assertEqual(self.list_ids(f"cursor={a}&board_length=4"), [b])
+        self.assertEqual(self.list_ids(f"cursor={a}&board_length=3&state=ongoing"), [c])
+        started = self.client.get(f"/games?game_id={b}").get_json(force=True)[0]["started_time"]
+        self.assertEqual(self.list_ids(f"cursor={a}&started_since={started}"), [b, c])
+        started = self.client.get(f"/games?game_id={c}").get_json(force=True)[0]["started_time"]
+        self.assertEqual(self.list_ids(f"cursor={a}&moved_since={started}"), [a, c])
+        self.assertEqual(self.list_ids(f"cursor={a}&moved_since={started}&limit=1"), [a])
+
+        for query in ["state=a", "board_length=a", "started_since=a", "moved_since=2022-02-30"]:
+            r = self.client.get(f"/games?{query}")
+            self.assertEqual((r.status_code, r.data), (400, b"Invalid filter specified"), query)
+
+    def test_pages(self):
+        first = self.create_game()["game_id"]
+        for _ in range(2):
+            self.create_game()
+        r = self.client.get(f"/games?cursor={first}&limit=2")
+        self.assertEqual([game["game_id"] for game in json.loads(r.data)], [first, first + 1])
+        self.assertEqual(r.headers["X-Next-Cursor"], str(first + 2))
+        r = self.client.get(f"/games?cursor={r.headers['X-Next-Cursor']}&limit=2")
+        self.assertEqual([game["game_id"] for game in json.loads(r.data)], [first + 2])
+        self.assertNotIn("X-Next-Cursor", r.headers) # last page
+
+        self.assertEqual(self.client.post(f"/moves?game_id={first}", data={"x": 1, "y": 1}).status_code, 200)
+        r = self.client.get(f"/moves?game_id={first}&limit=2")
+        self.assertEqual([move["move_id"] for move in json.loads(r.data)], [0, 1])
+        self.assertEqual(r.headers["X-Next-Cursor"], "2")
+        r = self.client.get(f"/moves?game_id={first}&cursor=2&limit=2")
+        self.assertEqual([move["move_id"] for move in json.loads(r.data)], [2])
+        self.assertNotIn("X-Next-Cursor", r.headers)
+        r = self.client.get(f"/moves?game_id={first}&cursor=3")
+        self.assertEqual((r.status_code, json.loads(r.data)), (200, []))
+
+        for path in ["/games?", f"/moves?game_id={first}&"]:
+            for query in ["cursor=-1", "cursor=a", "limit=0", "limit=-1", "limit=a"]:
+                r = self.client.get(path + query)
+                self.assertEqual((r.status_code, r.data), (400, b"Invalid cursor or limit specified"), path + query)
+
+    def test_pages_locked(self):
+        # each game of a page is read under its lock, as moves may be made meanwhile
+        test, games, held = self, [Game(i) for i in range(3)], list()
+        class Lock:
+            def __init__(self, game):
+                self.game = game
+            def __enter__(self):
+                held.append(self.game.id)
+            def __exit__(self, *exc_info):
+                held.remove(self.game.id)
+        class Checked(Serializer):
+            def to_dict(self, item):
+                if isinstance(item, Game):
+                    test.assertEqual(held, [item.id])
+                return super().to_dict(item)
+        body, next_cursor = render_page(iter(games), 2, Checked(compact=True), Lock)
+        self.assertEqual(([game["game_id"] for game in json.loads(body)], next_cursor), ([0, 1], 2))
+        self.assertEqual(held, [])
+
+    def test_ndjson(self):
+        first = self.create_game()["game_id"]
+        self.create_game()
+        r = self.client.get(f"/games?cursor={first}&format=ndjson&board_format=flat")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.mimetype, "application/x-ndjson")
+        # one game per line, each on a single line, however the games are rendered
+        self.assertTrue(r.data.endswith(b"\n"))
+        lines = r.data.decode().splitlines()
+        self.assertEqual([json.loads(line)["game_id"] for line in lines], [first, first + 1])
+        self.assertEqual(json.loads(lines[0])["board_state"], "." * 9)
+
+        r = self.client.get(f"/games?cursor={first}&limit=1&format=ndjson")
+        self.assertEqual([json.loads(line)["game_id"] for line in r.data.decode().splitlines()], [first])
+
+        self.assertEqual(self.client.post(f"/moves?game_id={first}", data={"x": 1, "y": 1}).status_code, 200)
+        r = self.client.get(f"/moves?game_id={first}&cursor=1&format=ndjson")
+        self.assertEqual(r.mimetype, "application/x-ndjson")
+        self.assertEqual([json.loads(line)["move_id"] for line in r.data.decode().split("\n")[:-1]], [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
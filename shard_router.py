@@ -0,0 +1,383 @@
+from flask import Flask, Response, jsonify, request
+from storage import shard_of
+from serialization import Serializer
+from events import KEEPALIVE, KEEPALIVE_SECONDS
+from local_server import SERVER_COMMANDS, start_local_server
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count, islice
+from typing import List, Optional, Tuple
+import argparse
+import heapq
+import json
+import os
+import queue
+import signal
+import sys
+import threading
+import requests
+
+app = Flask(__name__)
+
+# HTTP Method constants, see server.py
+GET = 'GET'
+POST = 'POST'
+
+# value of the "format" param to stream a listing as newline delimited JSON
+NDJSON = 'ndjson'
+
+# maximum number of moves accepted by a single batch request, see server.MAX_BATCH_SIZE
+MAX_BATCH_SIZE = 10000
+
+# URLs of the workers serving each shard, in shard order (the worker of
+# shard i runs server.py with SHARD=i and SHARD_COUNT=len(SHARD_URLS)).
+# Set by main, or from SHARD_URLS (comma separated) to route to running workers.
+SHARD_URLS = [url for url in os.environ.get("SHARD_URLS", '').split(",") if url != '']
+
+# request headers sent on to the workers, and response headers sent back
+FORWARDED_HEADERS = ("Content-Type", "If-None-Match")
+RETURNED_HEADERS = ("Content-Type", "ETag", "X-Next-Cursor", "Cache-Control")
+
+# new games are spread across the shards in turn
+_next_shard = count()
+
+# threads sending the requests fanned out to every shard
+_pool = ThreadPoolExecutor(max_workers=32)
+
+# each thread keeps its own connections to the workers
+_local = threading.local()
+
+@app.route("/games", methods= {GET, POST})
+def games():
+    if request.method == POST: # create game, on the next shard
+        return to_response(send(next(_next_shard) % len(SHARD_URLS), upstream_request()))
+    if request.args.get("game_id", '') != '': # get game, from its owner
+        return to_response(send(owner(request.args["game_id"]), upstream_request()))
+
+    # list games: every shard lists its page, merged by ID
+    upstream = upstream_request()
+    ndjson = request.args.get("format", '') == NDJSON
+    responses = fan_out(upstream, stream=ndjson)
+    for response in responses:
+        if response.status_code != 200: # e.g. an invalid limit, the same on every shard
+            for other in responses:
+                other.close()
+            return to_response(response)
+    limit = request.args.get("limit", '')
+    limit = None if limit == '' else int(limit)
+    if ndjson:
+        return ndjson_response(responses, limit)
+    items, next_cursor = merge_pages([(json.loads(response.content), get_cursor(response)) for response in responses], limit)
+    compact = request.args.get("compact", '').lower() in ("1", "true")
+    response = Response(Serializer(compact=compact).dumps_list(items), content_type=responses[0].headers["Content-Type"])
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return response
+
+@app.route("/moves", methods= {GET, POST})
+def moves():
+    ndjson = request.method == GET and request.args.get("format", '') == NDJSON
+    upstream = send(owner(request.args.get("game_id", '')), upstream_request(), stream=ndjson)
+    return stream_response(upstream) if ndjson else to_response(upstream)
+
+@app.route("/moves/batch", methods= {POST})
+def batch_moves():
+    items = request.get_json(silent=True)
+    if not isinstance(items, list) or len(items) > MAX_BATCH_SIZE:
+        return to_response(send(0, upstream_request())) # rejected like any worker would
+    # every shard makes its own moves, the results are put back in order
+    indexes = split_batch(items, len(SHARD_URLS))
+    upstream = upstream_request(b"")
+    def make_moves(shard: int) -> requests.Response:
+        body = json.dumps([items[i] for i in indexes[shard]]).encode()
+        return send(shard, dict(upstream, data=body))
+    shards = [shard for shard in range(len(SHARD_URLS)) if indexes[shard]]
+    responses = list(_pool.map(make_moves, shards))
+    results = [None] * len(items)
+    for shard, response in zip(shards, responses):
+        if response.status_code != 200: # e.g. an invalid board format
+            return to_response(response)
+        for i, result in zip(indexes[shard], response.json()):
+            results[i] = result
+    return jsonify(results)
+
+@app.route("/events", methods= {GET})
+def events():
+    if request.args.get("game_id", '') != '': # a game's updates, from its owner
+        return stream_response(send(owner(request.args["game_id"]), upstream_request(), stream=True))
+
+    # every game's updates, from every shard
+    responses = fan_out(upstream_request(), stream=True)
+    for response in responses:
+        if response.status_code != 200:
+            for other in responses:
+                other.close()
+            return to_response(response)
+    events = queue.Queue()
+    for response in responses:
+        threading.Thread(target=read_events, args=(response, events), daemon=True).start()
+
+    def generate():
+        try:
+            yield ": subscribed\n\n"
+            while True:
+                try:
+                    yield events.get(timeout=KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield KEEPALIVE
+        finally: # the client is gone, which ends the readers too
+            for response in responses:
+                response.close()
+    return Response(generate(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.route("/metrics", methods= {GET})
+def metrics():
+    responses = fan_out(upstream_request())
+    return Response(merge_metrics([response.text for response in responses]),
+        content_type=responses[0].headers["Content-Type"])
+
+
+def owner(game_id) -> int:
+    """ Gets the shard owning a game
+
+    Args:
+        game_id: id of the game, e.g. a request parameter
+
+    Returns:
+        The shard. Invalid IDs go to shard 0, which rejects them.
+    """
+    try:
+        return shard_of(int(game_id), len(SHARD_URLS))
+    except ValueError:
+        return 0
+
+def upstream_request(body: bytes = None) -> dict:
+    """ Gets what to send to the workers for the current request, see send.
+
+    Args:
+        body: the body to send. Default is None (the request's body).
+
+    Returns:
+        The method, path (with the query string), headers and body, as a dict
+    """
+    path = request.full_path if request.query_string else request.path
+    headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+    return {"method": request.method, "path": path, "headers": headers,
+        "data": request.get_data() if body is None else body}
+
+def send(shard: int, upstream: dict, stream: bool = False) -> requests.Response:
+    """ Sends a request to the worker of a shard
+
+    Args:
+        shard: the shard
+        upstream: the request, see upstream_request
+        stream: whether to stream the response's body. Default is False (read it all).
+
+    Returns:
+        The worker's response. Streamed responses must be closed.
+    """
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = requests.Session()
+    return session.request(upstream["method"], SHARD_URLS[shard] + upstream["path"],
+        headers=upstream["headers"], data=upstream["data"], stream=stream)
+
+def fan_out(upstream: dict, stream: bool = False) -> List[requests.Response]:
+    """ Sends a request to every worker, concurrently
+
+    Returns:
+        The workers' responses, in shard order. see send
+    """
+    return list(_pool.map(lambda shard: send(shard, upstream, stream), range(len(SHARD_URLS))))
+
+def to_response(upstream: requests.Response) -> Response:
+    """ Builds the response to the client from a worker's response
+
+    Args:
+        upstream: the worker's response
+
+    Returns:
+        The flask Response
+    """
+    headers = {name: upstream.headers[name] for name in RETURNED_HEADERS if name in upstream.headers}
+    return Response(upstream.content, status=upstream.status_code, headers=headers)
+
+def stream_response(upstream: requests.Response) -> Response:
+    """ Builds the response to the client from a worker's streamed response,
+    sending the body on as it arrives. The worker's response is closed once sent.
+
+    Args:
+        upstream: the worker's streamed response
+
+    Returns:
+        The flask Response
+    """
+    headers = {name: upstream.headers[name] for name in RETURNED_HEADERS if name in upstream.headers}
+    def generate():
+        try:
+            yield from upstream.iter_content(chunk_size=None)
+        finally:
+            upstream.close()
+    return Response(generate(), status=upstream.status_code, headers=headers)
+
+def get_cursor(upstream: requests.Response) -> Optional[int]:
+    """Gets the X-Next-Cursor of a worker's page, None if it has no more items"""
+    cursor = upstream.headers.get("X-Next-Cursor")
+    return None if cursor is None else int(cursor)
+
+def merge_pages(pages: List[Tuple[list, Optional[int]]], limit: Optional[int]) -> Tuple[list, Optional[int]]:
+    """ Merges the pages of games listed by every shard from the same cursor.
+
+    Each shard lists its first `limit` games from the cursor, so the first
+    `limit` of them all are the page. The next page starts at the first
+    game left out, which is either listed or the next cursor of its shard.
+
+    Args:
+        pages: each shard's games (API objects), in ID order, and next cursor
+            (None if it has no more games), as tuples
+        limit: the maximum number of games on the page, None for no limit
+
+    Returns:
+        The games on the page, and the ID of the first game of the next page
+        (None if there are no more games) as a tuple
+    """
+    games = list(heapq.merge(*[items for items, _ in pages], key=lambda game: game["game_id"]))
+    cursors = [cursor for _, cursor in pages if cursor is not None]
+    if limit is not None and len(games) > limit:
+        cursors.append(games[limit]["game_id"])
+        games = games[:limit]
+    return games, min(cursors) if cursors else None
+
+def ndjson_response(upstreams: List[requests.Response], limit: Optional[int]) -> Response:
+    """ Builds the streaming response for a listing of games, as newline
+    delimited JSON, merging the streamed listings of every shard by ID.
+
+    Args:
+        upstreams: the workers' streamed responses
+        limit: the maximum number of games to list, None for no limit
+
+    Returns:
+        The flask Response
+    """
+    def lines(upstream: requests.Response):
+        for line in upstream.iter_lines():
+            if line:
+                yield line
+    def generate():
+        try:
+            merged = heapq.merge(*[lines(upstream) for upstream in upstreams], key=lambda line: json.loads(line)["game_id"])
+            for line in islice(merged, limit):
+                yield line + b"\n"
+        finally:
+            for upstream in upstreams:
+                upstream.close()
+    return Response(generate(), mimetype="application/x-ndjson")
+
+def split_batch(items: list, shard_count: int) -> List[List[int]]:
+    """ Splits a batch of moves by the shard owning their game
+
+    Args:
+        items: the moves, as requested (moves without a valid game ID go to shard 0, which rejects them)
+        shard_count: the number of shards
+
+    Returns:
+        The indexes of the moves of each shard, in order
+    """
+    indexes = [list() for _ in range(shard_count)]
+    for i, item in enumerate(items):
+        try:
+            shard = shard_of(int(item["game_id"]), shard_count)
+        except:
+            shard = 0
+        indexes[shard].append(i)
+    return indexes
+
+def read_events(upstream: requests.Response, events: queue.Queue) -> None:
+    """ Queues the events streamed by a worker, until its stream is closed.
+    Comments (e.g. keepalives) are dropped, the router sends its own.
+
+    Args:
+        upstream: the worker's streamed response to GET /events
+        events: the queue to put the events on
+    """
+    pending = ""
+    try:
+        for chunk in upstream.iter_content(chunk_size=None):
+            # events are ASCII (JSON data), and end with a blank line
+            *complete, pending = (pending + chunk.decode()).split("\n\n")
+            for event in complete:
+                if not event.startswith(":"):
+                    events.put(event + "\n\n")
+    except Exception:
+        pass # closed by the client's stream, or the worker is gone
+
+def merge_metrics(texts: List[str]) -> str:
+    """ Merges the metrics of every shard, in the Prometheus text format.
+    Each sample gets a shard label, each metric's HELP and TYPE are kept once.
+
+    Args:
+        texts: the metrics of each shard, in shard order
+
+    Returns:
+        The merged metrics
+    """
+    families = OrderedDict() # the lines of each metric, by name
+    for shard, text in enumerate(texts):
+        lines = families.setdefault(None, list())
+        for line in text.splitlines():
+            if line.startswith("#"): # HELP or TYPE, starting a metric
+                lines = families.setdefault(line.split(" ")[2], list())
+                if line not in lines:
+                    lines.append(line)
+            elif line != '':
+                name_end = min([i for i in (line.find("{"), line.find(" ")) if i != -1])
+                label = f'shard="{shard}"'
+                if line[name_end] == "{":
+                    lines.append(line[:name_end + 1] + label + "," + line[name_end + 1:])
+                else:
+                    lines.append(line[:name_end] + "{" + label + "}" + line[name_end:])
+    return "\n".join([line for lines in families.values() for line in lines]) + "\n"
+
+def start_workers(kind: str, shard_count: int) -> list:
+    """ Starts the workers serving each shard, in child processes on free local ports
+
+    Args:
+        kind: the kind of server, see local_server.SERVER_COMMANDS
+        shard_count: the number of shards
+
+    Returns:
+        The worker processes (call `terminate()` to stop them) and their URLs, in shard order
+
+    Raises:
+        RuntimeError: If a worker doesn't start
+    """
+    def start(shard: int):
+        try:
+            return start_local_server(kind, env={"SHARD": str(shard), "SHARD_COUNT": str(shard_count)})
+        except RuntimeError:
+            return None
+    workers = list(_pool.map(start, range(shard_count)))
+    if None in workers:
+        for worker in workers:
+            if worker is not None:
+                worker[0].terminate()
+        raise RuntimeError(f"A {kind} worker didn't start")
+    return workers
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve the API from several worker processes, each owning a shard of the games.")
+    parser.add_argument("--shards", type=int, default=os.cpu_count(), help="number of workers. Default is the number of CPUs.")
+    parser.add_argument("--server", default="flask", help=f"the workers' server, one of {', '.join(SERVER_COMMANDS)}")
+    parser.add_argument("--port", type=int, default=5000)
+    args = parser.parse_args()
+
+    workers = start_workers(args.server, args.shards)
+    # stopped with SIGTERM too, the workers are stopped with the router
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        SHARD_URLS[:] = [url for _, url in workers]
+        app.run(host="127.0.0.1", port=args.port, threaded=True)
+    finally:
+        for process, _ in workers:
+            process.terminate()
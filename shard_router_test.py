@@ -0,0 +1,51 @@
+import unittest
+from shard_router import merge_metrics, merge_pages, split_batch
+
+class TestShardRouter(unittest.TestCase):
+
+    def test_merge_pages(self):
+        games = lambda *ids: [{"game_id": game_id} for game_id in ids]
+        ids = lambda page: [game["game_id"] for game in page]
+
+        # 3 shards, each listing its first 2 games from cursor 0
+        page, cursor = merge_pages([(games(0, 3), 6), (games(1, 4), None), (games(2, 5), 8)], 2)
+        self.assertEqual((ids(page), cursor), ([0, 1], 2))
+
+        # the next game can be left out of its shard's page, but not its cursor
+        page, cursor = merge_pages([(games(0), 2), (games(5), None)], 1)
+        self.assertEqual((ids(page), cursor), ([0], 2))
+
+        # last page
+        page, cursor = merge_pages([(games(6), None), (games(), None), (games(8), None)], 2)
+        self.assertEqual((ids(page), cursor), ([6, 8], None))
+        page, cursor = merge_pages([(games(0, 2), None), (games(1), None)], None)
+        self.assertEqual((ids(page), cursor), ([0, 1, 2], None))
+
+    def test_split_batch(self):
+        items = [{"game_id": 3}, {"game_id": "4"}, {"x": 0}, {"game_id": "a"}, {"game_id": 1}, {"game_id": 0}]
+        self.assertEqual(split_batch(items, 3), [[0, 2, 3, 5], [1, 4], []])
+        self.assertEqual(split_batch(items, 1), [[0, 1, 2, 3, 4, 5]])
+
+    def test_merge_metrics(self):
+        shard_metrics = "\n".join([
+            "# HELP requests_seconds Time spent.",
+            "# TYPE requests_seconds histogram",
+            'requests_seconds_bucket{method="GET",le="+Inf"} 2',
+            "requests_seconds_sum 0.5",
+            "requests_seconds_count 2",
+        ]) + "\n"
+        merged = merge_metrics([shard_metrics, shard_metrics.replace(" 2", " 3")]).splitlines()
+        self.assertEqual(merged, [
+            "# HELP requests_seconds Time spent.",
+            "# TYPE requests_seconds histogram",
+            'requests_seconds_bucket{shard="0",method="GET",le="+Inf"} 2',
+            'requests_seconds_sum{shard="0"} 0.5',
+            'requests_seconds_count{shard="0"} 2',
+            'requests_seconds_bucket{shard="1",method="GET",le="+Inf"} 3',
+            'requests_seconds_sum{shard="1"} 0.5',
+            'requests_seconds_count{shard="1"} 3',
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+from typing import Dict
+import numpy as np
+from tic_tac_toe import RESULT_CODES, RESULTS, Result, X, O
+
+# cell values in the simulated boards
+EMPTY_CELL = 0
+X_CELL = 1
+O_CELL = 2
+
+# result codes, see tic_tac_toe.RESULT_CODES
+ONGOING_CODE = RESULT_CODES[Result.ONGOING]
+X_WINNER_CODE = RESULT_CODES[Result.X_WINNER]
+O_WINNER_CODE = RESULT_CODES[Result.O_WINNER]
+DRAW_CODE = RESULT_CODES[Result.DRAW]
+
+class BatchSimulator:
+    """The BatchSimulator class plays many games of the same board size at once.
+
+    The K boards are held in one K x (N*N) int8 numpy array (one row per game,
+    cells row by row, see EMPTY_CELL, X_CELL and O_CELL), and every operation
+    is vectorized across games: a turn places one piece on every ongoing
+    game, and win detection only gathers the row, column and diagonals
+    through each game's last move, so a turn costs O(K*N).
+
+    All games start empty, X moves first and the players alternate,
+    so every ongoing game is on the same turn. Results are uint8 codes,
+    see tic_tac_toe.RESULT_CODES.
+
+    This is meant for offline simulations, e.g. to tune computer opponents.
+    It doesn't keep move history or timestamps like Game does.
+
+    Args:
+        num_games (int): the number of games (K)
+        board_length (int): the "length" (and width) of the boards (N). Default is 3.
+        seed (int): seed of the random generator, for reproducible games.
+            Default is None (unpredictable).
+
+    Raises:
+        ValueError: If the number of games or the board length is below 1
+    """
+
+    num_games: int
+    board_length: int
+
+    # K x (N*N) cells
+    boards: np.ndarray
+
+    # K result codes
+    results: np.ndarray
+
+    # K x (N*N) cells played, in order (-1 once a game is over)
+    moves: np.ndarray
+
+    # number of turns played
+    turn: int
+
+    def __init__(self, num_games: int, board_length: int = 3, seed: int = None) -> None:
+        if num_games < 1 or board_length < 1:
+            raise ValueError("Invalid number of games or board size provided")
+        self.num_games = num_games
+        self.board_length = board_length
+        cells = board_length * board_length
+        self.boards = np.zeros((num_games, cells), dtype=np.int8)
+        self.results = np.full(num_games, ONGOING_CODE, dtype=np.uint8)
+        self.moves = np.full((num_games, cells), -1, dtype=np.int32)
+        self.turn = 0
+        self.rng = np.random.default_rng(seed)
+
+        # cell indexes of each row, column and both diagonals
+        r = np.arange(board_length)
+        self._rows = r[:, None] * board_length + r[None, :]
+        self._columns = self._rows.T.copy()
+        self._diagonal = r * (board_length + 1)
+        self._anti_diagonal = (r + 1) * (board_length - 1)
+
+    @property
+    def value(self) -> str:
+        """The value (player) to move on this turn"""
+        return X if self.turn % 2 == 0 else O
+
+    def ongoing(self) -> np.ndarray:
+        """Gets the indexes of the games still ongoing"""
+        return np.flatnonzero(self.results == ONGOING_CODE)
+
+    def random_moves(self) -> np.ndarray:
+        """Chooses a random empty cell on every game
+
+        Returns:
+            A K array of cell indexes (y * N + x), -1 for finished games
+        """
+        keys = self.rng.random(self.boards.shape)
+        keys[self.boards != EMPTY_CELL] = -1
+        cells = keys.argmax(axis=1)
+        cells[self.results != ONGOING_CODE] = -1
+        return cells
+
+    def play_turn(self, cells: np.ndarray) -> np.ndarray:
+        """Plays a turn: places the current player's piece on every ongoing game
+
+        Args:
+            cells (np.ndarray): a K array of the cell index (y * N + x)
+                to play on each game, ignored for finished games
+
+        Returns:
+            The K result codes after the turn
+
+        Raises:
+            ValueError: If a cell is invalid or already occupied on an ongoing game
+        """
+        games = self.ongoing()
+        if len(games) == 0:
+            return self.results
+        cells = np.asarray(cells)[games]
+        if np.any(cells < 0) or np.any(cells >= self.boards.shape[1]):
+            raise ValueError("Invalid coordinates provided")
+        if np.any(self.boards[games, cells] != EMPTY_CELL):
+            raise ValueError("Provided coordinates already occupied")
+
+        piece = X_CELL if self.turn % 2 == 0 else O_CELL
+        self.boards[games, cells] = piece
+        self.moves[games, self.turn] = cells
+
+        won = self._check_winners(games, cells, piece)
+        self.results[games[won]] = X_WINNER_CODE if piece == X_CELL else O_WINNER_CODE
+        self.turn += 1
+        if self.turn == self.boards.shape[1]: # boards are full
+            self.results[self.results == ONGOING_CODE] = DRAW_CODE
+        return self.results
+
+    def play_random(self) -> np.ndarray:
+        """Plays every game to the end, both players choosing random empty cells
+
+        Playing uniformly random empty cells is the same as playing the cells
+        of a random permutation in order, so the permutations are drawn
+        upfront and each turn is O(K*N).
+
+        Returns:
+            The K result codes
+        """
+        order = self.rng.random(self.boards.shape).argsort(axis=1)
+        while self.turn < self.boards.shape[1] and np.any(self.results == ONGOING_CODE):
+            # cells played on earlier turns are never drawn again
+            self.play_turn(order[:, self.turn])
+        return self.results
+
+    def _check_winners(self, games: np.ndarray, cells: np.ndarray, piece: int) -> np.ndarray:
+        """Checks which games the most recent moves won
+
+        Only the row, column and (if on one) the diagonals through
+        each move are checked.
+
+        Returns:
+            A boolean array, aligned with `games`
+        """
+        board_length = self.board_length
+        xs, ys = cells % board_length, cells // board_length
+        boards = self.boards
+        g = games[:, None]
+        won = np.all(boards[g, self._rows[ys]] == piece, axis=1)
+        won |= np.all(boards[g, self._columns[xs]] == piece, axis=1)
+        on_diagonal = xs == ys
+        if np.any(on_diagonal):
+            won[on_diagonal] |= np.all(boards[g[on_diagonal], self._diagonal] == piece, axis=1)
+        on_anti_diagonal = xs + ys == board_length - 1
+        if np.any(on_anti_diagonal):
+            won[on_anti_diagonal] |= np.all(boards[g[on_anti_diagonal], self._anti_diagonal] == piece, axis=1)
+        return won
+
+
+def count_results(results: np.ndarray) -> Dict[Result, int]:
+    """Counts the games of each Result
+
+    Args:
+        results (np.ndarray): result codes, see tic_tac_toe.RESULT_CODES
+
+    Returns:
+        A dict of each Result to its number of games
+    """
+    counts = np.bincount(results, minlength=len(RESULTS))
+    return {result: int(counts[code]) for code, result in enumerate(RESULTS)}
+
+def simulate_random_games(num_games: int, board_length: int = 3, seed: int = None) -> np.ndarray:
+    """Plays random-vs-random games, see BatchSimulator
+
+    Returns:
+        The result codes of the games, a uint8 array
+    """
+    return BatchSimulator(num_games, board_length, seed).play_random()
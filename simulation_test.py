@@ -0,0 +1,53 @@
+import unittest
+import numpy as np
+from simulation import BatchSimulator, count_results, simulate_random_games
+from tic_tac_toe import RESULT_CODES, RESULTS, Game, Result, X, O
+
+class TestBatchSimulator(unittest.TestCase):
+
+    def replay(self, board_length, cells):
+        """Replays a simulated game with Game, returning its result code"""
+        g = Game(0, board_length=board_length)
+        for i, cell in enumerate(cells):
+            if cell < 0:
+                break
+            g.make_move(int(cell) % board_length, int(cell) // board_length, X if i % 2 == 0 else O)
+        return RESULT_CODES[g.last_move.result]
+
+    def test_matches_game(self):
+        for board_length in [1, 2, 3, 4]:
+            sim = BatchSimulator(300, board_length, seed=board_length)
+            results = sim.play_random()
+            self.assertNotIn(RESULT_CODES[Result.ONGOING], results)
+            for i in range(sim.num_games):
+                self.assertEqual(self.replay(board_length, sim.moves[i]), results[i])
+
+    def test_random_moves(self):
+        sim = BatchSimulator(500, 3, seed=3)
+        while len(sim.ongoing()) > 0:
+            cells = sim.random_moves()
+            self.assertTrue(np.all(cells[sim.ongoing()] >= 0))
+            sim.play_turn(cells)
+        for i in range(sim.num_games):
+            self.assertEqual(self.replay(3, sim.moves[i]), sim.results[i])
+
+    def test_invalid_moves(self):
+        sim = BatchSimulator(2, 3)
+        sim.play_turn(np.array([4, 0]))
+        self.assertEqual(sim.value, O)
+        self.assertRaises(ValueError, sim.play_turn, np.array([4, 1]))
+        self.assertRaises(ValueError, sim.play_turn, np.array([9, 1]))
+        self.assertRaises(ValueError, BatchSimulator, 0, 3)
+
+    def test_results(self):
+        a = simulate_random_games(1000, seed=1)
+        np.testing.assert_equal(a, simulate_random_games(1000, seed=1))
+        counts = count_results(a)
+        self.assertEqual(sum(counts.values()), 1000)
+        self.assertEqual(set(counts), set(RESULTS))
+        # X wins most random 3x3 games
+        self.assertGreater(counts[Result.X_WINNER], counts[Result.O_WINNER])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,1099 @@
+import datetime
+import itertools
+import logging
+import mmap
+import os
+import queue
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Set
+from tic_tac_toe import (BOARD_BACKENDS, RESULT_CODES, VALUE_CODES, VALUES, Board, Game, Move, Result, X, O,
+    from_micros, to_micros)
+from game_index import GameFilter, GameIndex
+
+# number of locks games are striped across, see GameStore.lock
+LOCK_STRIPES = 64
+
+def shard_of(game_id: int, shard_count: int) -> int:
+    """Gets the shard owning a game, out of `shard_count` shards.
+    A shard's stores allocate the IDs index * shard_count + shard, see GameStore."""
+    return game_id % shard_count
+
+class GameStore(ABC):
+    """The GameStore class is the interface for storing Games.
+
+    A store creates Games (assigning their IDs), retrieves them by ID,
+    persists the moves made on them, and iterates over all of them.
+    The web server only talks to this interface, so the storage backend
+    can be swapped without touching the API layer. It is an abstract class,
+    a backend missing one of its methods can't be instantiated.
+
+    Creating a game (and so allocating its ID) is atomic. Game objects
+    themselves are not thread-safe, so callers hold `lock(game_id)` while
+    reading a game's moves or making moves on it. Games are striped
+    across a fixed set of locks, so unrelated games rarely contend.
+
+    Games can be partitioned across the stores of several processes
+    (shards): a shard's store only holds the games whose ID modulo
+    `shard_count` is `shard`, i.e. its n-th game has the ID
+    n * shard_count + shard (see shard_of). Other IDs are invalid.
+
+    Args:
+        shard (int): the shard of the store. Default is 0.
+        shard_count (int): the number of shards. Default is 1 (not sharded).
+
+    Raises:
+        ValueError: If the shard is not between 0 and shard_count - 1
+    """
+
+    shard: int
+    shard_count: int
+
+    _locks: List[threading.Lock]
+
+    def __init__(self, shard: int = 0, shard_count: int = 1) -> None:
+        if shard_count < 1 or shard < 0 or shard >= shard_count:
+            raise ValueError("Invalid shard provided")
+        self.shard = shard
+        self.shard_count = shard_count
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+    def _game_id(self, index: int) -> int:
+        """Gets the ID of the store's n-th game (from 0)"""
+        return index * self.shard_count + self.shard
+
+    def _index(self, game_id: int) -> int:
+        """Gets the index of a game among the store's games, -1 if the store doesn't own its ID"""
+        if game_id < 0 or shard_of(game_id, self.shard_count) != self.shard:
+            return -1
+        return game_id // self.shard_count
+
+    def _first_index(self, start: int) -> int:
+        """Gets the index of the store's first game with an ID of at least `start`"""
+        return max(0, -((self.shard - start) // self.shard_count))
+
+    def lock(self, game_id: int) -> threading.Lock:
+        """Gets the lock guarding a game
+
+        Args:
+            game_id (int): id of the game
+
+        Returns:
+            The lock to hold while using the game
+        """
+        # IDs of a shard are shard_count apart, they are spread by their index
+        return self._locks[(game_id // self.shard_count) % len(self._locks)]
+
+    @abstractmethod
+    def create_game(self, board_length: int = 3, board_type: type = Board, win_length: int = None) -> Game:
+        """Create and store a new Game, with the next available ID.
+
+        Args:
+            board_length (int): the "length" (and width) of the Board. Default is 3.
+            board_type (type): the Board backend to use. Default is Board.
+            win_length (int): the number of values in a row that wins.
+                Default is None, i.e. the board length.
+
+        Returns:
+            The created Game
+
+        Raises:
+            ValueError: If the board length or win length is invalid
+        """
+
+    @abstractmethod
+    def get_game(self, game_id: int) -> Game:
+        """Gets a game by ID
+
+        Args:
+            game_id (int): id of the game
+
+        Returns:
+            The retrieved Game
+
+        Raises:
+            ValueError: If there is no game with the provided ID
+        """
+
+    @abstractmethod
+    def save_game(self, game: Game) -> None:
+        """Persist the moves that have been made on a Game since it was last saved.
+
+        Args:
+            game (Game): the game to save
+        """
+
+    @abstractmethod
+    def games(self, start: int = 0, limit: int = None, game_filter: GameFilter = None) -> Iterator[Game]:
+        """Iterates over the stored games, ordered by ID.
+
+        Games are produced lazily, so a caller can stream them
+        without holding every game in memory. Filtered listings are
+        served from indexes (see game_index.GameIndex), so they don't
+        go through the games that don't match.
+
+        Args:
+            start (int): only games with an ID of at least `start` are returned.
+                Default is 0.
+            limit (int): maximum number of games to return. Default is None (no limit).
+            game_filter (GameFilter): only games matching it are returned.
+                Default is None (every game).
+
+        Returns:
+            An iterator of Games
+        """
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Gets the number of stored games"""
+
+
+class InMemoryGameStore(GameStore):
+    """A GameStore that keeps every Game in a list, indexed by game ID.
+    Games are indexed for filtered listings by a GameIndex, which
+    they update after each move.
+
+    State is lost when the process exits.
+
+    Args:
+        shard (int): see GameStore
+        shard_count (int): see GameStore
+    """
+
+    _games: List[Game]
+
+    # guards ID allocation
+    _create_lock: threading.Lock
+
+    _game_index: GameIndex
+
+    def __init__(self, shard: int = 0, shard_count: int = 1) -> None:
+        super().__init__(shard, shard_count)
+        self._games = list()
+        self._create_lock = threading.Lock()
+        self._game_index = GameIndex(shard, shard_count)
+
+    def create_game(self, board_length: int = 3, board_type: type = Board, win_length: int = None) -> Game:
+        with self._create_lock:
+            # the new game's ID is simply derived from its index in the game list
+            game = Game(self._game_id(len(self._games)), board_length, board_type=board_type, win_length=win_length)
+            game.on_move = self._game_index.update
+            self._game_index.add(game)
+            self._games.append(game)
+        return game
+
+    def get_game(self, game_id: int) -> Game:
+        index = self._index(game_id)
+        if index < 0 or index >= len(self._games):
+            raise ValueError("Invalid game ID provided")
+        return self._games[index]
+
+    def save_game(self, game: Game) -> None:
+        pass # games are mutated in place, nothing to do
+
+    def games(self, start: int = 0, limit: int = None, game_filter: GameFilter = None) -> Iterator[Game]:
+        if game_filter:
+            game_ids = itertools.islice(self._game_index.game_ids(start, game_filter), limit)
+            return (self._games[self._index(game_id)] for game_id in game_ids)
+        first = self._first_index(start)
+        return itertools.islice(self._games, first, None if limit is None else first + limit)
+
+    def __len__(self) -> int:
+        return len(self._games)
+
+
+class SQLiteGameStore(GameStore):
+    """A GameStore backed by a SQLite database file.
+
+    Games are not kept in memory: a Game is rebuilt from its move rows
+    every time it is retrieved, and moves are stored as append-only rows,
+    so saving a Game only inserts the moves made since it was last saved.
+
+    The database runs in WAL mode so readers don't block the writer.
+    Each operation borrows a connection from a pool, so concurrent requests
+    use their own connections, while the connections (and their prepared
+    statements) are reused across requests and threads, e.g. the thread per
+    request of flask's server. At most `pool_size` idle connections are kept,
+    the pool never blocks: when none is idle another one is opened, and
+    closed when returned to a full pool.
+    Queries are constant SQL strings with bound parameters, so sqlite3
+    prepares each of them once per connection and reuses the statement.
+
+    Each game's row has its current result and last move time too,
+    updated as its moves are saved, and filtered listings are served
+    from indexes on them (see GameFilter).
+
+    Shards (see GameStore) can share a database file.
+
+    Args:
+        path (str): path of the database file
+        shard (int): see GameStore
+        shard_count (int): see GameStore
+        pool_size (int): the maximum number of idle connections kept. Default is 8.
+
+    Raises:
+        ValueError: If the pool size is below 1, or the shard is invalid
+    """
+
+    # map Board backends to the name they are stored under
+    _BACKEND_NAMES = {board_type: name for name, board_type in BOARD_BACKENDS.items()}
+
+    _SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS games (
+            id INTEGER PRIMARY KEY,
+            board_length INTEGER NOT NULL,
+            board_backend TEXT NOT NULL,
+            started TEXT NOT NULL,
+            win_length INTEGER,
+            result INTEGER,
+            last_move TEXT
+        )""",
+        """CREATE TABLE IF NOT EXISTS moves (
+            game_id INTEGER NOT NULL,
+            move_id INTEGER NOT NULL,
+            x INTEGER,
+            y INTEGER,
+            value TEXT,
+            timestamp TEXT NOT NULL,
+            PRIMARY KEY (game_id, move_id)
+        ) WITHOUT ROWID""",
+    )
+    # scans from the highest ID, the shard's last game is among the last shard_count ones
+    _LAST_ID = "SELECT id FROM games WHERE id % ? = ? ORDER BY id DESC LIMIT 1"
+    # databases made before win lengths were configurable lack the column (NULL is the board length)
+    _ADD_WIN_LENGTH = "ALTER TABLE games ADD COLUMN win_length INTEGER"
+    # databases made before listings were filtered lack the columns, they are filled in from the moves
+    _ADD_RESULT = "ALTER TABLE games ADD COLUMN result INTEGER"
+    _ADD_LAST_MOVE = "ALTER TABLE games ADD COLUMN last_move TEXT"
+    _SELECT_UNINDEXED = "SELECT id, board_length, board_backend, started, win_length FROM games WHERE last_move IS NULL"
+    _INDEXES = (
+        "CREATE INDEX IF NOT EXISTS games_result ON games (result, id)",
+        "CREATE INDEX IF NOT EXISTS games_board_length ON games (board_length, id)",
+        "CREATE INDEX IF NOT EXISTS games_started ON games (started)",
+        "CREATE INDEX IF NOT EXISTS games_last_move ON games (last_move)",
+    )
+    _INSERT_GAME = """INSERT INTO games (id, board_length, board_backend, started, win_length, result, last_move)
+        VALUES (?, ?, ?, ?, ?, ?, ?)"""
+    _UPDATE_GAME = "UPDATE games SET result = ?, last_move = ? WHERE id = ?"
+    _SELECT_GAME = "SELECT id, board_length, board_backend, started, win_length FROM games WHERE id = ?"
+    _SELECT_GAMES = """SELECT id, board_length, board_backend, started, win_length FROM games
+        WHERE id >= ? AND id % ? = ?{} ORDER BY id LIMIT ?"""
+    # the condition on each GameFilter criterion, in order
+    _FILTERS = (" AND result = ?", " AND board_length = ?", " AND started >= ?", " AND last_move >= ?")
+    _COUNT_GAMES = "SELECT COUNT(*) FROM games WHERE id % ? = ?"
+    _LAST_MOVE_ID = "SELECT COALESCE(MAX(move_id), -1) FROM moves WHERE game_id = ?"
+    _INSERT_MOVE = "INSERT INTO moves (game_id, move_id, x, y, value, timestamp) VALUES (?, ?, ?, ?, ?, ?)"
+    _SELECT_MOVES = "SELECT x, y, value, timestamp FROM moves WHERE game_id = ? ORDER BY move_id"
+
+    path: str
+
+    # the idle connections, most recently used last
+    _pool: queue.LifoQueue
+
+    def __init__(self, path: str, shard: int = 0, shard_count: int = 1, pool_size: int = 8) -> None:
+        super().__init__(shard, shard_count)
+        if pool_size < 1:
+            raise ValueError("Invalid pool size provided")
+        self.path = path
+        self._pool = queue.LifoQueue(pool_size)
+        with self._connection() as connection, connection:
+            for statement in SQLiteGameStore._SCHEMA:
+                connection.execute(statement)
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(games)")]
+            if "win_length" not in columns:
+                connection.execute(SQLiteGameStore._ADD_WIN_LENGTH)
+            if "last_move" not in columns:
+                connection.execute(SQLiteGameStore._ADD_RESULT)
+                connection.execute(SQLiteGameStore._ADD_LAST_MOVE)
+            for row in connection.execute(SQLiteGameStore._SELECT_UNINDEXED).fetchall():
+                self._update_game(connection, SQLiteGameStore._restore_game(connection, row))
+            for statement in SQLiteGameStore._INDEXES:
+                connection.execute(statement)
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrows a connection from the pool, opening one if none is idle"""
+        try:
+            connection = self._pool.get_nowait()
+        except queue.Empty:
+            # transactions are managed explicitly, see _write
+            connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+        try:
+            yield connection
+        finally:
+            try:
+                self._pool.put_nowait(connection)
+            except queue.Full:
+                connection.close()
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """Runs a write transaction on a connection from the pool,
+        committed unless an exception is raised.
+
+        BEGIN IMMEDIATE takes the write lock up front,
+        so e.g. ID allocation is atomic across connections.
+        """
+        with self._connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+                connection.execute("COMMIT")
+            except:
+                connection.execute("ROLLBACK")
+                raise
+
+    def create_game(self, board_length: int = 3, board_type: type = Board, win_length: int = None) -> Game:
+        with self._write() as connection:
+            game_id = self._next_id(connection)
+            game = Game(game_id, board_length, board_type=board_type, win_length=win_length)
+            connection.execute(SQLiteGameStore._INSERT_GAME, (game_id, board_length, SQLiteGameStore._BACKEND_NAMES[board_type],
+                str(game.started), win_length, RESULT_CODES[Result.ONGOING], str(game.started)))
+            self._insert_moves(connection, game, 0)
+        return game
+
+    def get_game(self, game_id: int) -> Game:
+        with self._connection() as connection:
+            # other shards' games may be in the same database
+            row = None if self._index(game_id) < 0 else connection.execute(SQLiteGameStore._SELECT_GAME, (game_id,)).fetchone()
+            if row is None:
+                raise ValueError("Invalid game ID provided")
+            return self._restore_game(connection, row)
+
+    def save_game(self, game: Game) -> None:
+        with self._write() as connection:
+            last_move_id = connection.execute(SQLiteGameStore._LAST_MOVE_ID, (game.id,)).fetchone()[0]
+            self._insert_moves(connection, game, last_move_id + 1)
+            self._update_game(connection, game)
+
+    def games(self, start: int = 0, limit: int = None, game_filter: GameFilter = None) -> Iterator[Game]:
+        conditions, parameters = "", [start, self.shard_count, self.shard]
+        if game_filter:
+            result, board_length, started_since, moved_since = game_filter
+            values = (None if result is None else RESULT_CODES[result], board_length,
+                None if started_since is None else str(started_since), None if moved_since is None else str(moved_since))
+            # at most 16 different queries, each prepared once per connection
+            for condition, value in zip(SQLiteGameStore._FILTERS, values):
+                if value is not None:
+                    conditions += condition
+                    parameters.append(value)
+        parameters.append(-1 if limit is None else limit) # a negative LIMIT means no limit
+        # the connection is borrowed until the listing is done (or dropped)
+        with self._connection() as connection:
+            rows = connection.execute(SQLiteGameStore._SELECT_GAMES.format(conditions), parameters)
+            try:
+                for row in rows:
+                    yield self._restore_game(connection, row)
+            finally:
+                rows.close() # ends the read, before the connection is reused
+
+    def __len__(self) -> int:
+        with self._connection() as connection:
+            return connection.execute(SQLiteGameStore._COUNT_GAMES, (self.shard_count, self.shard)).fetchone()[0]
+
+    def _next_id(self, connection: sqlite3.Connection) -> int:
+        """Gets the ID of the next game created, in the write transaction"""
+        row = connection.execute(SQLiteGameStore._LAST_ID, (self.shard_count, self.shard)).fetchone()
+        return self._game_id(0 if row is None else self._index(row[0]) + 1)
+
+    @staticmethod
+    def _update_game(connection: sqlite3.Connection, game: Game) -> None:
+        """Updates a game's result and last move time"""
+        last_move = game.last_move
+        connection.execute(SQLiteGameStore._UPDATE_GAME, (RESULT_CODES[last_move.result], str(last_move.timestamp), game.id))
+
+    @staticmethod
+    def _insert_moves(connection: sqlite3.Connection, game: Game, first_move_id: int) -> None:
+        """Appends a game's moves, from the provided move ID onwards"""
+        connection.executemany(SQLiteGameStore._INSERT_MOVE, [
+            (game.id, m.id, m.x, m.y, m.last_moved, str(m.timestamp))
+            for m in game.get_moves()[first_move_id:]
+        ])
+
+    @staticmethod
+    def _restore_game(connection: sqlite3.Connection, row: tuple) -> Game:
+        """Rebuilds a Game by replaying its stored moves"""
+        game_id, board_length, board_backend, started, win_length = row
+        game = Game(game_id, board_length, board_type=BOARD_BACKENDS[board_backend], win_length=win_length)
+        game.started = datetime.datetime.fromisoformat(started)
+        for x, y, value, timestamp in connection.execute(SQLiteGameStore._SELECT_MOVES, (game_id,)):
+            if value is not None: # first move has no coordinates
+                game.make_move(x, y, value)
+            game.last_move.timestamp = datetime.datetime.fromisoformat(timestamp)
+        return game
+
+
+class TieredGameStore(GameStore):
+    """A GameStore that keeps the games in play in memory, and the others on disk.
+
+    The hot tier is an LRU of at most `capacity` Games: games being played,
+    and games recently retrieved. When it is full, the least recently used
+    games are spilled to the cold tier, a SQLite database file, and dropped
+    from memory. Games are spilled as soon as they are finished too.
+    A game is rehydrated from the cold tier (by replaying its moves) the
+    next time it is retrieved, e.g. on GET /games?game_id= or GET /moves.
+
+    Games are compacted on disk: a row per game, with its moves packed
+    in two blobs, see _pack_moves. So the working set (and RSS) stays
+    bounded however many games are created.
+
+    Every game gets its cold row when it is created, so IDs keep being
+    allocated from the database after a restart. The moves made on hot
+    games are only on disk once spilled though, call `flush` to write
+    every hot game (e.g. on shutdown).
+
+    Games being used (whose lock is held) are never spilled, the next
+    least recently used game is spilled instead.
+
+    Every game (hot or cold) is indexed for filtered listings by a
+    GameIndex, which hot games update after each move. Cold rows keep
+    their game's result and last move time, so the index is rebuilt
+    from them on restart, without rehydrating the games.
+
+    Args:
+        path (str): path of the cold tier's database file
+        capacity (int): maximum number of hot games. Default is 10000.
+        shard (int): see GameStore
+        shard_count (int): see GameStore
+
+    Raises:
+        ValueError: If the capacity is below 1, or the shard is invalid
+    """
+
+    # map Board backends to the name they are stored under
+    _BACKEND_NAMES = {board_type: name for name, board_type in BOARD_BACKENDS.items()}
+
+    _SCHEMA = """CREATE TABLE IF NOT EXISTS games (
+        id INTEGER PRIMARY KEY,
+        board_length INTEGER NOT NULL,
+        board_backend TEXT NOT NULL,
+        started TEXT NOT NULL,
+        win_length INTEGER,
+        cells BLOB NOT NULL,
+        timestamps BLOB NOT NULL,
+        result INTEGER,
+        last_move INTEGER
+    )"""
+    # files made before listings were filtered lack the columns, they are filled in from the moves
+    _ADD_RESULT = "ALTER TABLE games ADD COLUMN result INTEGER"
+    _ADD_LAST_MOVE = "ALTER TABLE games ADD COLUMN last_move INTEGER"
+    _SELECT_UNINDEXED = """SELECT id, board_length, board_backend, started, win_length, cells, timestamps
+        FROM games WHERE last_move IS NULL"""
+    # the game index's rows (see GameIndex.extend), with the start time as text
+    _SELECT_INDEX = "SELECT id, board_length, started, result, last_move FROM games WHERE id % ? = ? ORDER BY id"
+    _INSERT_GAME = """INSERT INTO games (id, board_length, board_backend, started, win_length, cells, timestamps, result, last_move)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+    _UPDATE_MOVES = "UPDATE games SET cells = ?, timestamps = ?, result = ?, last_move = ? WHERE id = ?"
+    _SELECT_GAME = """SELECT id, board_length, board_backend, started, win_length, cells, timestamps
+        FROM games WHERE id = ?"""
+
+    path: str
+    capacity: int
+
+    # hot games, from least to most recently used
+    _hot: 'OrderedDict[int, Game]'
+
+    # hot games whose cold row is up to date, so they are dropped without being written
+    _clean: Set[int]
+
+    # number of games, i.e. the index of the next game created
+    _count: int
+
+    _game_index: GameIndex
+
+    def __init__(self, path: str, capacity: int = 10000, shard: int = 0, shard_count: int = 1) -> None:
+        if capacity < 1:
+            raise ValueError("Invalid capacity provided")
+        super().__init__(shard, shard_count)
+        self.path = path
+        self.capacity = capacity
+        self._hot = OrderedDict()
+        self._clean = set()
+        # guards the hot tier and ID allocation
+        self._lock = threading.Lock()
+        # guards the connection, which is shared by the threads
+        self._cold_lock = threading.Lock()
+        self._connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(TieredGameStore._SCHEMA)
+        columns = [row[1] for row in self._connection.execute("PRAGMA table_info(games)")]
+        if "last_move" not in columns:
+            self._connection.execute(TieredGameStore._ADD_RESULT)
+            self._connection.execute(TieredGameStore._ADD_LAST_MOVE)
+        for row in self._connection.execute(TieredGameStore._SELECT_UNINDEXED).fetchall():
+            game = _unpack_game(row)
+            cells, timestamps = row[-2:]
+            self._connection.execute(TieredGameStore._UPDATE_MOVES, (cells, timestamps,
+                RESULT_CODES[game.last_move.result], to_micros(game.last_move.timestamp), game.id))
+        self._game_index = GameIndex(shard, shard_count)
+        self._game_index.extend([
+            (game_id, board_length, to_micros(datetime.datetime.fromisoformat(started)), result, last_move)
+            for game_id, board_length, started, result, last_move
+            in self._connection.execute(TieredGameStore._SELECT_INDEX, (shard_count, shard))
+        ])
+        self._count = len(self._game_index)
+
+    def create_game(self, board_length: int = 3, board_type: type = Board, win_length: int = None) -> Game:
+        with self._lock:
+            game = Game(self._game_id(self._count), board_length, board_type=board_type, win_length=win_length)
+            cells, timestamps = _pack_moves(game)
+            with self._cold_lock:
+                self._connection.execute(TieredGameStore._INSERT_GAME, (game.id, board_length,
+                    TieredGameStore._BACKEND_NAMES[board_type], str(game.started), win_length, cells, timestamps,
+                    RESULT_CODES[Result.ONGOING], to_micros(game.started)))
+            game.on_move = self._game_index.update
+            self._game_index.add(game)
+            self._count += 1
+            self._hot[game.id] = game
+            self._clean.add(game.id)
+        self._evict()
+        return game
+
+    def get_game(self, game_id: int) -> Game:
+        game = self._get(game_id)
+        with self._lock:
+            hot = self._hot.get(game_id)
+            if hot is None: # rehydrated, its cold row is up to date
+                self._hot[game_id] = game
+                self._clean.add(game_id)
+            else:
+                game = hot
+                self._hot.move_to_end(game_id)
+        self._evict()
+        return game
+
+    def save_game(self, game: Game) -> None:
+        with self._lock:
+            self._clean.discard(game.id)
+        if game.last_move.result != Result.ONGOING: # finished, no more moves are coming
+            self._spill(game)
+            with self._lock:
+                self._clean.discard(game.id)
+                self._hot.pop(game.id, None)
+        else:
+            with self._lock:
+                self._hot[game.id] = game
+                self._hot.move_to_end(game.id)
+            self._evict()
+
+    def games(self, start: int = 0, limit: int = None, game_filter: GameFilter = None) -> Iterator[Game]:
+        # listed games are not cached, or a listing would evict the games in play
+        if game_filter:
+            for game_id in itertools.islice(self._game_index.game_ids(start, game_filter), limit):
+                yield self._get(game_id)
+            return
+        first = self._first_index(start)
+        stop = self._count if limit is None else min(self._count, first + limit)
+        for index in range(first, stop):
+            yield self._get(self._game_id(index))
+
+    def __len__(self) -> int:
+        return self._count # games are never deleted
+
+    def flush(self) -> None:
+        """Writes every hot game to the cold tier, e.g. before the process exits.
+        Games stay hot."""
+        with self._lock:
+            games = list(self._hot.values())
+        for game in games:
+            with self.lock(game.id):
+                self._spill(game)
+
+    def _get(self, game_id: int) -> Game:
+        """Gets a hot game, or else rehydrates it from the cold tier (without caching it)"""
+        with self._lock:
+            game = self._hot.get(game_id)
+        if game is not None:
+            return game
+        row = None
+        if self._index(game_id) >= 0: # other shards' games may be in the same database
+            with self._cold_lock:
+                row = self._connection.execute(TieredGameStore._SELECT_GAME, (game_id,)).fetchone()
+        if row is None:
+            raise ValueError("Invalid game ID provided")
+        # the cold row is written before a game leaves the hot tier, so it is up to date
+        game = _unpack_game(row)
+        game.on_move = self._game_index.update
+        return game
+
+    def _spill(self, game: Game) -> None:
+        """Writes a game's moves to the cold tier, unless they are already there.
+        The caller holds the game's lock."""
+        with self._lock:
+            if game.id in self._clean:
+                return
+        cells, timestamps = _pack_moves(game)
+        last_move = game.last_move
+        with self._cold_lock:
+            self._connection.execute(TieredGameStore._UPDATE_MOVES, (cells, timestamps,
+                RESULT_CODES[last_move.result], to_micros(last_move.timestamp), game.id))
+        with self._lock:
+            self._clean.add(game.id)
+
+    def _evict(self) -> None:
+        """Spills the least recently used games until the hot tier is within capacity"""
+        with self._lock:
+            # busy games are skipped (and count as used), so give up after a full round
+            attempts = len(self._hot) if len(self._hot) > self.capacity else 0
+        while attempts > 0:
+            attempts -= 1
+            with self._lock:
+                if len(self._hot) <= self.capacity:
+                    return
+                game_id, game = next(iter(self._hot.items()))
+                self._hot.move_to_end(game_id)
+            # the caller may hold a lock, so never wait for one (the game's
+            # stripe may be one the caller holds)
+            lock = self.lock(game_id)
+            if not lock.acquire(blocking=False):
+                continue
+            try:
+                self._spill(game)
+                with self._lock:
+                    if self._hot.get(game_id) is game:
+                        del self._hot[game_id]
+                    self._clean.discard(game_id)
+            finally:
+                lock.release()
+
+
+def _pack_moves(game: Game) -> tuple:
+    """Packs a game's moves into 2 blobs: their cells, as uint32 (y * N + x) * 2,
+    plus 1 if O moved (from the second move, the first has no coordinates),
+    and their timestamps, as int64 microseconds (see tic_tac_toe.to_micros)"""
+    moves = game.get_moves()
+    board_length = game.board_length
+    cells = array("I", [(m.y * board_length + m.x) * 2 + (m.last_moved == O) for m in moves[1:]])
+    timestamps = array("q", [to_micros(m.timestamp) for m in moves])
+    return cells.tobytes(), timestamps.tobytes()
+
+def _unpack_game(row: tuple) -> Game:
+    """Rebuilds a Game from its cold row, by replaying its packed moves"""
+    game_id, board_length, board_backend, started, win_length, cells, timestamps = row
+    game = Game(game_id, board_length, board_type=BOARD_BACKENDS[board_backend], win_length=win_length)
+    game.started = datetime.datetime.fromisoformat(started)
+    timestamps = array("q", timestamps)
+    game.last_move.timestamp = from_micros(timestamps[0])
+    for i, cell in enumerate(array("I", cells), 1):
+        n = cell >> 1
+        game.make_move(n % board_length, n // board_length, O if cell & 1 else X)
+        game.last_move.timestamp = from_micros(timestamps[i])
+    return game
+
+
+class EventLogGameStore(InMemoryGameStore):
+    """A GameStore that keeps every Game in memory, and logs their creation
+    and moves to disk, so they are restored when the process restarts.
+
+    Every game creation and move is appended to a log as a fixed-width
+    binary record, see _RECORD. Records are written by a background thread,
+    which writes the records of all the games saved meanwhile at once, with
+    a single fsync (group commit). So saving a game only queues its new
+    records, and the moves saved just before a crash may be lost, unless
+    `wait_for_commit` is set (saving then waits for the next commit).
+
+    Every `snapshot_records` records, the games are compacted into a
+    snapshot (every game's records, grouped by game) and older logs are
+    deleted. On restart, the snapshot is memory mapped and only the logs
+    written since are replayed. Games in the snapshot are only rebuilt
+    when they are first retrieved, so restarting doesn't get slower as
+    games and moves pile up. Their entries in the game index (see
+    InMemoryGameStore) are read from their first and last records.
+
+    Files are named "snapshot.bin" and "log.<number>.bin" (a new log is
+    started on every snapshot and restart). Call `close` to commit the
+    queued records (e.g. on shutdown). Shards (see GameStore) each need
+    their own directory.
+
+    Args:
+        directory (str): directory of the log and snapshot files, created if needed
+        wait_for_commit (bool): whether saving a game waits until its moves are on disk.
+            Default is False.
+        snapshot_records (int): number of records logged between snapshots.
+            Default is 1000000. None never snapshots.
+        shard (int): see GameStore
+        shard_count (int): see GameStore
+    """
+
+    # map Board backends to their code in records, and back
+    _BACKENDS = tuple(BOARD_BACKENDS.values())
+    _BACKEND_CODES = {board_type: code for code, board_type in enumerate(_BACKENDS)}
+
+    # a record: game ID, move ID, x, y, value, timestamp (see tic_tac_toe.to_micros)
+    # and a CRC32 of the previous fields. the value is the value code (see
+    # tic_tac_toe.VALUE_CODES) plus 4 times the result code of the move (see
+    # tic_tac_toe.RESULT_CODES, only set from the second snapshot version).
+    # the first record of a game (move ID 0) has its board length, win length
+    # and Board backend code (see _BACKENDS) as x, y and value
+    _RECORD = struct.Struct("<qiiiBqI")
+    _RECORD_FIELDS = struct.Struct("<qiiiBq")
+
+    # snapshot header: magic, number of the first log written after it, number of games.
+    # it is followed by the first record and number of records of each game (int64s),
+    # then by the records
+    _SNAPSHOT_HEADER = struct.Struct("<8sqq")
+    _SNAPSHOT_MAGIC = b"TTTSNAP2"
+    # snapshots whose records have no results, so games are rebuilt to be indexed
+    _SNAPSHOT_MAGIC_V1 = b"TTTSNAP1"
+
+    directory: str
+    wait_for_commit: bool
+    snapshot_records: Optional[int]
+
+    # games not rebuilt from the snapshot yet are None, by index (see GameStore._index)
+    _games: List[Optional[Game]]
+
+    # number of records logged for each game, i.e. the next move ID to log
+    _logged: array
+
+    # the memory mapped snapshot, and the first record and number of records of each game in it
+    _snapshot: Optional[mmap.mmap]
+    _snapshot_index: array
+
+    # records queued for the writer thread, and sequence numbers of the queued and committed batches
+    _pending: List[bytes]
+    _queued: int
+    _committed: int
+
+    def __init__(self, directory: str, wait_for_commit: bool = False, snapshot_records: int = 1000000,
+            shard: int = 0, shard_count: int = 1) -> None:
+        super().__init__(shard, shard_count)
+        self.directory = directory
+        self.wait_for_commit = wait_for_commit
+        self.snapshot_records = snapshot_records
+        os.makedirs(directory, exist_ok=True)
+        self._logged = array("i")
+        self._snapshot = None
+        self._snapshot_index = array("q")
+        # guards rebuilding games from the snapshot
+        self._load_lock = threading.Lock()
+        self._recover()
+
+        self._pending = list()
+        self._queued = 0
+        self._committed = 0
+        self._closing = False
+        # guards the pending records and sequence numbers
+        self._commit_condition = threading.Condition()
+        self._snapshotting = False
+        self._writer = threading.Thread(target=self._write_log, name="game-log-writer", daemon=True)
+        self._writer.start()
+
+    def create_game(self, board_length: int = 3, board_type: type = Board, win_length: int = None) -> Game:
+        with self._create_lock:
+            game = Game(self._game_id(len(self._games)), board_length, board_type=board_type, win_length=win_length)
+            game.on_move = self._game_index.update
+            self._game_index.add(game)
+            self._games.append(game)
+            self._logged.append(1)
+            # queued under the lock, so games are logged in ID order
+            seq = self._queue([EventLogGameStore._pack(game.id, 0, board_length, game.win_length,
+                EventLogGameStore._BACKEND_CODES[board_type], to_micros(game.started))])
+        if self.wait_for_commit:
+            self._wait(seq)
+        return game
+
+    def get_game(self, game_id: int) -> Game:
+        index = self._index(game_id)
+        if index < 0 or index >= len(self._games):
+            raise ValueError("Invalid game ID provided")
+        return self._load(index)
+
+    def save_game(self, game: Game) -> None:
+        moves = game.get_moves()
+        index = self._index(game.id)
+        first_move_id = self._logged[index]
+        if first_move_id == len(moves):
+            return
+        seq = self._queue([
+            EventLogGameStore._pack(game.id, m.id, m.x, m.y, EventLogGameStore._value(m), to_micros(m.timestamp))
+            for m in moves[first_move_id:]
+        ])
+        self._logged[index] = len(moves)
+        if self.wait_for_commit:
+            self._wait(seq)
+
+    def games(self, start: int = 0, limit: int = None, game_filter: GameFilter = None) -> Iterator[Game]:
+        if game_filter:
+            for game_id in itertools.islice(self._game_index.game_ids(start, game_filter), limit):
+                yield self._load(self._index(game_id))
+            return
+        first = self._first_index(start)
+        stop = len(self._games) if limit is None else min(len(self._games), first + limit)
+        for index in range(first, stop):
+            yield self._load(index)
+
+    def flush(self) -> None:
+        """Waits until the records queued so far are on disk"""
+        with self._commit_condition:
+            seq = self._queued
+        self._wait(seq)
+
+    def close(self) -> None:
+        """Commits the queued records and stops the writer thread"""
+        with self._commit_condition:
+            self._closing = True
+            self._commit_condition.notify_all()
+        self._writer.join()
+
+    @staticmethod
+    def _value(move: Move) -> int:
+        """Gets the value of a move's record, see _RECORD"""
+        return VALUE_CODES[move.last_moved] + 4 * RESULT_CODES[move.result]
+
+    @staticmethod
+    def _pack(game_id: int, move_id: int, x: int, y: int, value: int, micros: int) -> bytes:
+        """Packs a record, see _RECORD"""
+        fields = EventLogGameStore._RECORD_FIELDS.pack(game_id, move_id, x, y, value, micros)
+        return fields + struct.pack("<I", zlib.crc32(fields))
+
+    def _queue(self, records: List[bytes]) -> int:
+        """Queues records for the writer thread
+
+        Returns:
+            The sequence number of the batch, see _wait
+        """
+        with self._commit_condition:
+            self._pending.extend(records)
+            self._queued += 1
+            self._commit_condition.notify_all()
+            return self._queued
+
+    def _wait(self, seq: int) -> None:
+        """Waits until a queued batch is on disk"""
+        with self._commit_condition:
+            while self._committed < seq and self._writer.is_alive():
+                self._commit_condition.wait()
+
+    def _write_log(self) -> None:
+        """Writes the queued records to the log, until the store is closed (the writer thread)"""
+        logged = 0
+        while True:
+            with self._commit_condition:
+                while not self._pending and not self._closing:
+                    self._commit_condition.wait()
+                if not self._pending: # closing
+                    self._log.close()
+                    return
+                records, self._pending = self._pending, list()
+                seq = self._queued
+            try:
+                self._log.write(b"".join(records))
+                os.fsync(self._log.fileno())
+            except OSError:
+                logging.exception("Failed to write the game log, retrying")
+                with self._commit_condition:
+                    self._pending[:0] = records
+                time.sleep(1)
+                continue
+            with self._commit_condition:
+                self._committed = seq
+                self._commit_condition.notify_all()
+
+            logged += len(records)
+            if self.snapshot_records is not None and logged >= self.snapshot_records and not self._snapshotting:
+                # records written from now on go to a new log, which the snapshot doesn't replace
+                logged = 0
+                self._snapshotting = True
+                self._log.close()
+                self._segment += 1
+                self._log = open(self._log_path(self._segment), "ab", buffering=0)
+                threading.Thread(target=self._write_snapshot, args=(self._segment,),
+                    name="game-snapshot-writer", daemon=True).start()
+
+    def _write_snapshot(self, first_segment: int) -> None:
+        """Writes a snapshot of every game, replacing the logs before `first_segment`.
+
+        Every record written to the older logs was made on a game
+        before it gets here, so the snapshot has them. It may have
+        some records of the newer logs too, replaying skips them.
+        """
+        try:
+            count = len(self._games)
+            offsets = array("q")
+            tmp_path = os.path.join(self.directory, "snapshot.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(EventLogGameStore._SNAPSHOT_HEADER.pack(EventLogGameStore._SNAPSHOT_MAGIC, first_segment, count))
+                f.seek(EventLogGameStore._SNAPSHOT_HEADER.size + 16 * count)
+                first = 0
+                for index in range(count):
+                    with self.lock(self._game_id(index)):
+                        game = self._games[index]
+                        if game is None: # never retrieved, still as in the previous snapshot
+                            records = self._snapshot_records(index)
+                        else:
+                            records = self._game_records(game)
+                    f.write(records)
+                    offsets.append(first)
+                    offsets.append(len(records) // EventLogGameStore._RECORD.size)
+                    first += offsets[-1]
+                f.seek(EventLogGameStore._SNAPSHOT_HEADER.size)
+                f.write(offsets.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, os.path.join(self.directory, "snapshot.bin"))
+            self._fsync_directory()
+            for segment in self._segments():
+                if segment < first_segment:
+                    os.remove(self._log_path(segment))
+        except OSError:
+            logging.exception("Failed to write the game snapshot")
+        finally:
+            self._snapshotting = False
+
+    def _game_records(self, game: Game) -> bytes:
+        """Packs every record of a game"""
+        moves = game.get_moves()
+        first = moves[0]
+        board_type = type(first.board)
+        records = [EventLogGameStore._pack(game.id, 0, game.board_length, game.win_length,
+            EventLogGameStore._BACKEND_CODES[board_type], to_micros(first.timestamp))]
+        records.extend([
+            EventLogGameStore._pack(game.id, m.id, m.x, m.y, EventLogGameStore._value(m), to_micros(m.timestamp))
+            for m in moves[1:]
+        ])
+        return b"".join(records)
+
+    def _snapshot_records(self, index: int) -> bytes:
+        """Gets the records of a game in the snapshot, by index"""
+        first, count = self._snapshot_index[2 * index], self._snapshot_index[2 * index + 1]
+        start = EventLogGameStore._SNAPSHOT_HEADER.size + 8 * len(self._snapshot_index) + first * EventLogGameStore._RECORD.size
+        return self._snapshot[start:start + count * EventLogGameStore._RECORD.size]
+
+    def _snapshot_entry(self, index: int) -> tuple:
+        """Gets the game index's row of a game in the snapshot (see GameIndex.extend),
+        from its first and last records"""
+        records = self._snapshot_records(index)
+        size = EventLogGameStore._RECORD.size
+        game_id, _, board_length, _, _, started, _ = EventLogGameStore._RECORD.unpack_from(records)
+        _, move_id, _, _, value, last_move, _ = EventLogGameStore._RECORD.unpack_from(records, len(records) - size)
+        return game_id, board_length, started, 0 if move_id == 0 else value // 4, last_move
+
+    def _load(self, index: int) -> Game:
+        """Gets a game by index, rebuilding it from the snapshot if needed"""
+        game = self._games[index]
+        if game is not None:
+            return game
+        with self._load_lock:
+            game = self._games[index]
+            if game is None:
+                for record in EventLogGameStore._RECORD.iter_unpack(self._snapshot_records(index)):
+                    game = EventLogGameStore._replay(game, record)
+                # hooked once rebuilt, its entry is already up to date
+                game.on_move = self._game_index.update
+                self._games[index] = game
+            return game
+
+    @staticmethod
+    def _replay(game: Optional[Game], record: tuple) -> Game:
+        """Applies a record to a game (None for its first record)
+
+        Returns:
+            The game
+        """
+        game_id, move_id, x, y, value, micros, _ = record
+        if game is None:
+            board_type = EventLogGameStore._BACKENDS[value]
+            game = Game(game_id, x, board_type=board_type, win_length=y)
+            game.started = from_micros(micros)
+            game.last_move.timestamp = game.started
+        else:
+            game.make_move(x, y, VALUES[value % 4])
+            game.last_move.timestamp = from_micros(micros)
+        return game
+
+    def _recover(self) -> None:
+        """Restores the games from the snapshot and logs, and starts a new log"""
+        self._segment = 0
+        snapshot_path = os.path.join(self.directory, "snapshot.bin")
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, "rb") as f:
+                self._snapshot = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, self._segment, count = EventLogGameStore._SNAPSHOT_HEADER.unpack_from(self._snapshot)
+            if magic not in (EventLogGameStore._SNAPSHOT_MAGIC, EventLogGameStore._SNAPSHOT_MAGIC_V1):
+                raise ValueError(f"Invalid game snapshot {snapshot_path}")
+            start = EventLogGameStore._SNAPSHOT_HEADER.size
+            self._snapshot_index = array("q", self._snapshot[start:start + 16 * count])
+            self._games = [None] * count
+            self._logged = self._snapshot_index[1::2]
+            if magic == EventLogGameStore._SNAPSHOT_MAGIC:
+                self._game_index.extend([self._snapshot_entry(index) for index in range(count)])
+            else:
+                for index in range(count):
+                    self._game_index.add(self._load(index))
+
+        segments = self._segments()
+        torn = False
+        for segment in segments:
+            if segment < self._segment or torn:
+                # replaced by the snapshot and left by a crash, or written after a torn log
+                # (so its records don't follow the ones replayed)
+                os.remove(self._log_path(segment))
+            else:
+                torn = not self._replay_log(self._log_path(segment))
+        self._segment = max([self._segment - 1] + segments) + 1
+        self._log = open(self._log_path(self._segment), "ab", buffering=0)
+
+    def _replay_log(self, path: str) -> bool:
+        """Replays a log's records. A torn or corrupt tail (e.g. after a crash) is cut off.
+
+        Returns:
+            Whether the whole log was replayed
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        size = EventLogGameStore._RECORD.size
+        end = 0
+        while end + size <= len(data):
+            record = EventLogGameStore._RECORD.unpack_from(data, end)
+            if zlib.crc32(data[end:end + size - 4]) != record[-1]:
+                break
+            self._apply(record)
+            end += size
+        if end < len(data):
+            logging.warning("Cutting off the game log %s at %d bytes of %d", path, end, len(data))
+            with open(path, "r+b") as f:
+                f.truncate(end)
+            return False
+        return True
+
+    def _apply(self, record: tuple) -> None:
+        """Applies a logged record, unless the games already have it (from the snapshot)"""
+        index, move_id = self._index(record[0]), record[1]
+        if move_id == 0:
+            if index == len(self._games):
+                game = EventLogGameStore._replay(None, record)
+                game.on_move = self._game_index.update
+                self._game_index.add(game)
+                self._games.append(game)
+                self._logged.append(1)
+        elif 0 <= index < len(self._games) and move_id == self._logged[index]:
+            game = EventLogGameStore._replay(self._load(index), record)
+            self._game_index.update(game) # again, with the logged time of the move
+            self._logged[index] = move_id + 1
+
+    def _segments(self) -> List[int]:
+        """Gets the numbers of the logs, in order"""
+        return sorted([int(name[4:-4]) for name in os.listdir(self.directory)
+            if name.startswith("log.") and name.endswith(".bin")])
+
+    def _log_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"log.{segment}.bin")
+
+    def _fsync_directory(self) -> None:
+        """Makes renames in the directory durable"""
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
@@ -0,0 +1,378 @@
+import datetime
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from game_index import GameFilter
+from storage import EventLogGameStore, GameStore, InMemoryGameStore, SQLiteGameStore, TieredGameStore
+from tic_tac_toe import BitBoard, Result, X, O
+
+class TestGameStores(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "games.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def check_store(self, store):
+        self.assertEqual(len(store), 0)
+        g0 = store.create_game()
+        g1 = store.create_game(5, board_type=BitBoard)
+        self.assertEqual((g0.id, g1.id), (0, 1))
+        self.assertEqual(len(store), 2)
+        self.assertRaises(ValueError, store.get_game, 2)
+
+        g0.make_move(0, 2, X)
+        g0.make_move(0, 1, O)
+        store.save_game(g0)
+        g0.make_move(1, 2, X)
+        g0.make_move(0, 0, O)
+        g0.make_move(2, 2, X)
+        store.save_game(g0)
+        g1.make_move(4, 4, X)
+        store.save_game(g1)
+
+        g0 = store.get_game(0)
+        self.assertEqual(g0.last_move.result, Result.X_WINNER)
+        self.assertEqual(len(g0.get_moves()), 6)
+        self.assertEqual([g.id for g in store.games()], [0, 1])
+
+    def test_store_interface(self):
+        # a backend missing a method fails when created, not when the method is used
+        class Incomplete(GameStore):
+            def create_game(self, board_length=3, board_type=None, win_length=None):
+                pass
+        self.assertRaises(TypeError, Incomplete)
+        self.assertRaises(TypeError, GameStore)
+
+    def test_in_memory_store(self):
+        self.check_store(InMemoryGameStore())
+
+    def test_sqlite_store(self):
+        self.check_store(SQLiteGameStore(self.db_path))
+
+    def test_tiered_store(self):
+        self.check_store(TieredGameStore(self.db_path, capacity=1))
+
+    def test_tiered_store_flushed_on_exit(self):
+        # a server's hot games are written to the cold tier when it exits
+        script = "\n".join([
+            "import server",
+            "g = server.store.create_game()",
+            "g.make_move(0, 0, 'X')",
+            "g.make_move(1, 1, 'O')",
+            "server.store.save_game(g)",
+        ])
+        env = dict(os.environ, COLD_GAME_DB=self.db_path)
+        for name in ["GAME_DB", "GAME_LOG_DIR", "SHARD", "SHARD_COUNT"]:
+            env.pop(name, None)
+        subprocess.run([sys.executable, "-c", script], env=env, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL)
+
+        store = TieredGameStore(self.db_path)
+        self.assertEqual(len(store.get_game(0).get_moves()), 3)
+
+    def test_tiered_store_eviction(self):
+        store = TieredGameStore(self.db_path, capacity=2)
+        games = list()
+        for i in range(5):
+            g = store.create_game(4, win_length=3)
+            g.make_move(i % 4, 0, X)
+            g.make_move(i % 4, 3, O)
+            store.save_game(g)
+            games.append(g)
+        expected = [str(g) for g in games]
+        self.assertEqual(list(store._hot), [3, 4])
+
+        # idle games are rehydrated from disk, as they were
+        self.assertIsNot(store.get_game(0), games[0])
+        self.assertEqual([str(store.get_game(i)) for i in range(5)], expected)
+        self.assertEqual([str(g) for g in store.games()], expected)
+        self.assertEqual(len(store._hot), 2)
+
+        # games are spilled as soon as they are finished
+        g = store.get_game(4)
+        for x, y, value in [(0, 1, X), (0, 2, O), (1, 1, X), (1, 2, O), (2, 1, X)]:
+            g.make_move(x, y, value)
+        self.assertEqual(g.last_move.result, Result.X_WINNER)
+        store.save_game(g)
+        self.assertNotIn(4, store._hot)
+        self.assertEqual(str(store.get_game(4)), str(g))
+
+        # busy games are not spilled
+        with store.lock(0):
+            g = store.get_game(0)
+            store.get_game(1)
+            store.get_game(2)
+            self.assertIn(0, store._hot)
+
+        # flushed games survive a restart
+        store.flush()
+        restarted = TieredGameStore(self.db_path)
+        self.assertEqual([str(g) for g in restarted.games()], [str(store.get_game(i)) for i in range(5)])
+        self.assertEqual(restarted.create_game().id, 5)
+
+    def test_event_log_store(self):
+        store = EventLogGameStore(self.tmp_dir)
+        self.check_store(store)
+        store.close()
+
+    def play_games(self, store, count):
+        for i in range(count):
+            g = store.create_game(4, win_length=3)
+            for x, y, value in [(i % 4, 0, X), (i % 4, 3, O), ((i + 1) % 4, 1, X)]:
+                g.make_move(x, y, value)
+                store.save_game(g)
+
+    def play(self, store, game_id, moves):
+        with store.lock(game_id):
+            g = store.get_game(game_id)
+            for x, y, value in moves:
+                g.make_move(x, y, value)
+            store.save_game(g)
+
+    def test_event_log_store_restart(self):
+        log_dir = os.path.join(self.tmp_dir, "log")
+        store = EventLogGameStore(log_dir, wait_for_commit=True)
+        self.play_games(store, 3)
+        g = store.create_game(board_type=BitBoard)
+        g.make_computer_move()
+        store.save_game(g)
+        expected = [str(g) for g in store.games()] + [str(m) for g in store.games() for m in g.get_moves()]
+
+        # restarted without closing, as after a crash: committed moves are there
+        restarted = EventLogGameStore(log_dir)
+        self.assertEqual([str(g) for g in restarted.games()] + [str(m) for g in restarted.games() for m in g.get_moves()], expected)
+        self.assertIsInstance(restarted.get_game(3).last_move.board, BitBoard)
+        self.assertEqual(restarted.get_game(0).win_length, 3)
+
+        # a torn record at the end of a log is cut off
+        restarted.close()
+        log_path = os.path.join(log_dir, "log.1.bin")
+        with open(log_path, "ab") as f:
+            f.write(b"torn")
+        restarted = EventLogGameStore(log_dir)
+        self.assertEqual([str(g) for g in restarted.games()], expected[:4])
+        self.assertEqual(os.path.getsize(log_path), 0)
+        self.assertEqual(restarted.create_game().id, 4)
+        restarted.close()
+
+    def test_event_log_store_snapshot(self):
+        store = EventLogGameStore(self.tmp_dir, snapshot_records=10)
+        self.play_games(store, 5)
+        store.flush()
+        # the snapshot is written in the background
+        for _ in range(100):
+            if os.path.exists(os.path.join(self.tmp_dir, "snapshot.bin")) and not store._snapshotting:
+                break
+            time.sleep(0.01)
+        g = store.get_game(4)
+        g.make_move(3, 3, X)
+        store.save_game(g)
+        self.play(store, 0, [(3, 0, O), (2, 2, X)])
+        store.close()
+        expected = [str(g) for g in store.games()]
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir, "snapshot.bin")))
+        self.assertNotIn("log.0.bin", os.listdir(self.tmp_dir))
+
+        # games in the snapshot are rebuilt when retrieved, later moves are replayed
+        restarted = EventLogGameStore(self.tmp_dir)
+        self.assertEqual(len(restarted), 5)
+        self.assertIn(None, restarted._games)
+        # indexed from the snapshot, only the listed games are rebuilt
+        self.assertEqual([g.id for g in restarted.games(game_filter=GameFilter(result=Result.X_WINNER))], [0])
+        self.assertEqual(restarted._games[1:4], [None] * 3)
+        self.assertEqual([str(g) for g in restarted.games()], expected)
+        self.assertEqual(len(restarted.get_game(4).get_moves()), 5)
+        restarted.close()
+
+    def test_sqlite_store_restart(self):
+        store = SQLiteGameStore(self.db_path)
+        g = store.create_game(4)
+        g.make_move(1, 2, X)
+        g.make_move(3, 3, O)
+        store.save_game(g)
+        expected = [str(m) for m in g.get_moves()]
+
+        # a new store on the same file sees the same games
+        restarted = SQLiteGameStore(self.db_path)
+        g = restarted.get_game(0)
+        self.assertEqual(str(g), str(store.get_game(0)))
+        self.assertEqual([str(m) for m in g.get_moves()], expected)
+        self.assertIsInstance(restarted.get_game(0).last_move.board, type(g.last_move.board))
+        self.assertEqual(restarted.create_game().id, 1)
+
+    def test_sqlite_store_win_length(self):
+        store = SQLiteGameStore(self.db_path)
+        g = store.create_game(5, win_length=3)
+        for x, y, value in [(0, 0, X), (4, 4, O), (1, 1, X), (4, 3, O)]:
+            g.make_move(x, y, value)
+        store.save_game(g)
+        self.assertEqual(store.create_game(4).win_length, 4)
+
+        restarted = SQLiteGameStore(self.db_path)
+        g = restarted.get_game(0)
+        self.assertEqual(g.win_length, 3)
+        self.assertEqual(g.make_move(2, 2, X), Result.X_WINNER)
+        self.assertEqual(restarted.get_game(1).win_length, 4)
+        self.assertRaises(ValueError, restarted.create_game, 3, win_length=4)
+
+    def check_filters(self, create_store, restart=False):
+        store = create_store()
+        for board_length in (3, 4, 3, 4):
+            store.create_game(board_length, win_length=3)
+        self.play(store, 0, [(0, 0, X), (1, 0, O), (0, 1, X), (1, 1, O), (0, 2, X)])
+        self.play(store, 2, [(0, 0, X), (1, 0, O), (0, 1, X), (1, 1, O), (2, 2, X), (1, 2, O)])
+        time.sleep(0.01)
+        since = datetime.datetime.now()
+        time.sleep(0.01)
+        self.play(store, 3, [(0, 0, X)])
+        if hasattr(store, "flush"): # e.g. hot games are only written when flushed
+            store.flush()
+
+        for store in [store, create_store()] if restart else [store]:
+            list_ids = lambda *args, **criteria: [g.id for g in store.games(*args, game_filter=GameFilter(**criteria))]
+            self.assertEqual(list_ids(result=Result.ONGOING), [1, 3])
+            self.assertEqual(list_ids(result=Result.X_WINNER), [0])
+            self.assertEqual(list_ids(result=Result.O_WINNER, board_length=3), [2])
+            self.assertEqual(list_ids(result=Result.DRAW), [])
+            self.assertEqual(list_ids(board_length=4), [1, 3])
+            self.assertEqual(list_ids(2, board_length=4), [3])
+            self.assertEqual(list_ids(0, 1, board_length=4), [1])
+            self.assertEqual(list_ids(started_since=store.get_game(2).started), [2, 3])
+            self.assertEqual(list_ids(moved_since=since), [3])
+            self.assertEqual(list_ids(), [0, 1, 2, 3])
+
+    def test_in_memory_store_filters(self):
+        self.check_filters(InMemoryGameStore)
+
+    def test_sqlite_store_filters(self):
+        self.check_filters(lambda: SQLiteGameStore(self.db_path), restart=True)
+
+    def test_tiered_store_filters(self):
+        self.check_filters(lambda: TieredGameStore(self.db_path, capacity=1), restart=True)
+
+    def test_event_log_store_filters(self):
+        self.check_filters(lambda: EventLogGameStore(self.tmp_dir, wait_for_commit=True), restart=True)
+
+    def check_shards(self, create_store):
+        stores = [create_store(shard, 3) for shard in range(3)]
+        for store in stores:
+            for _ in range(2):
+                store.create_game()
+        self.assertEqual([[g.id for g in store.games()] for store in stores], [[0, 3], [1, 4], [2, 5]])
+        self.assertEqual([len(store) for store in stores], [2, 2, 2])
+
+        # IDs of other shards are invalid
+        store = stores[1]
+        self.assertEqual(store.get_game(4).id, 4)
+        for game_id in (0, 2, 3, 7, -2):
+            self.assertRaises(ValueError, store.get_game, game_id)
+        self.assertEqual([g.id for g in store.games(2)], [4])
+        self.assertEqual([g.id for g in store.games(0, 1)], [1])
+        self.assertEqual([g.id for g in store.games(5)], [])
+
+        self.assertRaises(ValueError, create_store, 3, 3)
+
+    def test_in_memory_store_shards(self):
+        self.check_shards(lambda shard, count: InMemoryGameStore(shard, count))
+
+    def test_sqlite_store_shards(self):
+        # shards can share a database
+        self.check_shards(lambda shard, count: SQLiteGameStore(self.db_path, shard, count))
+        self.assertEqual(SQLiteGameStore(self.db_path, 2, 3).create_game().id, 8)
+
+    def test_tiered_store_shards(self):
+        self.check_shards(lambda shard, count: TieredGameStore(self.db_path, shard=shard, shard_count=count))
+
+    def test_event_log_store_shards(self):
+        self.check_shards(lambda shard, count: EventLogGameStore(os.path.join(self.tmp_dir, str(shard)),
+            wait_for_commit=True, shard=shard, shard_count=count))
+        restarted = EventLogGameStore(os.path.join(self.tmp_dir, "1"), shard=1, shard_count=3)
+        self.assertEqual([g.id for g in restarted.games()], [1, 4])
+        self.assertEqual(restarted.create_game().id, 7)
+        restarted.close()
+
+    def check_concurrency(self, store):
+        # IDs are unique when games are created from several threads
+        threads = [threading.Thread(target=lambda: [store.create_game() for _ in range(20)]) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(sorted(g.id for g in store.games()), list(range(160)))
+
+        # moves made under the game's lock never interleave
+        board_length = 6
+        store.create_game(board_length)
+        game_id = len(store) - 1
+        def play(value):
+            for x in range(board_length):
+                for y in range(board_length):
+                    with store.lock(game_id):
+                        game = store.get_game(game_id)
+                        try:
+                            game.make_move(x, y, value)
+                        except ValueError:
+                            pass # taken by the other thread, or game over
+                        store.save_game(game)
+        threads = [threading.Thread(target=play, args=(value,)) for value in [X, O]]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        moves = store.get_game(game_id).get_moves()
+        self.assertEqual([m.id for m in moves], list(range(len(moves))))
+        self.assertEqual(len({(m.x, m.y) for m in moves[1:]}), len(moves) - 1)
+
+    def test_in_memory_store_concurrency(self):
+        self.check_concurrency(InMemoryGameStore())
+
+    def test_sqlite_store_concurrency(self):
+        self.check_concurrency(SQLiteGameStore(self.db_path))
+
+    def test_sqlite_store_connection_pool(self):
+        # connections are reused across threads, e.g. flask's thread per request
+        store = SQLiteGameStore(self.db_path, pool_size=2)
+        g = store.create_game()
+        def request():
+            g.make_move(len(g.get_moves()) - 1, 0, X)
+            store.save_game(g)
+            self.assertEqual(len(store.get_game(g.id).get_moves()), len(g.get_moves()))
+        for _ in range(3):
+            thread = threading.Thread(target=request)
+            thread.start()
+            thread.join()
+        self.assertEqual(store._pool.qsize(), 1)
+
+        # a listing holds its connection, so others are opened meanwhile,
+        # but at most pool_size are kept
+        listings = [store.games() for _ in range(3)]
+        self.assertEqual([next(games).id for games in listings], [0, 0, 0])
+        self.assertEqual(store._pool.qsize(), 0)
+        for games in listings:
+            games.close()
+        self.assertEqual(store._pool.qsize(), 2)
+        self.assertEqual(len(store), 1)
+        self.assertRaises(ValueError, SQLiteGameStore, self.db_path, pool_size=0)
+
+    def test_tiered_store_concurrency(self):
+        self.check_concurrency(TieredGameStore(self.db_path, capacity=16))
+
+    def test_event_log_store_concurrency(self):
+        store = EventLogGameStore(self.tmp_dir, snapshot_records=50)
+        self.check_concurrency(store)
+        store.close()
+        restarted = EventLogGameStore(self.tmp_dir)
+        self.assertEqual([str(g) for g in restarted.games()], [str(g) for g in store.games()])
+        restarted.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
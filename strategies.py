@@ -0,0 +1,484 @@
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List
+from tic_tac_toe import Board, X, O
+
+# cell codes used by the search, see _Search
+_EMPTY_CELL = 0
+_X_CELL = 1
+_O_CELL = 2
+_CELL_CODES = {X: _X_CELL, O: _O_CELL}
+
+# score of a won position, less the cells occupied when it is won (see
+# _Search._score_move). heuristic scores stay well below it on any board
+WIN = 1000000000
+
+# transposition table entry flags, i.e. what the stored score is
+EXACT = 0 # the exact score
+LOWER = 1 # a lower bound (the search failed high)
+UPPER = 2 # an upper bound (the search failed low)
+
+# symmetries are only used to canonicalize boards up to this length
+SYMMETRY_MAX_BOARD_LENGTH = 32
+
+# boards up to this length get a table of Zobrist keys,
+# larger ones compute their keys on demand
+ZOBRIST_TABLE_MAX_BOARD_LENGTH = 64
+
+# boards up to this length search every empty cell,
+# larger ones only search cells next to an occupied one
+FULL_WIDTH_MAX_BOARD_LENGTH = 5
+
+# the heuristic looks at most this many cells each way along a line, so
+# scoring a position costs the same on any board (see _Search._open_lines)
+HEURISTIC_MAX_REACH = 4
+
+class Strategy(ABC):
+    """The Strategy class is the interface for the computer player.
+
+    A Strategy chooses where the computer moves next, see Game.make_computer_move.
+    """
+
+    @abstractmethod
+    def choose_move(self, board: Board, value: str) -> tuple:
+        """Chooses the next move on a board.
+
+        Args:
+            board (Board): the current board, which must not be modified
+            value (str): the value (player) to move
+
+        Returns:
+            A tuple representing the chosen x,y coordinates
+        """
+
+
+class RandomStrategy(Strategy):
+    """A Strategy choosing a random available spot on the board."""
+
+    def choose_move(self, board: Board, value: str) -> tuple:
+        return board.get_available_coord()
+
+
+class TranspositionTable:
+    """A bounded map of searched positions to their scores.
+
+    Entries are evicted least recently used first once the table is full,
+    so a long running server doesn't grow without limit.
+    The table is thread-safe, so it can be shared across games.
+
+    Args:
+        capacity (int): the maximum number of entries. Default is 1,000,000.
+    """
+
+    capacity: int
+    _entries: OrderedDict
+    _lock: threading.Lock
+
+    def __init__(self, capacity: int = 1000000) -> None:
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> tuple:
+        """Gets an entry, marking it as recently used
+
+        Returns:
+            The (depth, score, flag) entry, or None if there is none
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry: tuple) -> None:
+        """Stores an entry, evicting the least recently used one if full"""
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# the table shared by every NegamaxStrategy, unless given another one
+SHARED_TABLE = TranspositionTable()
+
+
+class NegamaxStrategy(Strategy):
+    """A Strategy searching the game tree with negamax and alpha-beta pruning.
+
+    Searched positions are stored in a transposition table, keyed by
+    Zobrist hash. On square boards, positions are canonicalized over the
+    8 symmetries of the square, so mirrored or rotated positions share
+    an entry. The table is shared across games (and strategies) by default.
+
+    The search deepens iteratively until it solves the position,
+    reaches `max_depth` or runs out of `time_budget`, and plays the best
+    move of the deepest completed iteration. Positions cut off by the
+    depth are scored with a heuristic counting open lines. Wins score
+    higher the sooner they come, so it goes for the fastest win and,
+    when lost, holds out the longest.
+
+    Args:
+        max_depth (int): the maximum depth (in moves) to search.
+            Default is None, i.e. until the board is full.
+        time_budget (float): the time to search for, in seconds. Default is 0.5.
+        table (TranspositionTable): the transposition table to use.
+            Default is SHARED_TABLE.
+    """
+
+    max_depth: int
+    time_budget: float
+    table: TranspositionTable
+
+    def __init__(self, max_depth: int = None, time_budget: float = 0.5, table: TranspositionTable = None) -> None:
+        self.max_depth = max_depth
+        self.time_budget = time_budget
+        self.table = SHARED_TABLE if table is None else table
+
+    def choose_move(self, board: Board, value: str) -> tuple:
+        search = _Search(board, value, self.table, time.perf_counter() + self.time_budget)
+        n = search.run(self.max_depth)
+        if n is None: # not even a single iteration completed in time
+            return board.get_available_coord()
+        return n % search.board_length, n // search.board_length
+
+
+class OpeningBookStrategy(Strategy):
+    """A Strategy playing perfectly on 3x3 boards, with a precomputed opening book.
+
+    On 3x3 boards a move is a single lookup in the memory-mapped book
+    (see opening_book.py). Other boards, or positions missing from the book
+    (e.g. when the players did not alternate), are left to a fallback Strategy.
+
+    Args:
+        fallback (Strategy): the Strategy used when the book has no move.
+            Default is None, i.e. a NegamaxStrategy.
+    """
+
+    fallback: Strategy
+
+    def __init__(self, fallback: Strategy = None) -> None:
+        # imported here, so the book is only loaded when used
+        from opening_book import get_book
+        self.book = get_book()
+        self.fallback = NegamaxStrategy() if fallback is None else fallback
+
+    def choose_move(self, board: Board, value: str) -> tuple:
+        # the book only knows the full line rule
+        if board.board_length == self.book.board_length and board.win_length == board.board_length:
+            move = self.book.best_move(board)
+            if move is not None:
+                return move
+        return self.fallback.choose_move(board, value)
+
+
+# strategies that can be selected by name
+STRATEGIES = {
+    "random": RandomStrategy,
+    "negamax": NegamaxStrategy,
+    "book": OpeningBookStrategy,
+}
+
+
+class _SearchTimeout(Exception):
+    """Raised inside a search when it runs out of time"""
+
+
+class _Search:
+    """The state of a single NegamaxStrategy search.
+
+    The board is kept as a bytearray of cell codes, one per availability
+    number, and moves are made and unmade in place. The Zobrist hash of
+    the board under each symmetry is updated incrementally. Setting up
+    a search only visits the occupied cells, not the whole board.
+    """
+
+    def __init__(self, board: Board, value: str, table: TranspositionTable, deadline: float) -> None:
+        self.board_length = board.board_length
+        self.win_length = board.win_length
+        self.cells = bytearray(self.board_length * self.board_length) # all _EMPTY_CELL
+        self.occupied = list()
+        for n, cell_value in board.get_occupied_cells():
+            self.cells[n] = _CELL_CODES[cell_value]
+            self.occupied.append(n)
+        self.player = _CELL_CODES[value]
+        self.table = table
+        self.deadline = deadline
+
+        self.symmetries = _symmetries(self.board_length)
+        self.keys = _zobrist_keys(self.board_length)
+        self.hashes = [0] * len(self.symmetries)
+        for n in self.occupied:
+            self._hash(n, self.cells[n])
+
+    def run(self, max_depth: int = None) -> int:
+        """Searches, deepening iteratively
+
+        Returns:
+            The availability number of the best move, or None if
+            no iteration completed
+        """
+        empties = len(self.cells) - len(self.occupied)
+        max_depth = empties if max_depth is None else min(max_depth, empties)
+        moves = self._candidates()
+        if len(moves) == 0:
+            return None
+        for n in moves: # always take a win
+            if self._wins_with(n, self.player):
+                return n
+
+        best = None
+        try:
+            for depth in range(1, max_depth + 1):
+                score, best = self._root(moves, depth)
+                # try the best move first on the next iteration
+                moves.remove(best)
+                moves.insert(0, best)
+                if abs(score) > WIN - len(self.cells): # solved, a win or a loss
+                    break
+        except _SearchTimeout:
+            pass
+        return best
+
+    def _root(self, moves: List[int], depth: int) -> tuple:
+        """Searches every root move to a given depth
+
+        Returns:
+            The best score and move, as a tuple
+        """
+        alpha, beta = -WIN - 1, WIN + 1
+        best_score, best_move = None, None
+        for n in moves:
+            score = self._score_move(n, self.player, depth, alpha, beta)
+            if best_score is None or score > best_score:
+                best_score, best_move = score, n
+            alpha = max(alpha, score)
+        return best_score, best_move
+
+    def _score_move(self, n: int, player: int, depth: int, alpha: int, beta: int) -> int:
+        """Scores a move for the player making it"""
+        self._place(n, player)
+        try:
+            if self._wins(n, player):
+                # the same position always has as many cells occupied,
+                # so the score doesn't depend on where the search started
+                return WIN - len(self.occupied)
+            elif len(self.occupied) == len(self.cells):
+                return 0 # draw
+            return -self._negamax(depth - 1, -beta, -alpha, _opponent(player))
+        finally:
+            self._unplace(n, player)
+
+    def _negamax(self, depth: int, alpha: int, beta: int, player: int) -> int:
+        """Scores the position for the player to move"""
+        # checked at every node, as a single node can be slow on a large board
+        if time.perf_counter() > self.deadline:
+            raise _SearchTimeout()
+
+        # a search to the end of the game is exact at any depth
+        depth = min(depth, len(self.cells) - len(self.occupied))
+        key = (self.board_length, self.win_length, player, min(self.hashes))
+        entry = self.table.get(key)
+        if entry is not None and entry[0] >= depth:
+            entry_depth, score, flag = entry
+            if flag == EXACT:
+                return score
+            elif flag == LOWER:
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
+            if alpha >= beta:
+                return score
+
+        if depth == 0:
+            return self._evaluate(player)
+
+        alpha_original = alpha
+        best = -WIN - 1
+        for n in self._candidates():
+            score = self._score_move(n, player, depth, alpha, beta)
+            best = max(best, score)
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        if best <= alpha_original:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table.put(key, (depth, best, flag))
+        return best
+
+    def _candidates(self) -> List[int]:
+        """Gets the moves to search, most promising (central) first"""
+        board_length = self.board_length
+        if board_length <= FULL_WIDTH_MAX_BOARD_LENGTH:
+            return [n for n in _central_order(board_length) if self.cells[n] == _EMPTY_CELL]
+        elif len(self.occupied) == 0:
+            center = (board_length - 1) // 2
+            return [center * board_length + center]
+        # only cells next to an occupied one
+        moves = set()
+        for n in self.occupied:
+            x, y = n % board_length, n // board_length
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    nx, ny = x + dx, y + dy
+                    if 0 <= nx < board_length and 0 <= ny < board_length:
+                        m = ny * board_length + nx
+                        if self.cells[m] == _EMPTY_CELL:
+                            moves.add(m)
+        center = (board_length - 1) / 2
+        return sorted(moves, key=lambda m: abs(m % board_length - center) + abs(m // board_length - center))
+
+    def _evaluate(self, player: int) -> int:
+        """Heuristic score of the position for the player to move:
+        the lines still open to each player, through their cells"""
+        score = 0
+        for n in self.occupied:
+            cell = self.cells[n]
+            open_lines = self._open_lines(n, cell)
+            score += open_lines if cell == player else -open_lines
+        return score
+
+    def _open_lines(self, n: int, player: int) -> int:
+        """Counts the directions through a cell with room for a winning line
+        that the opponent hasn't blocked, looking up to HEURISTIC_MAX_REACH
+        cells each way"""
+        board_length = self.board_length
+        reach = min(self.win_length - 1, HEURISTIC_MAX_REACH) # farthest cell of a line through n
+        opponent = _opponent(player)
+        x, y = n % board_length, n // board_length
+        count = 0
+        for dx, dy in _DIRECTIONS:
+            length = 1
+            for sign in (1, -1):
+                nx, ny, steps = x + sign * dx, y + sign * dy, 0
+                while steps < reach and 0 <= nx < board_length and 0 <= ny < board_length and self.cells[ny * board_length + nx] != opponent:
+                    length += 1
+                    nx, ny, steps = nx + sign * dx, ny + sign * dy, steps + 1
+            if length > reach:
+                count += 1
+        return count
+
+    def _wins(self, n: int, player: int) -> bool:
+        """Checks whether the player's piece at a cell completes a line"""
+        board_length = self.board_length
+        reach = self.win_length - 1 # farthest cell of a line through n
+        x, y = n % board_length, n // board_length
+        for dx, dy in _DIRECTIONS:
+            length = 1
+            for sign in (1, -1):
+                nx, ny, steps = x + sign * dx, y + sign * dy, 0
+                while steps < reach and 0 <= nx < board_length and 0 <= ny < board_length and self.cells[ny * board_length + nx] == player:
+                    length += 1
+                    nx, ny, steps = nx + sign * dx, ny + sign * dy, steps + 1
+            if length > reach:
+                return True
+        return False
+
+    def _wins_with(self, n: int, player: int) -> bool:
+        """Checks whether the player would win by moving to a cell"""
+        self.cells[n] = player
+        try:
+            return self._wins(n, player)
+        finally:
+            self.cells[n] = _EMPTY_CELL
+
+    def _place(self, n: int, player: int) -> None:
+        self.cells[n] = player
+        self.occupied.append(n)
+        self._hash(n, player)
+
+    def _unplace(self, n: int, player: int) -> None:
+        self.cells[n] = _EMPTY_CELL
+        self.occupied.pop()
+        self._hash(n, player) # xor is its own inverse
+
+    def _hash(self, n: int, player: int) -> None:
+        """Toggles a piece in the hash of every symmetry"""
+        keys = self.keys
+        for i, symmetry in enumerate(self.symmetries):
+            self.hashes[i] ^= keys[2 * symmetry[n] + player - 1]
+
+
+# the 4 directions a line can go in (the other 4 are their opposites)
+_DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+
+def _opponent(player: int) -> int:
+    return _O_CELL if player == _X_CELL else _X_CELL
+
+class _HashedKeys:
+    """Zobrist keys computed on demand (with splitmix64), for large boards"""
+
+    def __init__(self, board_length: int) -> None:
+        self.seed = board_length << 32
+
+    def __getitem__(self, i: int) -> int:
+        z = (self.seed + i + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+        return z ^ (z >> 31)
+
+@lru_cache(maxsize=16)
+def _zobrist_keys(board_length: int):
+    """Gets the Zobrist keys of a board size: one random 64 bit key
+    per cell and player, at index 2 * cell + player - 1.
+
+    Keys are seeded by the board length, so they are the same
+    in every process.
+    """
+    if board_length > ZOBRIST_TABLE_MAX_BOARD_LENGTH:
+        return _HashedKeys(board_length)
+    rng = random.Random(board_length)
+    return tuple(rng.getrandbits(64) for _ in range(2 * board_length * board_length))
+
+@lru_cache(maxsize=16)
+def _symmetries(board_length: int) -> tuple:
+    """Gets the symmetries of the square used to canonicalize a board size,
+    each as a tuple mapping an availability number to its image.
+
+    Boards longer than SYMMETRY_MAX_BOARD_LENGTH only get the identity.
+    """
+    if board_length > SYMMETRY_MAX_BOARD_LENGTH:
+        return (range(board_length * board_length),) # identity, without a table
+    last = board_length - 1
+    transforms = [
+            lambda x, y: (x, y),
+            lambda x, y: (last - y, x), # rotations
+            lambda x, y: (last - x, last - y),
+            lambda x, y: (y, last - x),
+            lambda x, y: (last - x, y), # reflections
+            lambda x, y: (x, last - y),
+            lambda x, y: (y, x),
+            lambda x, y: (last - y, last - x),
+    ]
+    symmetries = list()
+    for transform in transforms:
+        symmetry = list()
+        for n in range(board_length * board_length):
+            x, y = transform(n % board_length, n // board_length)
+            symmetry.append(y * board_length + x)
+        symmetries.append(tuple(symmetry))
+    return tuple(symmetries)
+
+@lru_cache(maxsize=16)
+def _central_order(board_length: int) -> tuple:
+    """Gets every availability number, ordered from the center out"""
+    center = (board_length - 1) / 2
+    cells = range(board_length * board_length)
+    return tuple(sorted(cells, key=lambda n: abs(n % board_length - center) + abs(n // board_length - center)))
@@ -0,0 +1,152 @@
+import itertools
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from opening_book import OpeningBook, get_book, write_book
+from strategies import NegamaxStrategy, OpeningBookStrategy, RandomStrategy, Strategy, TranspositionTable
+from tic_tac_toe import BitBoard, Board, Game, Result, X, O
+
+class TestStrategies(unittest.TestCase):
+
+    def play(self, game, x_strategy, o_strategy):
+        value, strategy = X, x_strategy
+        while game.last_move.result == Result.ONGOING:
+            game.make_computer_move(value, strategy)
+            value, strategy = (O, o_strategy) if value == X else (X, x_strategy)
+        return game.last_move.result
+
+    def test_random_strategy(self):
+        g = Game(0)
+        self.assertIn(self.play(g, RandomStrategy(), RandomStrategy()), [Result.X_WINNER, Result.O_WINNER, Result.DRAW])
+        with self.assertRaises(TypeError): # an interface only
+            Strategy()
+
+    def test_negamax_never_loses(self):
+        random.seed(42)
+        negamax = NegamaxStrategy(table=TranspositionTable())
+        for i in range(30):
+            g = Game(i, board_type=BitBoard)
+            self.assertNotEqual(self.play(g, RandomStrategy(), negamax), Result.X_WINNER)
+            g = Game(i)
+            self.assertNotEqual(self.play(g, negamax, RandomStrategy()), Result.O_WINNER)
+        # perfect play on both sides is a draw
+        self.assertEqual(self.play(Game(0), negamax, negamax), Result.DRAW)
+
+    def test_negamax_wins_and_blocks(self):
+        negamax = NegamaxStrategy(table=TranspositionTable())
+        g = Game(0)
+        g.make_move(0, 0, X)
+        g.make_move(0, 1, O)
+        g.make_move(1, 0, X)
+        g.make_computer_move(O, negamax) # must block (2, 0)
+        self.assertEqual(g.last_move.x, 2)
+        self.assertEqual(g.last_move.y, 0)
+
+        g = Game(0, board_length=4)
+        for x, y, value in [(0, 0, O), (0, 3, X), (1, 1, O), (1, 3, X), (2, 2, O), (2, 3, X)]:
+            g.make_move(x, y, value)
+        # O wins on the diagonal instead of blocking X's row
+        self.assertEqual(g.make_computer_move(O, negamax), Result.O_WINNER)
+
+        # k in a row: X must block O's three on a 9x9 board
+        g = Game(0, board_length=9, win_length=4)
+        for x, y, value in [(4, 4, X), (2, 6, O), (1, 6, X), (3, 6, O), (8, 0, X), (4, 6, O)]:
+            g.make_move(x, y, value)
+        self.assertEqual(g.make_computer_move(X, NegamaxStrategy(time_budget=0.5, table=TranspositionTable())), Result.ONGOING)
+        self.assertEqual((g.last_move.x, g.last_move.y), (5, 6))
+
+    def test_negamax_delays_loss(self):
+        # O loses anyway after X's fork, but blocks rather than losing at once,
+        # also when the loss is already in the table from an earlier search
+        negamax = NegamaxStrategy(table=TranspositionTable())
+        for _ in range(2):
+            g = Game(0)
+            for x, y, value in [(0, 0, X), (1, 0, X), (0, 1, O)]:
+                g.make_move(x, y, value)
+            g.make_computer_move(O, negamax)
+            self.assertEqual((g.last_move.x, g.last_move.y), (2, 0))
+
+    def test_negamax_time_budget(self):
+        # a large board still answers, with a legal move
+        negamax = NegamaxStrategy(time_budget=0.2, table=TranspositionTable())
+        g = Game(0, board_length=15)
+        g.make_move(7, 7, X)
+        self.assertEqual(g.make_computer_move(O, negamax), Result.ONGOING)
+        g.make_move(0, 0, X)
+        self.assertEqual(g.make_computer_move(O, negamax), Result.ONGOING)
+
+        # the budget holds however large the board is: on a clock ticking once
+        # per read, the search stops on the first node past the deadline
+        negamax = NegamaxStrategy(time_budget=50, table=TranspositionTable())
+        g = Game(0, board_length=500)
+        g.make_move(250, 250, X)
+        with mock.patch("strategies.time") as fake_time:
+            fake_time.perf_counter.side_effect = itertools.count()
+            for value in [O, X, O, X]:
+                fake_time.perf_counter.reset_mock()
+                self.assertEqual(g.make_computer_move(value, negamax), Result.ONGOING)
+                # a read to set the deadline, one per node until it passes
+                self.assertLessEqual(fake_time.perf_counter.call_count, 1 + 50 + 1)
+
+    def test_transposition_table_bounded(self):
+        table = TranspositionTable(capacity=2)
+        table.put("a", 1)
+        table.put("b", 2)
+        table.get("a") # "b" is now least recently used
+        table.put("c", 3)
+        self.assertEqual(len(table), 2)
+        self.assertIsNone(table.get("b"))
+        self.assertEqual(table.get("a"), 1)
+
+        negamax = NegamaxStrategy(table=TranspositionTable(capacity=100))
+        self.play(Game(0), negamax, negamax)
+        self.assertLessEqual(len(negamax.table), 100)
+
+    def test_opening_book_never_loses(self):
+        random.seed(7)
+        book = OpeningBookStrategy(fallback=RandomStrategy()) # a fallback move would be a bug
+        for i in range(200):
+            self.assertNotEqual(self.play(Game(i), RandomStrategy(), book), Result.X_WINNER)
+            self.assertNotEqual(self.play(Game(i, board_type=BitBoard), book, RandomStrategy()), Result.O_WINNER)
+        self.assertEqual(self.play(Game(0), book, book), Result.DRAW)
+
+    def test_opening_book_lookup(self):
+        book = get_book()
+        board = Board()
+        for x, y, value in [(0, 0, X), (1, 1, O), (2, 2, X), (0, 2, O)]:
+            board.update(x, y, value)
+        self.assertEqual(book.best_move(board), (2, 0)) # block O's diagonal
+        board.update(2, 0, X)
+        board.update(2, 1, O)
+        self.assertEqual(book.best_move(board), (1, 0)) # X wins on the top row
+        board.update(1, 0, X)
+        self.assertIsNone(book.best_move(board)) # game over
+
+        # other board sizes go to the fallback
+        g = Game(0, board_length=4)
+        g.make_computer_move(X, OpeningBookStrategy())
+        self.assertEqual(len(g.get_moves()), 2)
+
+    def test_opening_book_file(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, "book.bin")
+            write_book(path)
+            self.assertEqual(len(OpeningBook(path)), len(get_book()))
+            with open(path, "r+b") as f:
+                f.write(b"JUNK")
+            self.assertRaises(ValueError, OpeningBook, path)
+
+            # the book is only built explicitly, never when loading it
+            missing = os.path.join(tmp_dir, "missing.bin")
+            self.assertRaises(OSError, get_book, missing)
+            self.assertFalse(os.path.exists(missing))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
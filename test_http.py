@@ -36,6 +36,9 @@ def test_http(raise_errors: bool = False):
     check_response(r, "\"move_id\": 1", raise_errors=raise_errors)
     r = test_moves_get(0, 1)
     check_response(r, "\"move_id\": 1", raise_errors=raise_errors)
+    r = test_moves_batch_post([{"game_id": 0, "x": 0, "y": 0}, {"game_id": 99, "x": 0, "y": 0}])
+    check_response(r, "\"game_id\":0", raise_errors=raise_errors)
+    check_response(r, "Requested game not found", raise_errors=raise_errors)
 
 def test_games_get(game_id: int=None):
     url = BASE_URL + "/games"
@@ -55,6 +58,12 @@ def test_moves_post(game_id, x, y):
     r = post(url, {"game_id": game_id}, {"x": x, "y": y})
     return response_handler(r)
 
+def test_moves_batch_post(moves: list):
+    url = BASE_URL + "/moves/batch"
+    print (f"POST {url}...")
+    print(f"json: {moves}")
+    return response_handler(requests.post(url, json=moves))
+
 def test_moves_get(game_id, move_id=None):
     url = BASE_URL + "/moves"
     if move_id is None:
@@ -1,11 +1,15 @@
 from array import array
+from collections import OrderedDict
+from collections.abc import Sequence
 from enum import Enum
 import datetime
 from copy import deepcopy
+from functools import lru_cache
 from queue import Empty
-from random import choice
+from random import randrange
 import json
-from typing import List
+import threading
+from typing import Callable, List, Optional
 import numpy as np
 
 # These are our "Values"
@@ -13,6 +17,27 @@ X = "X"
 O = "O"
 EMPTY = "."
 
+# These are the formats a Board can be rendered in, see Move.board_state
+LEGACY_BOARD = "legacy" # numpy rendering of the rows, e.g. "['X' '.'], ['.' 'O']"
+FLAT_BOARD = "flat" # one value per cell, row by row, e.g. "X..O"
+ROWS_BOARD = "rows" # nested arrays of values, e.g. [["X", "."], [".", "O"]]
+BOARD_FORMATS = (LEGACY_BOARD, FLAT_BOARD, ROWS_BOARD)
+
+# the 4 directions of a line through a cell: row, column, diagonal and anti-diagonal
+_DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+
+# boards up to this length have their rendering cached on each Move,
+# larger ones are rendered on demand so the history stays small
+MAX_CACHED_BOARD_LENGTH = 32
+
+# the number of renderings cached per Game, least recently used first out,
+# e.g. the last move's in a few formats (see Move.board_state)
+MAX_CACHED_BOARD_STATES = 4
+
+# guards the renderings cached on every Game, so reading a Move
+# (e.g. by a GET) never races another read updating the cache
+_BOARD_STATES_LOCK = threading.Lock()
+
 class Result(Enum):
     """Enum class used to describe the state or result of a Game.
     """
@@ -21,6 +46,102 @@ class Result(Enum):
     DRAW = "Game ended in a draw"
     ONGOING = "Game still ongoing"
 
+# compact codes of each Result, e.g. to keep results in uint8 arrays
+RESULT_CODES = {
+    Result.ONGOING: 0,
+    Result.X_WINNER: 1,
+    Result.O_WINNER: 2,
+    Result.DRAW: 3,
+}
+
+# the Result of each code, i.e. RESULTS[RESULT_CODES[r]] is r
+RESULTS = tuple(RESULT_CODES)
+
+class _FreeCells:
+    """Set of the available (free) cells of a Board, as availability numbers.
+
+    The cells are kept in a dense array, with a position index per cell.
+    The first `_count` entries of the dense array are the free cells,
+    so picking a random free cell and removing a cell (by swapping it
+    with the last free entry) are both O(1).
+
+    Copies are copy-on-write: a copy shares the arrays with the original
+    until either of them is modified, so cloning a Board (e.g. for a
+    history snapshot) does not copy the cells.
+    """
+
+    # dense array of cells, free cells first
+    _cells: array
+
+    # position of each cell in the dense array
+    _positions: array
+
+    # number of free cells
+    _count: int
+
+    # whether the arrays may be referenced by another copy
+    _shared: bool
+
+    def __init__(self, size: int = 0) -> None:
+        self._cells = array('i', range(size))
+        self._positions = array('i', range(size))
+        self._count = size
+        self._shared = False
+
+    def copy(self) -> '_FreeCells':
+        clone = _FreeCells()
+        clone._cells = self._cells
+        clone._positions = self._positions
+        clone._count = self._count
+        clone._shared = self._shared = True
+        return clone
+
+    def remove(self, n: int) -> None:
+        """Removes a cell, in O(1)
+
+        Raises:
+            KeyError: if the cell is not free
+        """
+        if n not in self:
+            raise KeyError(n)
+        if self._shared: # copy before writing, someone else may be reading
+            self._cells = self._cells[:]
+            self._positions = self._positions[:]
+            self._shared = False
+        # swap the removed cell with the last free cell
+        i = self._positions[n]
+        last_i = self._count - 1
+        last = self._cells[last_i]
+        self._cells[i] = last
+        self._positions[last] = i
+        self._cells[last_i] = n
+        self._positions[n] = last_i
+        self._count -= 1
+
+    def random(self) -> int:
+        """Picks a free cell at random, in O(1)
+
+        Raises:
+            IndexError: if there are no free cells
+        """
+        if self._count == 0:
+            raise IndexError("No free cells")
+        return self._cells[randrange(self._count)]
+
+    def __contains__(self, n: int) -> bool:
+        return 0 <= n < len(self._positions) and self._positions[n] < self._count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self):
+        return iter(self._cells[:self._count])
+
+    def taken(self) -> array:
+        """Gets the cells that are not free, in O(taken cells)"""
+        return self._cells[self._count:]
+
+
 class Board:
     """The Board class represents a tic-tac-toe board 
     and the operations that can be performed on it.
@@ -29,50 +150,65 @@ class Board:
     the array is maintained internally this should not be accessed publicly.
 
     Boards can be made with variable sizes, but are always a square.
+    A game is won by putting `win_length` values in a row (horizontally,
+    vertically or diagonally), by default a full line of the board.
     """
 
     # board is a square, just need one "length" property
     _board_length: int
 
+    # number of values in a row needed to win
+    _win_length: int
+
     # outer array is "y" axis (rows), inner arrays are "x" axis (columns)
     _state: np.array
 
     # availability keeps track of available spots as ints
-    _available: set
+    _available: _FreeCells
+
+    # number of cells each value (player) has on each line:
+    # rows, then columns, then the diagonal and the anti-diagonal
+    _line_counts: dict
 
-    def __init__(self, cloned_board: 'Board' = None, board_length: int = 3) -> None:
+    def __init__(self, cloned_board: 'Board' = None, board_length: int = 3, win_length: int = None) -> None:
         """Create a board.
 
         A board can be cloned off of an existing Board, if provided, or 
         it can be created from "scratch". If created from "scratch", the user can
-        optionally provide a board "length."
+        optionally provide a board "length" and a win length.
 
         Args:
         cloned_board (optional, Board): the board to clone. Defaults to None.
         board_length (optional, int): the "length" (and "width") of the board to create.
             Defaults to 3.
+        win_length (optional, int): the number of values in a row that wins.
+            Defaults to None, i.e. the board length.
 
         Raises:
             ValueError: If request board length property is below 0
-                or is not a valid int
+                or is not a valid int, or if the win length is not
+                between 1 and the board length
         """
         if cloned_board == None: # empty board
             # initialize "empty" board
             if board_length < 1:
                 raise ValueError("Invalid board size provided")
             self._board_length = board_length
+            self._win_length = _check_win_length(board_length, win_length)
             self._state = np.full((board_length, board_length), EMPTY)
 
-            # an optimization would be to initialize the availability
-            # set in a random order here, so then we can just pop off later
-            self._available = set()
-            for i in range(board_length * board_length):
-                self._available.add(i) 
+            self._available = _FreeCells(board_length * board_length)
+            lines = 2 * board_length + 2
+            self._line_counts = {X: array("i", bytes(4 * lines)), O: array("i", bytes(4 * lines))}
         
         else: # cloned board
             self._board_length = cloned_board._board_length
+            self._win_length = cloned_board._win_length
             self._state = np.copy(cloned_board._state)
-            self._available = cloned_board._available
+            # copy-on-write, so clones (e.g. history snapshots)
+            # stay independent of the board they were cloned from
+            self._available = cloned_board._available.copy()
+            self._line_counts = {v: array("i", counts) for v, counts in cloned_board._line_counts.items()}
 
     
     def update(self, x, y, value):
@@ -91,6 +227,16 @@ class Board:
         self._state[y,x] = value
         self._available.remove(self._coord_to_number(x, y)) # remove from available numbers
 
+        # count the value on every line through the cell
+        board_length = self._board_length
+        counts = self._line_counts[value]
+        counts[y] += 1
+        counts[board_length + x] += 1
+        if x == y:
+            counts[2 * board_length] += 1
+        if x + y == board_length - 1:
+            counts[2 * board_length + 1] += 1
+
     def _coord_to_number(self, x, y):
         """Translate a coordinate to its representative availability number
 
@@ -142,7 +288,11 @@ class Board:
         """Checks whether there is a winner on the board. 
         
         The coordinates and value of the most recent move
-        are provided to allow for a quicker check.
+        are provided to allow for a quicker check: only the lines
+        through the move can have been completed. When a full line wins,
+        each line's count of the value is kept up to date by `update`,
+        so this is constant time whatever the board size; otherwise only
+        the cells within win_length - 1 of the move are scanned.
 
         Args:
             x (int): x coordinate of most recent move
@@ -152,41 +302,46 @@ class Board:
         Returns:
             Whether or not there is a winner (bool)
         """
-        diags = self._get_diagonals()
-        return Board._check_array_winner(self._state[y], value) or Board._check_array_winner(self._get_column(x), value) or Board._check_array_winner(diags[0], value) or Board._check_array_winner(diags[1], value)
-    
-    @staticmethod
-    def _check_array_winner(array_to_check: array, value: str) -> bool:
-        """Utility method to check whether a given array is a winner,
-         i.e. whether the array has only the specified value
-        
-        Args:
-            array_to_check (array): the array to check
-            value (str): value to check
+        board_length = self._board_length
+        if self._win_length < board_length:
+            return any(self._run_length(x, y, dx, dy, value) >= self._win_length for dx, dy in _DIRECTIONS)
+        counts = self._line_counts[value]
+        if counts[y] == board_length or counts[board_length + x] == board_length:
+            return True
+        # diagonals only go through some cells
+        if x == y and counts[2 * board_length] == board_length:
+            return True
+        return x + y == board_length - 1 and counts[2 * board_length + 1] == board_length
+
+    def _run_length(self, x, y, dx, dy, value) -> int:
+        """Counts the values in a row through a cell, along a direction
+        (both ways), looking at most win_length - 1 cells away
 
-        Returns:
-            Whether or not the array is a winner,
-            i.e. whether or not its elements are only the specified value
-        """
-        return np.all(array_to_check == value)
+        Args:
+            x (int): x coordinate of the cell, which holds the value
+            y (int): y coordinate of the cell
+            dx (int): x step of the direction
+            dy (int): y step of the direction
+            value (str): the value to count
 
-    def _get_column(self, x) -> array:
-        return self._state[:,x]
-        
-    def _get_diagonals(self):
-        """Gets the diagonals of the board as arrays
-        
         Returns:
-            A list of 2 arrays, each is a diagonal    
+            The number of values in a row, an int up to 2 * win_length - 1
         """
-        diags = list()
-        diags.append(np.diag(self._state))
-        diags.append(np.diag(np.fliplr(self._state)))
-        return diags
+        board_length = self._board_length
+        state = self._state
+        length = 1
+        for sign in (1, -1):
+            nx, ny = x + sign * dx, y + sign * dy
+            for _ in range(self._win_length - 1):
+                if not (0 <= nx < board_length and 0 <= ny < board_length) or state[ny, nx] != value:
+                    break
+                length += 1
+                nx, ny = nx + sign * dx, ny + sign * dy
+        return length
 
     def check_draw(self) -> bool:
         # check whether available set is empty
-        return self._available == set() 
+        return len(self._available) == 0
     
     def get_available_coord(self) -> tuple:
         """Gets an available coordinate from the board.
@@ -195,12 +350,54 @@ class Board:
         Returns:
             A tuple representing the chosen x,y coordinates
         """
-        
-        # improve this, currently o(n) time complexity.
-        # instead of randomly choosing from a list here
-        # we could create the availability set in a random order
-        # and simply pop off the first value here.
-        return self._number_to_coord(choice(list(self._available)))
+        return self._number_to_coord(self._available.random())
+
+    def get_occupied_cells(self) -> List[tuple]:
+        """Gets the occupied cells of the board, in O(occupied cells)
+        rather than O(board size)
+
+        Returns:
+            A list of (availability number, value) tuples, by availability number
+        """
+        return [(n, self._get_value(n)) for n in sorted(self._available.taken())]
+
+    def _get_value(self, n) -> str:
+        """Gets the value at an availability number
+
+        Args:
+        n (int): availability number
+
+        Returns:
+            The value (str) at the cell, X, O or EMPTY
+        """
+        return str(self._state[n // self._board_length, n % self._board_length])
+
+    @property
+    def board_length(self) -> int:
+        """The "length" (and width) of the board"""
+        return self._board_length
+
+    @property
+    def win_length(self) -> int:
+        """The number of values in a row that wins"""
+        return self._win_length
+
+    def to_string(self) -> str:
+        """Renders the board as a flat string, one value per cell, row by row
+
+        Returns:
+            The board as a string of board_length*board_length values
+        """
+        # '<U1' arrays are little-endian UCS-4 chars
+        return self._state.tobytes().decode("utf-32-le")
+
+    def clone(self) -> 'Board':
+        """Clone the board, keeping its backend.
+
+        Returns:
+            An independent copy of the board
+        """
+        return type(self)(cloned_board=self)
 
     def __str__(self) -> str:
         return ", ".join([str(r) for r in self._state])
@@ -208,7 +405,173 @@ class Board:
     def __repr__(self) -> str:
         return ", ".join([str(r) for r in self._state])
 
-    
+
+def _check_win_length(board_length: int, win_length: int) -> int:
+    """Validates a board's win length
+
+    Returns:
+        The win length, the board length if None
+
+    Raises:
+        ValueError: If the win length is not between 1 and the board length
+    """
+    if win_length is None:
+        return board_length
+    if win_length < 1 or win_length > board_length:
+        raise ValueError("Invalid win length provided")
+    return win_length
+
+@lru_cache(maxsize=4096)
+def _line_masks(board_length: int, n: int, win_length: int = None) -> tuple:
+    """Gets the bitmasks of every winning line (win_length cells in a row,
+    horizontally, vertically or diagonally) that goes through a given
+    availability number.
+
+    With the default win length these are the full row, column
+    and (if the cell is on one) diagonals.
+
+    Args:
+        board_length (int): the "length" of the board
+        n (int): availability number of the cell
+        win_length (int): the length of the lines. Default is None, i.e. the board length.
+
+    Returns:
+        A tuple of int bitmasks, one per line through the cell
+    """
+    if win_length is None:
+        win_length = board_length
+    x, y = n % board_length, n // board_length
+    masks = list()
+    for dx, dy in _DIRECTIONS:
+        # every line starting up to win_length - 1 cells before the cell
+        for offset in range(win_length):
+            sx, sy = x - offset * dx, y - offset * dy
+            ex, ey = sx + (win_length - 1) * dx, sy + (win_length - 1) * dy
+            if not (0 <= sx < board_length and 0 <= sy < board_length and 0 <= ex < board_length and 0 <= ey < board_length):
+                continue
+            mask = 0
+            for i in range(win_length):
+                mask |= 1 << (board_length * (sy + i * dy) + sx + i * dx)
+            masks.append(mask)
+    return tuple(masks)
+
+
+class BitBoard(Board):
+    """A Board backend that stores each player's cells as an int bitmask.
+
+    Bit number n (see `_coord_to_number`) is set in a player's bitmask
+    when that player occupies the cell. A win check is then a couple of
+    integer "and"s against the precomputed masks of the lines going through
+    the most recent move, instead of scanning numpy arrays.
+
+    This is meant for small boards (the default 3x3 is the hot path);
+    on very large boards the bitmasks become big ints and
+    the numpy Board is the better choice.
+    """
+
+    # one bitmask per value (player)
+    _bits: dict
+
+    def __init__(self, cloned_board: 'BitBoard' = None, board_length: int = 3, win_length: int = None) -> None:
+        """Create a board. See Board.
+
+        Raises:
+            ValueError: If request board length property is below 0
+                or is not a valid int, or if the win length is not
+                between 1 and the board length
+        """
+        if cloned_board == None: # empty board
+            if board_length < 1:
+                raise ValueError("Invalid board size provided")
+            self._board_length = board_length
+            self._win_length = _check_win_length(board_length, win_length)
+            self._bits = {X: 0, O: 0}
+            self._available = _FreeCells(board_length * board_length)
+        else: # cloned board
+            self._board_length = cloned_board._board_length
+            self._win_length = cloned_board._win_length
+            self._bits = dict(cloned_board._bits)
+            self._available = cloned_board._available.copy()
+
+    def update(self, x, y, value):
+        """Update a board with a move. See Board.
+
+        Raises:
+            ValueError: If invalid coordinates are provided, or if
+                the spot is already occupied, or if the value is invalid.
+        """
+        self.check_validity(x, y, value)
+        n = self._coord_to_number(x, y)
+        self._bits[value] |= 1 << n
+        self._available.remove(n) # remove from available numbers
+
+    def check_winner(self, x, y, value) -> bool:
+        """Checks whether the most recent move won the game. See Board.
+
+        Returns:
+            Whether or not there is a winner (bool)
+        """
+        bits = self._bits[value]
+        for mask in _line_masks(self._board_length, self._coord_to_number(x, y), self._win_length):
+            if bits & mask == mask:
+                return True
+        return False
+
+    def _get_value(self, n) -> str:
+        """Gets the value at an availability number
+
+        Args:
+        n (int): availability number
+
+        Returns:
+            The value (str) at the cell, X, O or EMPTY
+        """
+        if (self._bits[X] >> n) & 1:
+            return X
+        elif (self._bits[O] >> n) & 1:
+            return O
+        return EMPTY
+
+    def to_string(self) -> str:
+        """Renders the board as a flat string. See Board."""
+        return "".join([self._get_value(n) for n in range(self._board_length * self._board_length)])
+
+    def __str__(self) -> str:
+        # mimics the numpy rendering of the Board's rows
+        rows = list()
+        for y in range(self._board_length):
+            row = [self._get_value(self._coord_to_number(x, y)) for x in range(self._board_length)]
+            rows.append("[" + " ".join(["'" + v + "'" for v in row]) + "]")
+        return ", ".join(rows)
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+# Board backends that can be selected by name
+BOARD_BACKENDS = {
+    "numpy": Board,
+    "bitboard": BitBoard,
+}
+
+
+# compact codes of each value in a Game's move history (0 on first move)
+VALUE_CODES = {X: 1, O: 2}
+
+# the value of each code, i.e. VALUES[VALUE_CODES[v]] is v
+VALUES = (None, X, O)
+
+# timestamps are kept as (naive) microseconds since this time
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+def to_micros(timestamp: datetime.datetime) -> int:
+    """Translates a (naive) time to microseconds since 1970-01-01 (exactly)"""
+    return (timestamp - _EPOCH) // _MICROSECOND
+
+def from_micros(micros: int) -> datetime.datetime:
+    """Translates microseconds since 1970-01-01 back to a (naive) time"""
+    return _EPOCH + datetime.timedelta(microseconds=micros)
 
 class Move:
     """The Move class represents a move on a tic-tac-toe board.
@@ -216,17 +579,14 @@ class Move:
     A Move can be thought of as the "state" of a tic-tac-toe game.
     A Move references a Board, and has some other attributes.
 
-    A Move can be created from "scratch" (the first move of a game),
-    or it can be created from a previous Move.
-    
+    Moves are not stored: a Game keeps its history as compact columns
+    (see Game), and a Move is a lightweight view of one row of that
+    history, created when it is asked for (e.g. by Game.get_moves).
+    Its attributes are read from the Game's columns on demand.
+
     Args:
-        previous_move (Move): the previous Move that the newly created Move
-            is following. Defaults to None (first move).
-        x (int): The x coordinate of the Move. Defaults to None (first move).
-        y (int): The y coordinate of the Move. Defaults to None (first move).
-        value (str): The "value" ("player) of the Move. Defaults to None (first move).
-        board_length (int): The size of the Board that should be created. Defaults to 3.
-            This is only applicable if previous_move is not specified, i.e. on first move.
+        game (Game): the Game the move belongs to
+        move_id (int): the move ID, i.e. its index in the game's history
 
     Attributes:
         id (int): the move ID
@@ -234,92 +594,261 @@ class Move:
         board (Board): the Board after the move
         result (Result): the Result (of the game) after the move
         last_moved (str): the "player" or "value" that last moved
+        x (int): the x coordinate of the move (None on first move)
+        y (int): the y coordinate of the move (None on first move)
     
     """
 
-    id: int = None
-    timestamp: datetime.datetime = None
-    board: Board = None
-    result: Result = None
-    last_moved: str = None    
-
-    def __init__(self, previous_move: 'Move' = None, x: int = None, y: int = None, value: str = None, board_length: int = 3) -> None:
-        self.timestamp = datetime.datetime.now()
-
-        if previous_move is None: # first move
-            self.id = 0
-            self.board = Board(board_length=board_length) # empty board to start
-            self.result = Result.ONGOING
-        else: # a following move
-            if previous_move.result != Result.ONGOING:
-                raise ("Cannot make a new move on a finished game!")
-
-            self.id = previous_move.id + 1 # increment move ID
-            self.board = Board(cloned_board=previous_move.board) # board is based on previous move's board
-            self.board.update(x, y, value) # update the board with the move
-            if self.board.check_winner(x, y, value): # check for winners
-                if value is X:
-                    self.result = Result.X_WINNER
-                elif value is O:
-                    self.result = Result.O_WINNER
-            elif self.board.check_draw(): # check for draw
-                self.result = Result.DRAW
-            else:
-                self.result = Result.ONGOING
-            self.last_moved = value # update last_moved pointer
+    __slots__ = ("_game", "id")
 
-    def __str__(self) -> str:
-        strobj = {
-            "move_id": self.id ,
-            "timestamp": str(self.timestamp),
+    id: int
+
+    def __init__(self, game: 'Game', move_id: int) -> None:
+        self._game = game
+        self.id = move_id
+
+    @property
+    def timestamp(self) -> datetime.datetime:
+        return from_micros(self._game._timestamps[self.id])
+
+    @timestamp.setter
+    def timestamp(self, timestamp: datetime.datetime) -> None:
+        # e.g. when a stored game is restored
+        self._game._timestamps[self.id] = to_micros(timestamp)
+
+    @property
+    def result(self) -> Result:
+        return RESULTS[self._game._results[self.id]]
+
+    @property
+    def last_moved(self) -> str:
+        return VALUES[self._game._values[self.id]]
+
+    @property
+    def x(self) -> int:
+        return self._game._xs[self.id] if self.id else None
+
+    @property
+    def y(self) -> int:
+        return self._game._ys[self.id] if self.id else None
+
+    @property
+    def board(self) -> Board:
+        """The Board after the move, a copy the caller can modify.
+
+        For the most recent move (or a snapshot) this is a copy of the kept
+        Board, otherwise the Board is rebuilt from the nearest earlier snapshot.
+        """
+        board = self._kept_board()
+        return board.clone() if board is not None else self._replay()
+
+    def _kept_board(self) -> Optional[Board]:
+        """Gets the Board the Game keeps for the move, i.e. its live Board
+        for the most recent move or a snapshot, None if there is none.
+        It is the Game's own, so it must never be modified or handed out."""
+        game = self._game
+        if self.id == len(game._results) - 1:
+            return game._board
+        return game._snapshots.get(self.id)
+
+    def _replay(self) -> Board:
+        """Rebuilds the Board after the move, from the nearest earlier snapshot"""
+        game = self._game
+        start = self.id - self.id % game._snapshot_interval
+        board = game._snapshots[start].clone()
+        for i in range(start + 1, self.id + 1):
+            board.update(game._xs[i], game._ys[i], VALUES[game._values[i]])
+        return board
+
+    def board_state(self, board_format: str = LEGACY_BOARD):
+        """Renders the Board after the move.
+
+        A Move's board never changes once the move is made, so the rendering
+        is cached on the Game (for boards up to MAX_CACHED_BOARD_LENGTH), which
+        keeps the MAX_CACHED_BOARD_STATES most recently used renderings.
+        The cache is thread-safe, but the caller must hold the game's lock
+        (see storage.GameStore.lock) if moves may be made meanwhile.
+
+        Args:
+            board_format (str): one of BOARD_FORMATS. Default is LEGACY_BOARD.
+
+        Returns:
+            The rendered board, a str (or a list of lists of str for ROWS_BOARD)
+
+        Raises:
+            ValueError: If the board format is invalid
+        """
+        if board_format == ROWS_BOARD:
+            flat = self.board_state(FLAT_BOARD)
+            board_length = int(round(len(flat) ** 0.5))
+            return [list(flat[i:i + board_length]) for i in range(0, len(flat), board_length)]
+        elif board_format not in BOARD_FORMATS:
+            raise ValueError("Invalid board format provided")
+
+        board_states = self._game._board_states
+        key = (self.id, board_format)
+        with _BOARD_STATES_LOCK:
+            state = board_states.get(key)
+            if state is not None:
+                board_states.move_to_end(key)
+                return state
+        # rendered without copying the kept Boards
+        board = self._kept_board()
+        if board is None:
+            board = self._replay()
+        state = str(board) if board_format == LEGACY_BOARD else board.to_string()
+        if board._board_length <= MAX_CACHED_BOARD_LENGTH:
+            with _BOARD_STATES_LOCK:
+                board_states[key] = state
+                if len(board_states) > MAX_CACHED_BOARD_STATES:
+                    board_states.popitem(last=False)
+        return state
+
+    def to_dict(self, board_format: str = LEGACY_BOARD) -> dict:
+        """Gets the Move as a dict, i.e. the Move API object
+
+        Args:
+            board_format (str): how to render the board, one of BOARD_FORMATS.
+                Default is LEGACY_BOARD.
+        """
+        return {
+            "board_state": self.board_state(board_format),
+            "game_state": self.result.value,
             "last_moved": self.last_moved,
-            "board_state": str(self.board),
-            "game_state": self.result.value
+            "move_id": self.id ,
+            "timestamp": str(self.timestamp)
         }
-        return json.dumps(strobj, sort_keys=True, indent=4)
+
+    def __str__(self) -> str:
+        return json.dumps(self.to_dict(), sort_keys=True, indent=4)
     
     def __repr__(self) -> str:
-        strobj = {
-            "move_id": self.id ,
-            "timestamp": str(self.timestamp),
-            "last_moved": self.last_moved,
-            "board_state": str(self.board),
-            "game_state": self.result.value
-        }
-        return json.dumps(strobj, sort_keys=True, indent=4)
+        return json.dumps(self.to_dict(), sort_keys=True, indent=4)
+
+class MoveList(Sequence):
+    """The MoveList class is a read-only sequence of a Game's Moves.
+
+    It behaves like the list of Moves it replaces (indexing, slicing,
+    iteration and rendering), but creates each Move when it is accessed.
+    Slicing returns a plain list of Moves.
+
+    Args:
+        game (Game): the Game whose moves to list
+    """
+
+    __slots__ = ("_game",)
+
+    def __init__(self, game: 'Game') -> None:
+        self._game = game
+
+    def __len__(self) -> int:
+        return len(self._game._results)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [Move(self._game, j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if i < 0 or i >= len(self):
+            raise IndexError("move index out of range")
+        return Move(self._game, i)
+
+    def __iter__(self):
+        game = self._game
+        for i in range(len(self)):
+            yield Move(game, i)
+
+    def __str__(self) -> str:
+        return "[" + ", ".join([repr(m) for m in self]) + "]"
+
+    def __repr__(self) -> str:
+        return str(self)
 
 class Game:
     """The Game class represents a move on a tic-tac-toe game.
 
     A Game can be thought of as the record for a game.
     A Game contains basic attributes about the game.
-    It also maintains an array of Moves that have been made in the game.
+    It also keeps the history of moves that have been made in the game.
+
+    The history is kept as compact columns, one row per move: coordinates
+    as packed int arrays, values and results as byte codes (see VALUE_CODES
+    and RESULT_CODES) and timestamps as int64 microseconds. The Game holds
+    one "live" Board, updated in place by each move, and every
+    `snapshot_interval` moves a full copy of the Board is kept; the Board
+    of any other move is rebuilt on demand by replaying the moves since
+    the nearest snapshot. Moves are views of the history, see Move.
 
     Args:
         game_id (int): the ID to use for the game
         board_length (int): the "length" (and width) of the Board to use for the game.
             Default is 3. 
+        snapshot_interval (int): how often (in moves) a full copy of the Board is kept
+            in the move history. Default is None, i.e. the number of cells, so a game
+            keeps at most 2 snapshots besides the empty Board, and rebuilding a Board
+            replays at most as many moves as copying one costs. An interval of 1 keeps
+            a full Board for every move.
+        board_type (type): the Board backend to use for the game, e.g. Board or BitBoard.
+            Default is Board.
+        win_length (int): the number of values in a row that wins the game.
+            Default is None, i.e. the board length (a full line).
     
     Attributes:
         id (int): the game ID
         started (datetime.datetime): the time the game was stated
-        moves (numpy.Array): the array of Moves that have been made in the game,
+        moves (MoveList): the Moves that have been made in the game,
             chronologically ordered (most recent is last)
-        last_move (Move): a pointer to the most recent move of the game.
+        last_move (Move): the most recent move of the game.
             This can be used to conveniently get the current "state" of the game.
+        on_move (Callable): called with the Game after each move, e.g. to update
+            a store's indexes (see game_index.GameIndex). Default is None.
     
     """
 
+    __slots__ = ("id", "started", "on_move", "_xs", "_ys", "_values", "_timestamps", "_results",
+        "_board", "_snapshots", "_snapshot_interval", "_board_states", "_last_move")
+
     id: int
     started: datetime.datetime
-    moves: np.array
-    last_move: Move
+    on_move: Optional[Callable[['Game'], None]]
 
-    def __init__(self, game_id, board_length:int = 3) -> None:
+    def __init__(self, game_id, board_length:int = 3, snapshot_interval: int = None, board_type: type = Board, win_length: int = None) -> None:
         self.id = game_id
         self.started = datetime.datetime.now()
-        self.last_move = Move(board_length=board_length)
-        self.moves = [self.last_move]
+        self.on_move = None
+
+        # the move history, one row per move (the first move has no coordinates)
+        self._xs = array("i", [-1])
+        self._ys = array("i", [-1])
+        self._values = bytearray(1)
+        self._timestamps = array("q", [to_micros(self.started)])
+        self._results = bytearray([RESULT_CODES[Result.ONGOING]])
+
+        self._board = board_type(board_length=board_length, win_length=win_length) # empty board to start
+        self._snapshot_interval = max(1, board_length * board_length if snapshot_interval is None else snapshot_interval)
+        self._snapshots = {0: self._board.clone()}
+
+        # cached renderings of the boards, by move ID and format, see Move.board_state
+        self._board_states = OrderedDict()
+        self._last_move = Move(self, 0)
+
+    @property
+    def last_move(self) -> Move:
+        return self._last_move
+
+    @property
+    def moves(self) -> MoveList:
+        return MoveList(self)
+
+    @property
+    def board_length(self) -> int:
+        """The "length" (and width) of the game's Board"""
+        return self._board.board_length
+
+    @property
+    def win_length(self) -> int:
+        """The number of values in a row that wins the game"""
+        return self._board.win_length
     
     def make_move(self, x, y, value) -> Result:
         """Make a move in the game
@@ -337,68 +866,90 @@ class Game:
                 if invalid coordinates are provided, if the spot is already occupied,
                 or if the value is invalid.
         """
-        if self.last_move.result != Result.ONGOING:
+        if self._results[-1] != RESULT_CODES[Result.ONGOING]:
             raise ValueError("Cannot make a new move on a finished game!")
+
+        board = self._board
+        board.update(x, y, value) # raises before mutating if the move is invalid
+        if board.check_winner(x, y, value): # check for winners
+            result = Result.X_WINNER if value == X else Result.O_WINNER
+        elif board.check_draw(): # check for draw
+            result = Result.DRAW
         else:
-            self.last_move = Move(self.last_move, x, y, value)
-            self.moves.append(self.last_move)
-            # check for winner and return something
-            return self.last_move.result
+            result = Result.ONGOING
+
+        move_id = len(self._results)
+        self._xs.append(x)
+        self._ys.append(y)
+        self._values.append(VALUE_CODES[value])
+        self._timestamps.append(to_micros(datetime.datetime.now()))
+        self._results.append(RESULT_CODES[result])
+        if move_id % self._snapshot_interval == 0:
+            self._snapshots[move_id] = board.clone()
+        self._last_move = Move(self, move_id)
+        if self.on_move is not None:
+            self.on_move(self)
+        return result
     
-    def make_computer_move(self, value: str=O) -> Result:
+    def make_computer_move(self, value: str=O, strategy: 'Strategy' = None) -> Result:
         """Make a computer move in the game.
 
-        Currently this just chooses a random available spot on the board.
-        The functionality could be improved to make a "smarter" choice.
+        By default this just chooses a random available spot on the board.
+        A "smarter" choice can be made by providing a Strategy (see strategies.py).
 
         Args:
         value (str): the value (player) of the move. Default is O.
+        strategy (Strategy): chooses the move. Default is None, i.e. a random spot.
 
         Returns:
             The Result of the move, i.e. the state of the game after the move.
         """
-        
-        # get random available coordinate for next move
-        # here's where we could plug in some smarts if we wanted
-        x, y = self.last_move.board.get_available_coord()
+        board = self._board
+        if strategy is None:
+            # get random available coordinate for next move
+            x, y = board.get_available_coord()
+        else:
+            x, y = strategy.choose_move(board, value)
         # make move to that coordiante
         return self.make_move(x, y, value)
     
     def get_moves(self, i: int = None) -> List[Move]:
         """Convenience method to get one or more of the games move, by index.
-        If no index is provided, then all games will be returned as an array.
+        If no index is provided, then all games will be returned as a MoveList.
 
         Args:
             i (int): index of the move to get. Default is None (all moves).
 
         Returns:
-            The Move (or array of Moves) requested
+            The Move (or MoveList of Moves) requested
         """
         if i is not None:
-            if i > len(self.moves) -1 or i < 0:
+            if i > len(self._results) -1 or i < 0:
                 raise ValueError("Invalid move index provided")
             else:
-                return [self.moves[i]]
+                return [Move(self, i)]
         else:
-            return self.moves
+            return MoveList(self)
     
     
-    def __str__(self) -> str:
-        strobj = {
+    def to_dict(self, board_format: str = LEGACY_BOARD) -> dict:
+        """Gets the Game as a dict, i.e. the Game API object
+
+        Args:
+            board_format (str): how to render the board, one of BOARD_FORMATS.
+                Default is LEGACY_BOARD.
+        """
+        last_move = self._last_move
+        return {
+            "board_state": last_move.board_state(board_format),
             "game_id": self.id ,
-            "started_time": str(self.started),
-            "board_state": str(self.last_move.board),
-            "last_played": self.last_move.last_moved,
-            "game_state": self.last_move.result.value
+            "game_state": last_move.result.value,
+            "last_played": last_move.last_moved,
+            "started_time": str(self.started)
         }
-        return json.dumps(strobj, sort_keys=True, indent=4)
+
+    def __str__(self) -> str:
+        return json.dumps(self.to_dict(), sort_keys=True, indent=4)
     
     def __repr__(self) -> str:
-        strobj = {
-            "game_id": self.id ,
-            "started_time": str(self.started),
-            "board_state": str(self.last_move.board),
-            "last_played": self.last_move.last_moved,
-            "game_state": self.last_move.result.value 
-        }
-        return json.dumps(strobj, sort_keys=True, indent=4)
+        return json.dumps(self.to_dict(), sort_keys=True, indent=4)
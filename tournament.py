@@ -0,0 +1,170 @@
+import argparse
+import json
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+import numpy as np
+from simulation import BatchSimulator, count_results
+from strategies import STRATEGIES, NegamaxStrategy, OpeningBookStrategy, RandomStrategy, Strategy, TranspositionTable
+from tic_tac_toe import RESULT_CODES, Game, Result, X, O
+
+# number of games played per shard (unit of work) by default
+DEFAULT_SHARD_SIZE = 1000
+
+def make_strategy(name: str, max_depth: int = None, time_budget: float = None) -> Strategy:
+    """Creates a player's Strategy by name, see strategies.STRATEGIES
+
+    Searching strategies get their own transposition table, so their moves
+    don't depend on the games searched before in the same process (i.e.
+    on how shards are spread over workers).
+
+    Args:
+        name (str): the strategy name
+        max_depth (int): the search depth of a negamax player. Default is None (its default).
+        time_budget (float): the search time of a negamax player. Default is None (its default).
+
+    Returns:
+        The Strategy
+
+    Raises:
+        ValueError: If the strategy name is unknown
+    """
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown strategy {name}, use one of {', '.join(STRATEGIES)}")
+    if STRATEGIES[name] is NegamaxStrategy:
+        kwargs = {"max_depth": max_depth}
+        if time_budget is not None:
+            kwargs["time_budget"] = time_budget
+        return NegamaxStrategy(table=TranspositionTable(), **kwargs)
+    if STRATEGIES[name] is OpeningBookStrategy:
+        return OpeningBookStrategy(NegamaxStrategy(table=TranspositionTable()))
+    return STRATEGIES[name]()
+
+def shard_seed(seed: int, shard: int) -> int:
+    """Gets the seed of a shard, which only depends on the run's seed
+    and the shard's index (not on how shards are spread over workers)"""
+    return int(np.random.SeedSequence([seed, shard]).generate_state(1)[0])
+
+def play_shard(x_player: str, o_player: str, num_games: int, board_length: int,
+        seed: int, max_depth: int = None, time_budget: float = None) -> bytes:
+    """Plays a shard of games, X starting every game.
+
+    Random-vs-random games are played with the vectorized BatchSimulator,
+    others game by game with Game.make_computer_move.
+
+    Args:
+        x_player (str): the strategy name of X
+        o_player (str): the strategy name of O
+        num_games (int): the number of games to play
+        board_length (int): the board length of the games
+        seed (int): the shard's seed
+        max_depth (int): see make_strategy
+        time_budget (float): see make_strategy
+
+    Returns:
+        The result codes of the games as bytes (one uint8 per game),
+        which are much cheaper to send between processes than Games
+    """
+    strategies = {
+        X: make_strategy(x_player, max_depth, time_budget),
+        O: make_strategy(o_player, max_depth, time_budget),
+    }
+    if all(type(s) is RandomStrategy for s in strategies.values()):
+        return BatchSimulator(num_games, board_length, seed).play_random().tobytes()
+
+    random.seed(seed) # random moves come from the random module
+    results = np.empty(num_games, dtype=np.uint8)
+    for i in range(num_games):
+        game = Game(i, board_length)
+        value = X
+        while game.last_move.result == Result.ONGOING:
+            game.make_computer_move(value, strategies[value])
+            value = O if value == X else X
+        results[i] = RESULT_CODES[game.last_move.result]
+    return results.tobytes()
+
+def run_tournament(x_player: str, o_player: str, num_games: int, board_length: int = 3,
+        workers: int = None, seed: int = 0, shard_size: int = DEFAULT_SHARD_SIZE,
+        max_depth: int = None, time_budget: float = None) -> np.ndarray:
+    """Plays games between 2 players across a pool of processes.
+
+    Games are split into shards of `shard_size` games, each seeded from
+    `seed` and its index, so a run is reproducible whatever the number of
+    workers (as long as the players are deterministic given the seed,
+    e.g. a negamax player should be limited by depth rather than time).
+
+    Args:
+        x_player (str): the strategy name of X, who moves first
+        o_player (str): the strategy name of O
+        num_games (int): the number of games to play
+        board_length (int): the board length of the games. Default is 3.
+        workers (int): the number of processes. Default is None (one per core).
+        seed (int): the run's seed. Default is 0.
+        shard_size (int): the number of games per shard. Default is DEFAULT_SHARD_SIZE.
+        max_depth (int): see make_strategy
+        time_budget (float): see make_strategy
+
+    Returns:
+        The result codes of the games (see tic_tac_toe.RESULT_CODES), a uint8 array
+    """
+    # fail early on unknown players, rather than in every worker
+    make_strategy(x_player)
+    make_strategy(o_player)
+    shards = [min(shard_size, num_games - start) for start in range(0, num_games, shard_size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(play_shard, x_player, o_player, games, board_length,
+                shard_seed(seed, i), max_depth, time_budget)
+            for i, games in enumerate(shards)
+        ]
+        return np.frombuffer(b"".join([f.result() for f in futures]), dtype=np.uint8)
+
+def summarize(results: np.ndarray) -> dict:
+    """Summarizes results as win/draw/loss stats, from X's point of view
+
+    Args:
+        results (np.ndarray): result codes, see tic_tac_toe.RESULT_CODES
+
+    Returns:
+        The stats, as a dict
+    """
+    counts = count_results(results)
+    games = len(results)
+    return {
+        "games": games,
+        "x_wins": counts[Result.X_WINNER],
+        "o_wins": counts[Result.O_WINNER],
+        "draws": counts[Result.DRAW],
+        "x_win_rate": round(counts[Result.X_WINNER] / games, 4) if games else 0,
+        "o_win_rate": round(counts[Result.O_WINNER] / games, 4) if games else 0,
+        "draw_rate": round(counts[Result.DRAW] / games, 4) if games else 0,
+    }
+
+def main(argv: List[str] = None) -> dict:
+    parser = argparse.ArgumentParser(description="Play games between 2 computer players, across processes.")
+    parser.add_argument("--x", default="random", help=f"X's strategy, one of {', '.join(STRATEGIES)}")
+    parser.add_argument("--o", default="random", help=f"O's strategy, one of {', '.join(STRATEGIES)}")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--board-length", type=int, default=3)
+    parser.add_argument("--workers", type=int, help="number of processes, one per core by default")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+    parser.add_argument("--max-depth", type=int, help="search depth of negamax players")
+    parser.add_argument("--time-budget", type=float, help="search time (seconds) of negamax players")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = run_tournament(args.x, args.o, args.games, args.board_length, args.workers,
+        args.seed, args.shard_size, args.max_depth, args.time_budget)
+    elapsed = time.perf_counter() - start
+    stats = {"x": args.x, "o": args.o, "board_length": args.board_length, "seed": args.seed}
+    stats.update(summarize(results))
+    stats["seconds"] = round(elapsed, 3)
+    stats["games_per_second"] = round(len(results) / elapsed, 1)
+    return stats
+
+if __name__ == '__main__':
+    json.dump(main(), sys.stdout, indent=4)
+    print()
@@ -0,0 +1,36 @@
+import unittest
+import numpy as np
+from tournament import main, run_tournament, summarize
+from tic_tac_toe import RESULT_CODES, Result
+
+class TestTournament(unittest.TestCase):
+
+    def test_reproducible_across_workers(self):
+        for x_player, o_player in [("random", "random"), ("random", "book")]:
+            one = run_tournament(x_player, o_player, 250, workers=1, seed=3, shard_size=100)
+            two = run_tournament(x_player, o_player, 250, workers=2, seed=3, shard_size=100)
+            self.assertEqual(len(one), 250)
+            np.testing.assert_equal(one, two)
+
+        # searches don't share what they learnt across the shards of a worker
+        one = run_tournament("random", "negamax", 60, board_length=4, workers=1, seed=1, shard_size=10, max_depth=2)
+        three = run_tournament("random", "negamax", 60, board_length=4, workers=3, seed=1, shard_size=10, max_depth=2)
+        np.testing.assert_equal(one, three)
+
+    def test_book_never_loses(self):
+        results = run_tournament("random", "book", 200, workers=2, shard_size=50)
+        self.assertNotIn(RESULT_CODES[Result.X_WINNER], results)
+        stats = summarize(results)
+        self.assertEqual(stats["games"], 200)
+        self.assertEqual(stats["x_wins"], 0)
+        self.assertEqual(stats["o_wins"] + stats["draws"], 200)
+
+    def test_main(self):
+        stats = main(["--x", "negamax", "--o", "random", "--games", "20", "--board-length", "4",
+            "--workers", "1", "--max-depth", "1"])
+        self.assertEqual(stats["games"], 20)
+        self.assertRaises(ValueError, run_tournament, "garbage", "random", 10)
+
+
+if __name__ == '__main__':
+    unittest.main()